@@ -1,58 +1,39 @@
 import os
-import json
-from openai import OpenAI
-from sqlalchemy.orm import Session
-from database import SessionLocal  # Исправленный импорт
+import asyncio
+from pydantic import ValidationError
+from database import AsyncSessionLocal
 from models import InterviewDB
 from fastapi import HTTPException
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from google_sheets import enqueue_row
+from interview_turns import get_transcript
+from llm_scheduler import llm_scheduler, count_tokens, BATCH
+from llm_cache import completion_cache, cache_key
+from interview_cache import interview_cache
+from interview_search import index_report
+from report_scores import save_report_scores
+from schemas import ReportScores
 
 # API ключи
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-GOOGLE_SHEETS_CREDENTIALS = os.getenv("GOOGLE_SHEETS_CREDENTIALS")
 SHEET_REPORTS = os.getenv("SHEET_REPORTS")
 SHEET_EMOTIONS = os.getenv("SHEET_EMOTIONS")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+REPORT_MODEL = "gpt-4o"
 
+# Бюджет токенов на вопросы и ответы в промте; длинные интервью сжимаются по частям
+REPORT_TOKEN_BUDGET = int(os.getenv("REPORT_TOKEN_BUDGET", 12000))
+REPORT_CHUNK_TOKENS = int(os.getenv("REPORT_CHUNK_TOKENS", 3000))
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+SUMMARY_MAX_ROUNDS = 3
 
-# Функция подключения к Google Sheets
-def connect_google_sheets(sheet_name):
-    if not GOOGLE_SHEETS_CREDENTIALS:
-        raise HTTPException(status_code=500, detail="Google Sheets credentials отсутствуют!")
 
-    try:
-        creds_dict = json.loads(GOOGLE_SHEETS_CREDENTIALS)
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(
-            creds_dict,
-            ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        )
-        client = gspread.authorize(creds)
-        sheet = client.open(sheet_name).sheet1
-        return sheet
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ошибка подключения к Google Sheets: {str(e)}")
-
-
-# Функция генерации отчета
-def generate_report(interview_id: str):
-    session = SessionLocal()
-    try:
-        interview = session.query(InterviewDB).filter(InterviewDB.id == interview_id).first()
-
-        if not interview:
-            raise HTTPException(status_code=404, detail="Интервью не найдено")
-
-        questions = interview.questions if interview.questions else "Нет данных"
-        answers = interview.answers if interview.answers else "Нет данных"
-
-        # 📌 Подготовка промта для OpenAI
-        prompt = f"""
+# 📌 Промт для основного отчёта
+def build_report_messages(candidate_id, questions, answers):
+    prompt = f"""
 Ты — AI-HR Эмили. Твоя задача — создать объективный отчёт по интервью с кандидатом.
 
 📌 **1. Основные данные**
-- Кандидат ID: {interview.candidate_id}
+- Кандидат ID: {candidate_id}
 - Вопросы: {questions}
 - Ответы: {answers}
 
@@ -76,36 +57,15 @@ def generate_report(interview_id: str):
 - Какие сильные стороны?
 - Какие зоны роста?
 """
+    return [
+        {"role": "system", "content": "Ты — AI-HR, анализируешь собеседование."},
+        {"role": "user", "content": prompt}
+    ]
 
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "Ты — AI-HR, анализируешь собеседование."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            report_text = response.choices[0].message.content
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Ошибка при генерации отчёта: {str(e)}")
 
-        # 📌 Сохраняем отчёт в БД
-        interview.report = report_text
-        session.commit()
-
-        try:
-            # 📌 Сохранение отчета в Google Sheets
-            sheet_reports = connect_google_sheets(SHEET_REPORTS)
-            sheet_reports.append_row([
-                interview_id,
-                interview.candidate_id,
-                questions,
-                answers,
-                report_text
-            ])
-
-            # 📌 Генерация анализа эмоций и речи
-            prompt_emotions = f"""
+# 📌 Промт для анализа эмоций и речи
+def build_emotions_messages(candidate_id, questions, answers):
+    prompt_emotions = f"""
 Ты — AI-аналитик эмоций. Определи основные эмоции кандидата на основе его ответов.
 
 📌 **Вопросы и ответы**
@@ -117,29 +77,258 @@ def generate_report(interview_id: str):
 3️⃣ Как менялись **темп и громкость речи**?
 4️⃣ Были ли признаки волнения, уверенности?
 """
+    return [{"role": "user", "content": prompt_emotions}]
 
-            response_emotions = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt_emotions}]
-            )
-            emotions_analysis = response_emotions.choices[0].message.content
 
-            # 📌 Сохранение анализа эмоций в Google Sheets
-            sheet_emotions = connect_google_sheets(SHEET_EMOTIONS)
-            sheet_emotions.append_row([
-                interview_id,
-                interview.candidate_id,
-                emotions_analysis
-            ])
+# 📌 Промт для структурированной оценки (JSON для рейтинга кандидатов) по готовому отчёту
+def build_scores_messages(candidate_id, report):
+    prompt = f"""
+Перенеси оценки из отчёта по интервью в JSON и верни только JSON-объект без пояснений.
+Баллы, вердикт, сильные стороны и зоны роста бери из отчёта, ничего не переоценивай:
+{{
+  "hard_skills": целое 1–5 — оценка Hard Skills из отчёта,
+  "soft_skills": целое 1–5 — оценка Soft Skills из отчёта,
+  "verdict": true или false — итоговый вердикт отчёта (Да / Нет),
+  "strengths": ["сильная сторона", ...],
+  "growth_areas": ["зона роста", ...]
+}}
+
+📌 **Отчёт по интервью**
+- Кандидат ID: {candidate_id}
 
+{report}
+"""
+    return [
+        {"role": "system", "content": "Ты — AI-HR, переносишь оценки из отчёта в JSON. Отвечай только JSON."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+SCORES_RESPONSE_FORMAT = {"type": "json_object"}
+
+# Разделы анализа, которые генерируются параллельно
+ANALYSIS_SECTIONS = {
+    "report": build_report_messages,
+    "emotions": build_emotions_messages,
+}
+
+
+async def complete(messages, model=REPORT_MODEL, bypass_cache=False, priority=BATCH, **params):
+    """
+    Один запрос к OpenAI через общий планировщик (лимиты, повторы, приоритет), возвращает текст ответа.
+    Повторные запросы с теми же сообщениями берутся из кэша, bypass_cache=True — перегенерация.
+    """
+    async def request():
+        return await llm_scheduler.chat(model, messages, priority=priority, **params)
+
+    return await completion_cache.get_or_create(cache_key(model, messages, **params), model, request, bypass=bypass_cache)
+
+
+async def stream_report_section(messages, stream, bypass_cache=False, priority=BATCH):
+    """
+    Основной раздел отчёта с stream=True: фрагменты публикуются в stream по мере генерации,
+    собранный текст кэшируется так же, как ответ complete().
+    """
+    async def request():
+        deltas = await llm_scheduler.stream(REPORT_MODEL, messages, priority=priority)
+        parts = []
+        async for delta in deltas:
+            parts.append(delta)
+            await stream.publish(delta)
+        return "".join(parts)
+
+    content = await completion_cache.get_or_create(cache_key(REPORT_MODEL, messages), REPORT_MODEL, request, bypass=bypass_cache)
+    # Отчёт взят из кэша — отдаём его одним фрагментом
+    if not stream.chunks:
+        await stream.publish(content)
+    return content
+
+
+async def run_analysis_sections(candidate_id, questions, answers, bypass_cache=False, stream=None, priority=BATCH):
+    """
+    Запускает все разделы анализа одновременно и собирает результаты.
+    Общая задержка определяется самым медленным запросом.
+    stream — поток, в который по мере генерации публикуется основной отчёт.
+    """
+    def section(name):
+        messages = ANALYSIS_SECTIONS[name](candidate_id, questions, answers)
+        if name == "report" and stream is not None:
+            return stream_report_section(messages, stream, bypass_cache, priority)
+        return complete(messages, bypass_cache=bypass_cache, priority=priority)
+
+    names = list(ANALYSIS_SECTIONS)
+    try:
+        results = await asyncio.gather(*(section(name) for name in names))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при генерации отчёта: {str(e)}")
+
+    return dict(zip(names, results))
+
+
+async def generate_scores(candidate_id, report, bypass_cache=False, priority=BATCH):
+    """
+    Структурированная оценка, извлечённая из готового отчёта, поэтому вердикт и баллы ему не противоречат.
+    Ответ проверяется схемой ReportScores; невалидный запрашивается ещё раз без кэша. Если и он не проходит
+    проверку или запрос упал — None, отчёт сохраняется без оценки.
+    """
+    messages = build_scores_messages(candidate_id, report)
+    for attempt in range(2):
+        try:
+            content = await complete(
+                messages, bypass_cache=bypass_cache or attempt > 0, priority=priority,
+                response_format=SCORES_RESPONSE_FORMAT
+            )
+            return ReportScores.model_validate_json(content)
+        except ValidationError as e:
+            print(f"❌ Оценка интервью не прошла проверку (попытка {attempt + 1}): {e}")
         except Exception as e:
-            session.rollback()
-            raise HTTPException(status_code=500, detail=f"Ошибка записи в Google Sheets: {str(e)}")
+            print(f"❌ Ошибка при генерации оценки интервью: {e}")
+            return None
+    return None
+
+
+def split_by_tokens(text: str, max_tokens: int):
+    """
+    Делит текст на фрагменты не длиннее max_tokens, по возможности по границам строк.
+    """
+    chunks, current, current_tokens = [], [], 0
+    for line in text.split("\n"):
+        tokens = count_tokens(line)
+
+        # Слишком длинная строка режется по символам пропорционально бюджету
+        if tokens > max_tokens:
+            step = max(1, len(line) * max_tokens // tokens)
+            pieces = [line[i:i + step] for i in range(0, len(line), step)]
+        else:
+            pieces = [line]
+
+        for piece in pieces:
+            piece_tokens = count_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+# 📌 Промт для сжатия фрагмента интервью
+def build_summary_messages(kind, chunk):
+    prompt = f"""
+Сожми фрагмент интервью ({kind}) для последующей оценки кандидата.
+Сохрани факты, технологии, примеры из опыта, формулировки, по которым видны
+уверенность, волнение или затруднения. Ничего не добавляй от себя.
+
+{chunk}
+"""
+    return [{"role": "user", "content": prompt}]
 
+
+async def condense(kind: str, text: str, budget: int, bypass_cache=False, priority=BATCH) -> str:
+    """
+    Map-reduce сжатие: фрагменты сжимаются параллельно и склеиваются,
+    пока текст не уложится в бюджет. Сжатые фрагменты кэшируются и
+    переиспользуются всеми разделами анализа.
+    """
+    for _ in range(SUMMARY_MAX_ROUNDS):
+        if count_tokens(text) <= budget:
+            break
+
+        chunks = split_by_tokens(text, REPORT_CHUNK_TOKENS)
+        summaries = await asyncio.gather(*(
+            complete(build_summary_messages(kind, chunk), model=SUMMARY_MODEL, bypass_cache=bypass_cache, priority=priority)
+            for chunk in chunks
+        ))
+        text = "\n".join(summaries)
+
+    return text
+
+
+async def prepare_transcript(questions: str, answers: str, bypass_cache=False, priority=BATCH):
+    """
+    Укладывает вопросы и ответы в REPORT_TOKEN_BUDGET; короткие интервью не меняются.
+    """
+    if count_tokens(questions) + count_tokens(answers) <= REPORT_TOKEN_BUDGET:
+        return questions, answers
+
+    # Бюджет делится между вопросами и ответами, ответам — основная часть
+    questions_budget = REPORT_TOKEN_BUDGET // 4
+    try:
+        return await asyncio.gather(
+            condense("вопросы интервьюера", questions, questions_budget, bypass_cache, priority),
+            condense("ответы кандидата", answers, REPORT_TOKEN_BUDGET - questions_budget, bypass_cache, priority)
+        )
     except Exception as e:
-        session.rollback()
-        raise HTTPException(status_code=500, detail=f"Ошибка при работе с БД: {str(e)}")
-    finally:
-        session.close()
+        raise HTTPException(status_code=500, detail=f"Ошибка при сжатии интервью: {str(e)}")
+
+
+async def load_interview_data(interview_id: str):
+    async with AsyncSessionLocal() as session:
+        interview = await session.get(InterviewDB, interview_id)
+
+        if not interview:
+            raise HTTPException(status_code=404, detail="Интервью не найдено")
+
+        questions, answers = await get_transcript(session, interview)
+        questions = questions if questions else "Нет данных"
+        answers = answers if answers else "Нет данных"
+        return interview.candidate_id, questions, answers
+
+
+async def _save_report(interview_id: str, candidate_id: str, questions, answers, sections, scores=None):
+    """
+    Сохраняет отчёт и оценку и в той же транзакции ставит строки в очередь выгрузки в Google Sheets.
+    """
+    async with AsyncSessionLocal() as session:
+        try:
+            interview = await session.get(InterviewDB, interview_id)
+            interview.report = sections["report"]
+            await index_report(session, interview_id, sections["report"])
+            if scores is not None:
+                await save_report_scores(session, interview_id, scores, REPORT_MODEL)
+
+            # 📌 Отчёт и анализ эмоций выгружаются в Google Sheets фоновым процессом
+            if SHEET_REPORTS:
+                enqueue_row(None, [interview_id, candidate_id, questions, answers, sections["report"]],
+                            spreadsheet_name=SHEET_REPORTS, db=session)
+            if SHEET_EMOTIONS:
+                enqueue_row(None, [interview_id, candidate_id, sections["emotions"]],
+                            spreadsheet_name=SHEET_EMOTIONS, db=session)
+
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            raise HTTPException(status_code=500, detail=f"Ошибка при работе с БД: {str(e)}")
+
+    interview_cache.invalidate(interview_id)
+
+
+# Функция генерации отчета
+async def generate_report_async(interview_id: str, bypass_cache: bool = False, stream=None, priority=BATCH):
+    """
+    Асинхронный конвейер отчёта: длинное интервью сжимается по частям,
+    разделы анализа генерируются параллельно, структурированная оценка извлекается из готового отчёта,
+    запись в Google Sheets уходит в очередь выгрузки.
+    stream — поток для SSE, в который публикуется основной отчёт по мере генерации.
+    """
+    candidate_id, questions, answers = await load_interview_data(interview_id)
+
+    # Длинные интервью сжимаются до бюджета токенов перед анализом
+    prompt_questions, prompt_answers = await prepare_transcript(questions, answers, bypass_cache, priority)
+    sections = await run_analysis_sections(candidate_id, prompt_questions, prompt_answers, bypass_cache, stream, priority)
+    scores = await generate_scores(candidate_id, sections["report"], bypass_cache, priority)
+
+    # 📌 Сохраняем отчёт в БД
+    await _save_report(interview_id, candidate_id, questions, answers, sections, scores)
+
+    return sections["report"]
+
 
-    return report_text
+def generate_report(interview_id: str, bypass_cache: bool = False):
+    """
+    Синхронная обёртка для вызова вне event loop (скрипты, потоки).
+    """
+    return asyncio.run(generate_report_async(interview_id, bypass_cache))
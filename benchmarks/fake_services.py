@@ -0,0 +1,155 @@
+import json
+import time
+import asyncio
+import random
+from aiohttp import web
+
+FAKE_REPORT = (
+    "Кандидат уверенно рассказывает о своём опыте, приводит конкретные примеры проектов "
+    "и технологий. Коммуникация чёткая, ответы структурированы. Рекомендация: пригласить "
+    "на следующий этап."
+)
+
+
+def _latency(base: float, jitter: float = 0.2) -> float:
+    # Задержка с разбросом ±jitter, чтобы перцентили не вырождались
+    return max(0.0, base * random.uniform(1 - jitter, 1 + jitter))
+
+
+class FakeAPIServer:
+    """
+    HTTP-заглушка OpenAI (/v1/chat/completions, в том числе stream=True)
+    и Deepgram (/v1/listen) с настраиваемой задержкой ответа.
+    """
+
+    def __init__(self, openai_latency: float = 1.0, deepgram_latency: float = 0.3):
+        self.openai_latency = openai_latency
+        self.deepgram_latency = deepgram_latency
+        self.calls = {"openai": 0, "deepgram": 0}
+        self._runner = None
+        self.port = None
+
+    def _app(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/v1/listen", self.listen)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._runner = web.AppRunner(self._app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def chat_completions(self, request):
+        self.calls["openai"] += 1
+        body = await request.json()
+        model = body.get("model", "gpt-4o")
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(_latency(self.openai_latency))
+            return web.json_response({
+                "id": f"chatcmpl-fake-{self.calls['openai']}",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": FAKE_REPORT},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 1000, "completion_tokens": 200, "total_tokens": 1200}
+            })
+
+        # Потоковый ответ: задержка распределяется между фрагментами
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        words = FAKE_REPORT.split(" ")
+        delay = _latency(self.openai_latency) / len(words)
+        for word in words:
+            await asyncio.sleep(delay)
+            chunk = {
+                "id": "chatcmpl-fake-stream",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def listen(self, request):
+        self.calls["deepgram"] += 1
+        body = await request.json()
+        await asyncio.sleep(_latency(self.deepgram_latency))
+        transcript = f"Ответ кандидата из записи {body.get('url')}. Я работал над backend-сервисами на Python."
+        return web.json_response({
+            "results": {"channels": [{"alternatives": [{"transcript": transcript, "confidence": 0.95}]}]}
+        })
+
+
+class FakeSMTPServer:
+    """
+    Минимальный SMTP-сервер без TLS и авторизации: принимает письма и считает их.
+    """
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.messages = 0
+        self._server = None
+        self.port = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        async def reply(line):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 fake-smtp ESMTP")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip().upper()
+
+                if command.startswith(("EHLO", "HELO")):
+                    await reply("250 fake-smtp")
+                elif command.startswith("DATA"):
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    while (await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        pass
+                    await asyncio.sleep(_latency(self.latency))
+                    self.messages += 1
+                    await reply("250 OK: queued")
+                elif command.startswith("QUIT"):
+                    await reply("221 Bye")
+                    break
+                elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                    await reply("250 OK")
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,288 @@
+"""
+Сквозной бенчмарк: поднимает приложение (uvicorn) на SQLite или локальном PostgreSQL
+с заглушками OpenAI, Deepgram, SMTP и Google Sheets и прогоняет сценарии
+регистрация → начало интервью → N ответов → завершение с заданной параллельностью.
+
+Запуск из корня репозитория:
+    python benchmarks/run.py --candidates 200 --concurrency 20 --answers 5 --wait-reports
+
+Результат (пропускная способность и p50/p95/p99 по каждому эндпоинту) печатается
+и сохраняется в JSON в benchmarks/results/ для сравнения между релизами.
+"""
+import os
+import sys
+import math
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+import httpx
+from fake_services import FakeAPIServer, FakeSMTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк AI-HR Interview System")
+    parser.add_argument("--candidates", type=int, default=100, help="Сколько сценариев интервью прогнать")
+    parser.add_argument("--concurrency", type=int, default=10, help="Сколько сценариев выполняется одновременно")
+    parser.add_argument("--answers", type=int, default=5, help="Ответов в одном интервью")
+    parser.add_argument("--database-url", help="URL БД; по умолчанию временный файл SQLite")
+    parser.add_argument("--port", type=int, default=8765, help="Порт приложения")
+    parser.add_argument("--workers", type=int, default=1, help="Процессов uvicorn")
+    parser.add_argument("--openai-latency", type=float, default=1.0, help="Задержка заглушки OpenAI, сек")
+    parser.add_argument("--deepgram-latency", type=float, default=0.3, help="Задержка заглушки Deepgram, сек")
+    parser.add_argument("--smtp-latency", type=float, default=0.05, help="Задержка заглушки SMTP, сек")
+    parser.add_argument("--sheets-latency", type=float, default=0.2, help="Задержка записи в Google Sheets, сек")
+    parser.add_argument("--wait-reports", action="store_true", help="Ждать готовности отчётов и замерить время до отчёта")
+    parser.add_argument("--report-timeout", type=float, default=300, help="Сколько ждать все отчёты, сек")
+    parser.add_argument("--label", default="", help="Метка прогона (версия, ветка) для сравнения результатов")
+    parser.add_argument("--output", help="Файл результата; по умолчанию benchmarks/results/<время>.json")
+    return parser.parse_args()
+
+
+def percentile(values, q):
+    """
+    Перцентиль методом ближайшего ранга.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    """
+    Собирает длительности и ошибки по эндпоинтам.
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self.errors = {}
+
+    def add(self, endpoint, seconds, ok=True):
+        self.durations.setdefault(endpoint, []).append(seconds)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    async def call(self, endpoint, request, expected=(200,)):
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.add(endpoint, time.perf_counter() - start, ok=False)
+            raise
+        self.add(endpoint, time.perf_counter() - start, ok=response.status_code in expected)
+        if response.status_code not in expected:
+            raise RuntimeError(f"{endpoint}: HTTP {response.status_code} {response.text[:200]}")
+        return response.json()
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for endpoint, values in self.durations.items():
+            endpoints[endpoint] = {
+                "count": len(values),
+                "errors": self.errors.get(endpoint, 0),
+                "throughput_rps": round(len(values) / elapsed, 2) if elapsed else None,
+                "mean_ms": round(sum(values) / len(values) * 1000, 1),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1),
+            }
+        return endpoints
+
+
+async def run_flow(client, recorder, index, answers):
+    """
+    Один сценарий: регистрация → начало интервью → ответы → завершение.
+    Возвращает ID интервью и момент завершения.
+    """
+    candidate = await recorder.call("POST /register/", client.post("/register/", json={
+        "name": f"Кандидат {index}",
+        "email": f"bench-{index}-{time.time_ns()}@example.com",
+        "phone": "+70000000000",
+        "gender": "female" if index % 2 else "male"
+    }))
+    interview_id = candidate["id"]
+
+    await recorder.call("GET /interview/{id}", client.get(f"/interview/{interview_id}"))
+    for answer in range(answers):
+        await recorder.call(
+            "POST /interview/{id}/answer",
+            client.post(f"/interview/{interview_id}/answer", params={
+                "audio_url": f"https://example.com/audio/{interview_id}/{answer}.wav"
+            })
+        )
+    await recorder.call(
+        "POST /interview/{id}/finish", client.post(f"/interview/{interview_id}/finish"), expected=(202,)
+    )
+    return interview_id, time.perf_counter()
+
+
+async def wait_report(client, recorder, interview_id, finished_at, deadline):
+    """
+    Опрашивает задачу отчёта; время от завершения интервью до готового отчёта пишется как "report ready".
+    """
+    while time.perf_counter() < deadline:
+        response = await client.get(f"/interview/{interview_id}/report/job")
+        if response.status_code == 200:
+            status = response.json()["status"]
+            if status in ("done", "failed"):
+                recorder.add("report ready", time.perf_counter() - finished_at, ok=status == "done")
+                return
+        await asyncio.sleep(0.25)
+    recorder.add("report ready", time.perf_counter() - finished_at, ok=False)
+
+
+def app_environment(args, api_port, smtp_port, database_url):
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": database_url,
+        "FRONTEND_URL": "http://localhost:3000",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{api_port}/v1",
+        "DEEPGRAM_API_KEY": "bench",
+        "DEEPGRAM_API_URL": f"http://127.0.0.1:{api_port}/v1/listen",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_USE_SSL": "false",
+        "SMTP_USERNAME": "",
+        "SMTP_PASSWORD": "",
+        "EMAIL_FROM": "bench@example.com",
+        "EMAIL_RATE_PER_MINUTE": "0",
+        "SHEETS_BACKEND": "memory",
+        "SHEETS_FAKE_LATENCY": str(args.sheets_latency),
+        "SPREADSHEET_ID": "bench",
+        "DB_ECHO": "false",
+    })
+    return env
+
+
+async def wait_until_ready(client, process, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Приложение завершилось при запуске, см. вывод uvicorn")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Приложение не запустилось за отведённое время")
+
+
+async def main(args):
+    api = FakeAPIServer(openai_latency=args.openai_latency, deepgram_latency=args.deepgram_latency)
+    smtp = FakeSMTPServer(latency=args.smtp_latency)
+    api_port = await api.start()
+    smtp_port = await smtp.start()
+
+    tmp_dir = None
+    database_url = args.database_url
+    if not database_url:
+        tmp_dir = tempfile.mkdtemp(prefix="aihr-bench-")
+        database_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+    env = app_environment(args, api_port, smtp_port, database_url)
+
+    # Приложение само таблицы не создаёт — схема готовится заранее, как при деплое
+    subprocess.run([sys.executable, "init_db.py"], cwd=ROOT, env=env, check=True)
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env
+    )
+
+    recorder = Recorder()
+    failed_flows = 0
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=120) as client:
+            await wait_until_ready(client, process)
+
+            slots = asyncio.Semaphore(args.concurrency)
+
+            async def guarded(index):
+                async with slots:
+                    return await run_flow(client, recorder, index, args.answers)
+
+            start = time.perf_counter()
+            results = await asyncio.gather(*(guarded(i) for i in range(args.candidates)), return_exceptions=True)
+            flows_elapsed = time.perf_counter() - start
+
+            finished = [result for result in results if not isinstance(result, BaseException)]
+            failed_flows = len(results) - len(finished)
+            for error in [result for result in results if isinstance(result, BaseException)][:5]:
+                print(f"❌ {error}")
+
+            if args.wait_reports:
+                deadline = time.perf_counter() + args.report_timeout
+                await asyncio.gather(*(
+                    wait_report(client, recorder, interview_id, finished_at, deadline)
+                    for interview_id, finished_at in finished
+                ))
+            total_elapsed = time.perf_counter() - start
+
+            metrics = (await client.get("/metrics")).text
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        await api.stop()
+        await smtp.stop()
+
+    result = {
+        "label": args.label,
+        "started_at": datetime.utcnow().isoformat() + "Z",
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": database_url.split("://", 1)[0],
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "database_url")},
+        "flows": {
+            "completed": len(finished),
+            "failed": failed_flows,
+            "elapsed_s": round(flows_elapsed, 2),
+            "throughput_flows_per_s": round(len(finished) / flows_elapsed, 2) if flows_elapsed else None,
+        },
+        "total_elapsed_s": round(total_elapsed, 2),
+        "endpoints": recorder.summary(flows_elapsed),
+        "fake_services": {**api.calls, "smtp_messages": smtp.messages},
+        "dependency_metrics": [
+            line for line in metrics.splitlines() if line.startswith("dependency_call_duration_seconds_sum")
+            or line.startswith("dependency_call_duration_seconds_count")
+        ],
+    }
+    # "report ready" считается не за время сценариев, а от завершения интервью
+    if "report ready" in result["endpoints"]:
+        result["endpoints"]["report ready"].pop("throughput_rps")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(result, file, ensure_ascii=False, indent=2)
+
+    print(f"{'Эндпоинт':34} {'count':>6} {'err':>4} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for endpoint, stats in result["endpoints"].items():
+        print(
+            f"{endpoint:34} {stats['count']:>6} {stats['errors']:>4} {stats.get('throughput_rps') or '-':>7} "
+            f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}"
+        )
+    print(f"✅ Сценариев: {len(finished)}, ошибок: {failed_flows}. Результат сохранён в {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,189 @@
+import os
+import csv
+import uuid
+import codecs
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import CandidateDB
+from schemas import CandidateCreate, CandidateResponse, BulkRegisterRowResult, BulkRegisterResponse
+from email_outbox import enqueue_interview_email
+from google_sheets import save_candidate_to_google_sheets
+
+FRONTEND_URL = os.getenv("FRONTEND_URL")  # URL фронтенда
+BULK_REGISTER_BATCH = int(os.getenv("BULK_REGISTER_BATCH", 500))  # Кандидатов в одной транзакции
+
+
+class CandidateImporter:
+    """
+    Пакетная регистрация кандидатов: проверка, удаление дублей по email,
+    вставка пачками и постановка писем и выгрузки в Google Sheets в очереди той же транзакцией.
+    """
+
+    def __init__(self, db: AsyncSession, batch_size: int = BULK_REGISTER_BATCH):
+        self.db = db
+        self.batch_size = batch_size
+        self.results = []
+        self._seen_emails = set()
+        self._batch = []
+
+    async def add(self, row: int, record):
+        """
+        Добавляет запись (словарь полей CandidateCreate); пачка записывается при заполнении.
+        """
+        try:
+            candidate = CandidateCreate.model_validate(record)
+        except ValidationError as e:
+            email = record.get("email") if isinstance(record, dict) else None
+            self.results.append(BulkRegisterRowResult(row=row, email=email, status="invalid", error=str(e)))
+            return
+
+        candidate.email = candidate.email.strip()
+        if candidate.email in self._seen_emails:
+            self.results.append(BulkRegisterRowResult(
+                row=row, email=candidate.email, status="duplicate", error="Email повторяется в пакете"
+            ))
+            return
+
+        self._seen_emails.add(candidate.email)
+        self._batch.append((row, candidate))
+        if len(self._batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+
+        result = await self.db.execute(
+            select(CandidateDB.email).where(CandidateDB.email.in_([candidate.email for _, candidate in batch]))
+        )
+        existing = set(result.scalars().all())
+
+        new_rows = []
+        for row, candidate in batch:
+            if candidate.email in existing:
+                self.results.append(BulkRegisterRowResult(
+                    row=row, email=candidate.email, status="duplicate", error="Кандидат с таким email уже зарегистрирован"
+                ))
+            else:
+                new_rows.append((row, self._build(candidate)))
+
+        try:
+            for _, new_candidate in new_rows:
+                self._add(new_candidate)
+            await self.db.commit()
+        except IntegrityError:
+            # Кто-то зарегистрировал тот же email параллельно — вставляем по одному
+            await self.db.rollback()
+            await self._insert_one_by_one(new_rows)
+            return
+
+        for row, new_candidate in new_rows:
+            self.results.append(self._created(row, new_candidate))
+
+    async def _insert_one_by_one(self, new_rows):
+        for row, new_candidate in new_rows:
+            try:
+                async with self.db.begin_nested():
+                    self._add(new_candidate)
+            except IntegrityError:
+                self.results.append(BulkRegisterRowResult(
+                    row=row, email=new_candidate.email, status="duplicate",
+                    error="Кандидат с таким email уже зарегистрирован"
+                ))
+                continue
+            self.results.append(self._created(row, new_candidate))
+        await self.db.commit()
+
+    def _build(self, candidate: CandidateCreate) -> CandidateDB:
+        interview_id = str(uuid.uuid4())
+        return CandidateDB(
+            id=interview_id,
+            name=candidate.name,
+            email=candidate.email,
+            phone=candidate.phone,
+            gender=candidate.gender,
+            interview_link=f"{FRONTEND_URL}/interview/{interview_id}",
+            role=candidate.role
+        )
+
+    def _add(self, new_candidate: CandidateDB):
+        self.db.add(new_candidate)
+        enqueue_interview_email(self.db, new_candidate.id, new_candidate.email, new_candidate.interview_link)
+        save_candidate_to_google_sheets(
+            new_candidate.id, new_candidate.name, new_candidate.email,
+            new_candidate.phone, new_candidate.gender, new_candidate.interview_link,
+            db=self.db
+        )
+
+    @staticmethod
+    def _created(row: int, new_candidate: CandidateDB) -> BulkRegisterRowResult:
+        return BulkRegisterRowResult(
+            row=row,
+            email=new_candidate.email,
+            status="created",
+            candidate=CandidateResponse.model_validate(new_candidate)
+        )
+
+    async def finish(self) -> BulkRegisterResponse:
+        await self.flush()
+        results = sorted(self.results, key=lambda result: result.row)
+        return BulkRegisterResponse(
+            created=sum(1 for result in results if result.status == "created"),
+            duplicates=sum(1 for result in results if result.status == "duplicate"),
+            invalid=sum(1 for result in results if result.status == "invalid"),
+            results=results
+        )
+
+
+def split_complete_records(text: str):
+    """
+    Делит текст на целые записи CSV и незавершённый хвост. Перевод строки внутри поля в кавычках
+    запись не завершает: поле открыто, пока число кавычек в записи нечётное ("" внутри поля — две кавычки).
+    """
+    lines = text.split("\n")
+    tail = lines.pop()
+    records, pending, quoted = [], [], False
+    for line in lines:
+        pending.append(line)
+        if line.count('"') % 2:
+            quoted = not quoted
+        if not quoted:
+            records.append("\n".join(pending))
+            pending = []
+    return records, "\n".join(pending + [tail])
+
+
+async def iter_csv_records(chunks):
+    """
+    Разбирает CSV по мере поступления байтов, не загружая файл целиком.
+    Первая строка — заголовок с полями name, email, phone, gender (и необязательным role).
+    Возвращает пары (номер строки данных, словарь полей).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    header = None
+    row = 0
+    tail = ""
+
+    async def parse(lines):
+        nonlocal header, row
+        for values in csv.reader(lines):
+            if not values:
+                continue
+            if header is None:
+                header = [value.strip() for value in values]
+                continue
+            row += 1
+            yield row, dict(zip(header, values))
+
+    async for chunk in chunks:
+        lines, tail = split_complete_records(tail + decoder.decode(chunk))
+        async for record in parse(lines):
+            yield record
+
+    tail += decoder.decode(b"", final=True)
+    if tail.strip():
+        async for record in parse([tail]):
+            yield record
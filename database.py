@@ -1,7 +1,9 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from metrics import instrument_engine
 
 # Получение URL базы данных из переменной окружения
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -9,15 +11,64 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("Переменная окружения DATABASE_URL не установлена! Убедитесь, что файл .env настроен.")
 
+# Настройки пула соединений
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # Ожидание свободного соединения, сек
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # Пересоздание соединений, сек
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"  # Печать всех SQL-запросов (отладка)
+
+
+def get_async_database_url(url: str) -> str:
+    """
+    Подставляет асинхронный драйвер: asyncpg для PostgreSQL, aiosqlite для SQLite.
+    """
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+
+# SQLite (локальный запуск и тесты) использует свой пул без настроек размера
+pool_options = {} if ASYNC_DATABASE_URL.startswith("sqlite") else {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+}
+
 try:
-    # Создание движка SQLAlchemy
-    engine = create_engine(DATABASE_URL, echo=True, pool_pre_ping=True)
+    # Создание движка SQLAlchemy (скрипты, миграции, фоновые потоки)
+    engine = create_engine(DATABASE_URL, echo=DB_ECHO, pool_pre_ping=True)
 
     # Создание фабрики сессий
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+    # Асинхронный движок для эндпоинтов FastAPI
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=DB_ECHO, pool_pre_ping=True, **pool_options)
+
+    # Время каждого запроса к БД попадает в /metrics
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+
+    # Фабрика асинхронных сессий
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
     # Базовый класс для моделей
     Base = declarative_base()
 
 except Exception as e:
     raise RuntimeError(f"Ошибка подключения к базе данных: {str(e)}")
+
+
+async def get_db():
+    """
+    Зависимость FastAPI: асинхронная сессия на время запроса.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,181 @@
+import os
+import time
+import random
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+from models import EmailOutboxDB
+from send_email import smtp_pool, build_interview_email, SMTP_POOL_SIZE
+
+# Настройки отправки
+EMAIL_RATE_PER_MINUTE = float(os.getenv("EMAIL_RATE_PER_MINUTE", 60))  # Лимит почтового провайдера
+EMAIL_BATCH = int(os.getenv("EMAIL_BATCH", 50))  # Писем за один проход
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 5))
+EMAIL_RETRY_DELAY = float(os.getenv("EMAIL_RETRY_DELAY", 30))  # Базовая задержка повтора, сек
+EMAIL_LEASE = float(os.getenv("EMAIL_LEASE", 600))  # Сколько секунд письмо закреплено за отправителем
+EMAIL_POLL_INTERVAL = float(os.getenv("EMAIL_POLL_INTERVAL", 2))
+
+
+def enqueue_interview_email(db: AsyncSession, candidate_id: str, email_to: str, interview_link: str) -> EmailOutboxDB:
+    """
+    Ставит письмо со ссылкой на интервью в очередь в транзакции регистрации.
+    """
+    subject, body = build_interview_email(interview_link)
+    email = EmailOutboxDB(
+        candidate_id=candidate_id,
+        email_to=email_to,
+        subject=subject,
+        body=body,
+        max_attempts=EMAIL_MAX_ATTEMPTS
+    )
+    db.add(email)
+    return email
+
+
+async def get_candidate_emails(db: AsyncSession, candidate_id: str):
+    result = await db.execute(
+        select(EmailOutboxDB)
+        .where(EmailOutboxDB.candidate_id == candidate_id)
+        .order_by(EmailOutboxDB.created_at)
+    )
+    return result.scalars().all()
+
+
+class RateLimiter:
+    """
+    Равномерный лимит: не больше rate_per_minute событий в минуту.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def _claimable_email(now: datetime):
+    return or_(
+        and_(EmailOutboxDB.status == "pending", EmailOutboxDB.next_attempt_at <= now),
+        and_(EmailOutboxDB.status == "sending", EmailOutboxDB.locked_until < now)
+    )
+
+
+async def claim_emails():
+    """
+    Забирает пачку писем к отправке; письма с истёкшей арендой возвращаются в работу.
+    Каждое письмо захватывается условным UPDATE: при нескольких отправителях (воркеры uvicorn, SQLite
+    без SELECT ... FOR UPDATE SKIP LOCKED) письмо достаётся только одному из них.
+    """
+    async with AsyncSessionLocal() as session:
+        now = datetime.utcnow()
+        candidates = (await session.execute(
+            select(EmailOutboxDB.id, EmailOutboxDB.email_to, EmailOutboxDB.subject, EmailOutboxDB.body)
+            .where(_claimable_email(now))
+            .order_by(EmailOutboxDB.next_attempt_at)
+            .limit(EMAIL_BATCH)
+        )).all()
+
+        claimed = []
+        for email in candidates:
+            result = await session.execute(
+                update(EmailOutboxDB)
+                .where(EmailOutboxDB.id == email.id, _claimable_email(now))
+                .values(
+                    status="sending",
+                    attempts=EmailOutboxDB.attempts + 1,
+                    locked_until=now + timedelta(seconds=EMAIL_LEASE)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            # 📌 Письмо уже забрал другой отправитель
+            if result.rowcount == 1:
+                claimed.append((email.id, email.email_to, email.subject, email.body))
+        await session.commit()
+        return claimed
+
+
+async def _mark_email(email_id: int, error: str = None):
+    async with AsyncSessionLocal() as session:
+        email = await session.get(EmailOutboxDB, email_id)
+        now = datetime.utcnow()
+        email.locked_until = None
+        email.last_error = error
+
+        if error is None:
+            email.status = "sent"
+            email.sent_at = now
+        elif email.attempts < email.max_attempts:
+            # 📌 Повторная попытка с экспоненциальной задержкой и джиттером
+            email.status = "pending"
+            delay = EMAIL_RETRY_DELAY * 2 ** (email.attempts - 1)
+            email.next_attempt_at = now + timedelta(seconds=delay * random.uniform(0.5, 1.0))
+        else:
+            email.status = "failed"
+
+        await session.commit()
+
+
+class EmailOutboxSender:
+    """
+    Фоновая отправка очереди писем через пул авторизованных SMTP-соединений
+    с соблюдением лимита EMAIL_RATE_PER_MINUTE.
+    """
+
+    def __init__(self):
+        self.rate_limiter = RateLimiter(EMAIL_RATE_PER_MINUTE)
+        self._slots = asyncio.Semaphore(SMTP_POOL_SIZE)
+        self._stop = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.to_thread(smtp_pool.close)
+
+    async def _send(self, email_id, email_to, subject, body):
+        async with self._slots:
+            await self.rate_limiter.acquire()
+            try:
+                await asyncio.to_thread(smtp_pool.send, email_to, subject, body)
+            except Exception as e:
+                print(f"❌ Ошибка отправки email на {email_to}: {e}")
+                await _mark_email(email_id, str(e))
+                return
+
+        print(f"✅ Email успешно отправлен на {email_to}")
+        await _mark_email(email_id)
+
+    async def _run(self):
+        while not self._stop.is_set():
+            try:
+                emails = await claim_emails()
+                await asyncio.gather(*(self._send(*email) for email in emails))
+            except Exception as e:
+                print(f"❌ Ошибка очереди писем: {e}")
+                emails = []
+
+            if len(emails) >= EMAIL_BATCH:
+                continue
+
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=EMAIL_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+email_outbox_sender = EmailOutboxSender()
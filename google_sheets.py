@@ -1,12 +1,19 @@
 import os
 import json
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import time
+import threading
 from fastapi import HTTPException
+from database import SessionLocal
+from models import SheetsOutboxDB
+from metrics import track
 
 # Переменные окружения
 GOOGLE_SHEETS_CREDENTIALS = os.getenv("GOOGLE_SHEETS_CREDENTIALS")
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
+SHEETS_BACKEND = os.getenv("SHEETS_BACKEND", "gspread")  # gspread / memory (бенчмарки и локальный запуск)
+SHEETS_FAKE_LATENCY = float(os.getenv("SHEETS_FAKE_LATENCY", 0))  # Задержка записи в memory-бэкенде, сек
+
+SCOPES = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 
 # Листы в Google Sheets
 SHEET_CANDIDATES = "Кандидаты"
@@ -14,23 +21,165 @@ SHEET_INTERVIEWS = "Интервью"
 SHEET_REPORTS = "Отчёты"
 SHEET_VIDEOS = "Видео"
 
+# Заголовки листов основной таблицы
+WORKSHEET_HEADERS = {
+    SHEET_CANDIDATES: ["Candidate ID", "Name", "Email", "Phone", "Gender", "Interview Link"],
+    SHEET_INTERVIEWS: ["Interview ID", "Candidate ID", "Status", "Questions", "Answers"],
+    SHEET_REPORTS: ["Interview ID", "Candidate ID", "Report"],
+    SHEET_VIDEOS: ["Interview ID", "Candidate ID", "Video URL"],
+}
+
+
+class GoogleSheetsSession:
+    """
+    Общее на процесс подключение к Google Sheets.
+    Авторизация выполняется один раз (токен сервисного аккаунта обновляется автоматически),
+    таблицы и листы кэшируются по имени, заголовки создаются один раз на лист.
+    """
+
+    def __init__(self, credentials_json):
+        self._credentials_json = credentials_json
+        self._client = None
+        self._spreadsheets = {}
+        self._worksheets = {}
+        self._lock = threading.RLock()
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                if not self._credentials_json:
+                    raise HTTPException(status_code=500, detail="Google Sheets credentials отсутствуют!")
+
+                # gspread и google-auth загружаются только при первом обращении к Google Sheets
+                import gspread
+                from google.oauth2.service_account import Credentials
+
+                creds = Credentials.from_service_account_info(json.loads(self._credentials_json), scopes=SCOPES)
+                with track("sheets", "authorize"):
+                    self._client = gspread.authorize(creds)
+            return self._client
+
+    def spreadsheet(self, key=None, name=None):
+        """
+        Таблица по ID (open_by_key) или по имени (open).
+        """
+        cache_key = ("key", key) if key else ("name", name)
+        with self._lock:
+            if cache_key not in self._spreadsheets:
+                client = self.client()
+                with track("sheets", "open_spreadsheet"):
+                    self._spreadsheets[cache_key] = client.open_by_key(key) if key else client.open(name)
+            return self._spreadsheets[cache_key]
+
+    def worksheet(self, sheet_name, headers, key=None):
+        """
+        Лист основной таблицы; создаётся с заголовками, если отсутствует.
+        """
+        key = key or SPREADSHEET_ID
+        cache_key = (key, sheet_name)
+        with self._lock:
+            if cache_key not in self._worksheets:
+                spreadsheet = self.spreadsheet(key=key)
+                with track("sheets", "open_worksheet"):
+                    self._worksheets[cache_key] = get_or_create_worksheet(spreadsheet, sheet_name, headers)
+            return self._worksheets[cache_key]
+
+    def first_worksheet(self, spreadsheet_name):
+        """
+        Первый лист таблицы, открытой по имени.
+        """
+        cache_key = ("name", spreadsheet_name)
+        with self._lock:
+            if cache_key not in self._worksheets:
+                spreadsheet = self.spreadsheet(name=spreadsheet_name)
+                with track("sheets", "open_worksheet"):
+                    self._worksheets[cache_key] = spreadsheet.sheet1
+            return self._worksheets[cache_key]
+
+    def invalidate(self):
+        """
+        Сбрасывает кэш таблиц и листов (например, после удаления листа вручную).
+        """
+        with self._lock:
+            self._spreadsheets.clear()
+            self._worksheets.clear()
+
+
+class MemoryWorksheet:
+    """
+    Лист в памяти с интерфейсом записи gspread.Worksheet.
+    """
+
+    def __init__(self, title, headers=None):
+        self.title = title
+        self.rows = [list(headers)] if headers else []
+        self._lock = threading.Lock()
+
+    def append_row(self, values):
+        self.append_rows([values])
+
+    def append_rows(self, values):
+        if SHEETS_FAKE_LATENCY:
+            time.sleep(SHEETS_FAKE_LATENCY)
+        with self._lock:
+            self.rows.extend(list(row) for row in values)
+
+
+class MemorySheetsSession:
+    """
+    Замена Google Sheets для бенчмарков и локального запуска: строки хранятся в памяти процесса.
+    """
+
+    def __init__(self):
+        self._worksheets = {}
+        self._lock = threading.RLock()
+
+    def spreadsheet(self, key=None, name=None):
+        return None
+
+    def worksheet(self, sheet_name, headers, key=None):
+        with self._lock:
+            return self._worksheets.setdefault((key or SPREADSHEET_ID, sheet_name), MemoryWorksheet(sheet_name, headers))
+
+    def first_worksheet(self, spreadsheet_name):
+        with self._lock:
+            return self._worksheets.setdefault(("name", spreadsheet_name), MemoryWorksheet(spreadsheet_name))
+
+    def invalidate(self):
+        pass
+
+
+sheets_session = MemorySheetsSession() if SHEETS_BACKEND == "memory" else GoogleSheetsSession(GOOGLE_SHEETS_CREDENTIALS)
+
 
 def connect_google_sheets():
     """
     Подключение к Google Sheets с использованием сервисного аккаунта.
     """
+    import gspread
+
     if not GOOGLE_SHEETS_CREDENTIALS or not SPREADSHEET_ID:
         raise HTTPException(status_code=500, detail="Google Sheets credentials или SPREADSHEET_ID отсутствуют!")
 
     try:
-        creds_dict = json.loads(GOOGLE_SHEETS_CREDENTIALS)
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(
-            creds_dict,
-            ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        )
-        client = gspread.authorize(creds)
-        sheet = client.open_by_key(SPREADSHEET_ID)
-        return sheet
+        return sheets_session.spreadsheet(key=SPREADSHEET_ID)
+    except gspread.exceptions.APIError as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка Google Sheets API: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка подключения к Google Sheets: {str(e)}")
+
+
+def get_worksheet(sheet_name, headers):
+    """
+    Возвращает закэшированный лист основной таблицы.
+    """
+    import gspread
+
+    if not GOOGLE_SHEETS_CREDENTIALS or not SPREADSHEET_ID:
+        raise HTTPException(status_code=500, detail="Google Sheets credentials или SPREADSHEET_ID отсутствуют!")
+
+    try:
+        return sheets_session.worksheet(sheet_name, headers)
     except gspread.exceptions.APIError as e:
         raise HTTPException(status_code=500, detail=f"Ошибка Google Sheets API: {str(e)}")
     except Exception as e:
@@ -41,6 +190,8 @@ def get_or_create_worksheet(sheet, sheet_name, headers):
     """
     Получает лист в Google Sheets или создаёт новый, если он отсутствует.
     """
+    import gspread
+
     try:
         worksheet = sheet.worksheet(sheet_name)
     except gspread.exceptions.WorksheetNotFound:
@@ -53,57 +204,79 @@ def append_row_safe(worksheet, row_data):
     """
     Добавляет строку в лист, заменяя None на 'Нет данных'.
     """
+    import gspread
+
     formatted_row = [cell if cell is not None else "Нет данных" for cell in row_data]
-    
+
     try:
-        worksheet.append_row(formatted_row)
+        with track("sheets", "append_row"):
+            worksheet.append_row(formatted_row)
     except gspread.exceptions.APIError as e:
+        sheets_session.invalidate()
         raise HTTPException(status_code=500, detail=f"Ошибка Google Sheets API при записи: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при записи данных в Google Sheets: {str(e)}")
 
 
-def save_candidate_to_google_sheets(candidate_id, name, email, phone, gender, interview_link):
+def resolve_worksheet(spreadsheet_name, sheet_name):
     """
-    Сохраняет данные о кандидате в лист 'Кандидаты'.
+    Лист для записи из очереди: лист основной таблицы или первый лист таблицы по имени.
     """
-    sheet = connect_google_sheets()
-    headers = ["Candidate ID", "Name", "Email", "Phone", "Gender", "Interview Link"]
-    worksheet = get_or_create_worksheet(sheet, SHEET_CANDIDATES, headers)
+    if spreadsheet_name is None:
+        return sheets_session.worksheet(sheet_name, WORKSHEET_HEADERS[sheet_name])
+    return sheets_session.first_worksheet(spreadsheet_name)
 
-    append_row_safe(worksheet, [candidate_id, name, email, phone, gender, interview_link])
 
-
-def save_interview_to_google_sheets(interview_id, candidate_id, status, questions, answers):
+def enqueue_row(sheet_name, row_data, spreadsheet_name=None, db=None):
     """
-    Сохраняет данные интервью в лист 'Интервью'.
+    Ставит строку в очередь выгрузки в Google Sheets, заменяя None на 'Нет данных'.
+    Если передана сессия БД — строка фиксируется вместе с её транзакцией.
     """
-    sheet = connect_google_sheets()
-    headers = ["Interview ID", "Candidate ID", "Status", "Questions", "Answers"]
-    worksheet = get_or_create_worksheet(sheet, SHEET_INTERVIEWS, headers)
+    formatted_row = [cell if cell is not None else "Нет данных" for cell in row_data]
+    entry = SheetsOutboxDB(
+        spreadsheet=spreadsheet_name,
+        worksheet=sheet_name,
+        row=json.dumps(formatted_row, ensure_ascii=False, default=str)
+    )
+
+    if db is not None:
+        db.add(entry)
+        return
 
-    append_row_safe(worksheet, [interview_id, candidate_id, status, questions, answers])
+    session = SessionLocal()
+    try:
+        session.add(entry)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
 
 
-def save_report_to_google_sheets(interview_id, candidate_id, report):
+def save_candidate_to_google_sheets(candidate_id, name, email, phone, gender, interview_link, db=None):
     """
-    Сохраняет отчёт по интервью в лист 'Отчёты'.
+    Ставит данные о кандидате в очередь на лист 'Кандидаты'.
     """
-    sheet = connect_google_sheets()
-    headers = ["Interview ID", "Candidate ID", "Report"]
-    worksheet = get_or_create_worksheet(sheet, SHEET_REPORTS, headers)
-
-    append_row_safe(worksheet, [interview_id, candidate_id, report])
+    enqueue_row(SHEET_CANDIDATES, [candidate_id, name, email, phone, gender, interview_link], db=db)
 
 
-def save_video_to_google_sheets(interview_id, candidate_id, video_url):
+def save_interview_to_google_sheets(interview_id, candidate_id, status, questions, answers, db=None):
     """
-    Сохраняет ссылку на видеозапись интервью в лист 'Видео'.
+    Ставит данные интервью в очередь на лист 'Интервью'.
     """
-    sheet = connect_google_sheets()
-    headers = ["Interview ID", "Candidate ID", "Video URL"]
-    worksheet = get_or_create_worksheet(sheet, SHEET_VIDEOS, headers)
+    enqueue_row(SHEET_INTERVIEWS, [interview_id, candidate_id, status, questions, answers], db=db)
 
-    append_row_safe(worksheet, [interview_id, candidate_id, video_url])
 
+def save_report_to_google_sheets(interview_id, candidate_id, report, db=None):
+    """
+    Ставит отчёт по интервью в очередь на лист 'Отчёты'.
+    """
+    enqueue_row(SHEET_REPORTS, [interview_id, candidate_id, report], db=db)
 
+
+def save_video_to_google_sheets(interview_id, candidate_id, video_url, db=None):
+    """
+    Ставит ссылку на видеозапись интервью в очередь на лист 'Видео'.
+    """
+    enqueue_row(SHEET_VIDEOS, [interview_id, candidate_id, video_url], db=db)
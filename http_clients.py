@@ -0,0 +1,51 @@
+import os
+import aiohttp
+import httpx
+
+# Настройки пулов соединений к внешним API
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 100))  # Максимум одновременных соединений
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 30))  # Сколько держать простаивающее соединение, сек
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 120))
+
+
+class HttpClients:
+    """
+    Общие HTTP-клиенты приложения с keep-alive пулами соединений.
+    Создаются при старте приложения и закрываются при остановке;
+    вне приложения (скрипты) создаются при первом обращении.
+    """
+
+    def __init__(self):
+        self._aiohttp = None
+        self._httpx = None
+
+    def aiohttp_session(self) -> aiohttp.ClientSession:
+        if self._aiohttp is None or self._aiohttp.closed:
+            self._aiohttp = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=HTTP_POOL_LIMIT, keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT),
+                timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+            )
+        return self._aiohttp
+
+    def httpx_client(self) -> httpx.AsyncClient:
+        if self._httpx is None or self._httpx.is_closed:
+            self._httpx = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=HTTP_POOL_LIMIT, keepalive_expiry=HTTP_KEEPALIVE_TIMEOUT),
+                timeout=HTTP_TIMEOUT
+            )
+        return self._httpx
+
+    async def start(self):
+        self.aiohttp_session()
+        self.httpx_client()
+
+    async def close(self):
+        if self._aiohttp is not None:
+            await self._aiohttp.close()
+            self._aiohttp = None
+        if self._httpx is not None:
+            await self._httpx.aclose()
+            self._httpx = None
+
+
+http_clients = HttpClients()
@@ -0,0 +1,78 @@
+import os
+import time
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from database import engine, Base, SessionLocal
+import models  # noqa: F401 — регистрирует таблицы в Base.metadata
+from interview_turns import migrate_legacy_interviews
+from interview_search import ensure_search_index, backfill_search_index
+
+# База может подниматься одновременно с приложением — ждём её ограниченное время
+INIT_DB_RETRIES = int(os.getenv("INIT_DB_RETRIES", 10))
+INIT_DB_RETRY_DELAY = float(os.getenv("INIT_DB_RETRY_DELAY", 3))
+
+
+def upgrade_schema(connection):
+    """
+    Досоздаёт в существующих таблицах новые колонки (как nullable) и индексы:
+    create_all создаёт только отсутствующие таблицы.
+    """
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                print(f"✅ Добавлена колонка {table.name}.{column.name}")
+
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(connection)
+                print(f"✅ Создан индекс {index.name}")
+
+    # Интервью, созданные до появления created_at, получают время миграции
+    connection.execute(
+        text("UPDATE interviews SET created_at = :now WHERE created_at IS NULL"), {"now": datetime.utcnow()}
+    )
+
+
+def init_db():
+    """
+    Подготовка схемы: создание таблиц, новых колонок и индексов, перенос старых интервью в interview_turns,
+    поисковый индекс.
+    Запускается один раз перед стартом воркеров (start.sh), а не при импорте приложения.
+    """
+    for attempt in range(1, INIT_DB_RETRIES + 1):
+        try:
+            Base.metadata.create_all(bind=engine)
+            with engine.begin() as connection:
+                upgrade_schema(connection)
+            break
+        except OperationalError as e:
+            if attempt == INIT_DB_RETRIES:
+                raise RuntimeError(f"База данных недоступна: {e}")
+            print(f"❌ База данных недоступна (попытка {attempt}/{INIT_DB_RETRIES}), повтор через {INIT_DB_RETRY_DELAY} с")
+            time.sleep(INIT_DB_RETRY_DELAY)
+
+    session = SessionLocal()
+    try:
+        migrated = migrate_legacy_interviews(session)
+    finally:
+        session.close()
+
+    # Полнотекстовый поиск: таблица зависит от СУБД, поэтому создаётся отдельно от create_all
+    with engine.begin() as connection:
+        ensure_search_index(connection)
+        indexed = backfill_search_index(connection)
+
+    print(f"✅ Схема БД готова, перенесено интервью: {migrated}, добавлено в поисковый индекс: {indexed}")
+
+
+if __name__ == "__main__":
+    init_db()
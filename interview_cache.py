@@ -0,0 +1,115 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from models import InterviewDB
+from schemas import InterviewResponse
+from interview_turns import transcript_from_turns, interview_response
+
+# Настройки кэша чтения интервью
+INTERVIEW_CACHE_TTL = float(os.getenv("INTERVIEW_CACHE_TTL", 2))  # Время жизни записи, сек
+INTERVIEW_CACHE_SIZE = int(os.getenv("INTERVIEW_CACHE_SIZE", 2048))  # Интервью в памяти
+
+
+class CachedInterview(NamedTuple):
+    etag: str
+    body: bytes
+
+
+class InterviewReadCache:
+    """
+    Короткоживущий кэш ответов GET /interview/{id} в памяти процесса.
+    Запись сбрасывается при любом изменении интервью в этом процессе;
+    изменения из других процессов становятся видны не позже чем через INTERVIEW_CACHE_TTL.
+    """
+
+    def __init__(self, maxsize: int = INTERVIEW_CACHE_SIZE, ttl: float = INTERVIEW_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        # Счётчик сбросов: ответ, прочитанный до сброса, не попадёт в кэш
+        self._generation = 0
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, interview_id: str):
+        with self._lock:
+            item = self._items.get(interview_id)
+            if not item:
+                return None
+
+            cached, expires_at = item
+            if expires_at < time.monotonic():
+                del self._items[interview_id]
+                return None
+
+            self._items.move_to_end(interview_id)
+            return cached
+
+    def set(self, interview_id: str, response: InterviewResponse, generation: int = None) -> CachedInterview:
+        body = response.model_dump_json().encode("utf-8")
+        cached = CachedInterview(etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"', body=body)
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return cached
+
+            self._items[interview_id] = (cached, time.monotonic() + self.ttl)
+            self._items.move_to_end(interview_id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return cached
+
+    def invalidate(self, *interview_ids: str):
+        with self._lock:
+            self._generation += 1
+            for interview_id in interview_ids:
+                self._items.pop(interview_id, None)
+
+
+interview_cache = InterviewReadCache()
+
+
+async def get_cached_interview(db: AsyncSession, interview_id: str):
+    """
+    Ответ по интервью из кэша или одним запросом (интервью вместе с репликами).
+    Возвращает None, если интервью ещё не начато.
+    """
+    cached = interview_cache.get(interview_id)
+    if cached is not None:
+        return cached
+
+    generation = interview_cache.generation()
+    result = await db.execute(
+        select(InterviewDB)
+        .options(joinedload(InterviewDB.turns))
+        .where(InterviewDB.id == interview_id)
+    )
+    interview = result.unique().scalars().first()
+    if interview is None:
+        return None
+
+    questions, answers = transcript_from_turns(interview, interview.turns)
+    return interview_cache.set(interview_id, interview_response(interview, questions, answers), generation)
+
+
+def etag_response(request: Request, cached: CachedInterview) -> Response:
+    """
+    304 без тела, если у клиента актуальная версия (If-None-Match), иначе JSON с ETag.
+    """
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if cached.etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+
+    return Response(content=cached.body, media_type="application/json", headers=headers)
@@ -0,0 +1,87 @@
+import json
+import base64
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from models import CandidateDB, InterviewDB
+from schemas import InterviewListItem, InterviewListResponse
+
+INTERVIEW_LIST_MAX_LIMIT = 200
+
+
+def encode_cursor(created_at: datetime, interview_id: str) -> str:
+    payload = json.dumps([created_at.isoformat(), interview_id])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, interview_id = json.loads(payload)
+        return datetime.fromisoformat(created_at), str(interview_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+async def list_interviews(
+    db: AsyncSession,
+    status: str = None,
+    candidate_id: str = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    cursor: str = None,
+    limit: int = 50
+) -> InterviewListResponse:
+    """
+    Страница интервью от новых к старым с keyset-пагинацией по (created_at, id):
+    каждая страница — один проход по индексу без OFFSET.
+    Тексты вопросов, ответов и отчёта не загружаются.
+    """
+    limit = max(1, min(limit, INTERVIEW_LIST_MAX_LIMIT))
+
+    query = (
+        select(InterviewDB, CandidateDB.name, CandidateDB.email, InterviewDB.report.isnot(None).label("has_report"))
+        .join(CandidateDB, CandidateDB.id == InterviewDB.candidate_id)
+        .options(load_only(
+            InterviewDB.id, InterviewDB.candidate_id, InterviewDB.status,
+            InterviewDB.created_at, InterviewDB.video_url
+        ))
+    )
+
+    if status:
+        query = query.where(InterviewDB.status == status)
+    if candidate_id:
+        query = query.where(InterviewDB.candidate_id == candidate_id)
+    if created_from:
+        query = query.where(InterviewDB.created_at >= created_from)
+    if created_to:
+        query = query.where(InterviewDB.created_at < created_to)
+    if cursor:
+        query = query.where(tuple_(InterviewDB.created_at, InterviewDB.id) < tuple_(*decode_cursor(cursor)))
+
+    # Одна лишняя строка показывает, есть ли следующая страница
+    query = query.order_by(InterviewDB.created_at.desc(), InterviewDB.id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+
+    items = [
+        InterviewListItem(
+            id=interview.id,
+            candidate_id=interview.candidate_id,
+            candidate_name=name,
+            candidate_email=email,
+            status=interview.status,
+            created_at=interview.created_at,
+            has_report=bool(has_report),
+            video_url=interview.video_url
+        )
+        for interview, name, email, has_report in rows[:limit]
+    ]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return InterviewListResponse(items=items, next_cursor=next_cursor)
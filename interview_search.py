@@ -0,0 +1,223 @@
+import os
+import re
+from sqlalchemy import text, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from schemas import InterviewSearchResult, InterviewSearchResponse
+
+# Полнотекстовый индекс интервью: одна строка на интервью, текст реплик и отчёт.
+# PostgreSQL — tsvector (русская морфология) в генерируемой колонке с GIN-индексом,
+# SQLite (локальный запуск) — виртуальная таблица FTS5.
+SEARCH_TABLE = "interview_search"
+SEARCH_BACKFILL_BATCH = int(os.getenv("SEARCH_BACKFILL_BATCH", 500))  # Интервью за один проход заполнения индекса
+
+POSTGRES_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+        interview_id VARCHAR PRIMARY KEY REFERENCES interviews(id) ON DELETE CASCADE,
+        transcript TEXT NOT NULL DEFAULT '',
+        report TEXT NOT NULL DEFAULT '',
+        document TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('russian', report), 'A') || setweight(to_tsvector('russian', transcript), 'B')
+        ) STORED
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)",
+]
+
+SQLITE_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        interview_id UNINDEXED, transcript, report, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+]
+
+# Окончания для упрощённого стемминга в SQLite: в FTS5 нет русского стеммера,
+# поэтому слово запроса обрезается до основы и ищется по префиксу
+RUSSIAN_ENDINGS = sorted([
+    "ость", "ости", "остью", "остей", "ениями", "ениях", "ение", "ения", "ению", "ением", "ении",
+    "ами", "ями", "ого", "его", "ому", "ему", "ыми", "ими", "ых", "их", "ой", "ей", "ий", "ый", "ая", "яя",
+    "ое", "ее", "ые", "ие", "ом", "ем", "ам", "ям", "ах", "ях", "ов", "ев", "ую", "юю",
+    "ть", "ла", "ло", "ли", "ет", "ит", "ут", "ют", "ат", "ят",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+], key=len, reverse=True)
+
+MIN_STEM_LENGTH = 4
+
+
+def _dialect(db: AsyncSession) -> str:
+    return db.bind.dialect.name
+
+
+def ensure_search_index(connection):
+    """
+    Создаёт таблицу и индекс полнотекстового поиска (init_db.py).
+    """
+    ddl = SQLITE_DDL if connection.dialect.name == "sqlite" else POSTGRES_DDL
+    for statement in ddl:
+        connection.execute(text(statement))
+
+
+def backfill_search_index(connection, batch: int = SEARCH_BACKFILL_BATCH) -> int:
+    """
+    Добавляет в индекс интервью, которых в нём ещё нет (созданные до появления поиска).
+    Выбираются только такие интервью, реплики читаются пачками по batch интервью.
+    """
+    # В FTS5 interview_id не индексируется: подзапрос NOT IN вычисляется один раз,
+    # в PostgreSQL NOT EXISTS выполняется как anti-join по первичному ключу
+    if connection.dialect.name == "sqlite":
+        missing = f"i.id NOT IN (SELECT interview_id FROM {SEARCH_TABLE})"
+    else:
+        missing = f"NOT EXISTS (SELECT 1 FROM {SEARCH_TABLE} s WHERE s.interview_id = i.id)"
+    select_interviews = text(
+        f"SELECT i.id, i.questions, i.answers, i.report FROM interviews i WHERE {missing} ORDER BY i.id LIMIT :limit"
+    )
+    select_turns = text(
+        "SELECT interview_id, question, answer FROM interview_turns "
+        "WHERE interview_id IN :ids ORDER BY interview_id, sequence"
+    ).bindparams(bindparam("ids", expanding=True))
+
+    added = 0
+    while True:
+        # Добавленные интервью в следующую пачку уже не попадают
+        interviews = connection.execute(select_interviews, {"limit": batch}).all()
+        if not interviews:
+            return added
+
+        transcripts = {}
+        for interview_id, question, answer in connection.execute(select_turns, {"ids": [row[0] for row in interviews]}):
+            transcripts.setdefault(interview_id, []).extend(part for part in (question, answer) if part)
+
+        connection.execute(
+            text(f"INSERT INTO {SEARCH_TABLE} (interview_id, transcript, report) VALUES (:id, :transcript, :report)"),
+            [
+                {
+                    "id": interview_id,
+                    "transcript": "\n".join(transcripts.get(interview_id) or [part for part in (questions, answers) if part]),
+                    "report": report or ""
+                }
+                for interview_id, questions, answers, report in interviews
+            ]
+        )
+        added += len(interviews)
+
+
+async def _upsert(db: AsyncSession, interview_id: str, column: str, value: str, append: bool):
+    params = {"id": interview_id, "value": value, "separator": "\n"}
+
+    if _dialect(db) == "postgresql":
+        new_value = f"{SEARCH_TABLE}.{column} || :separator || EXCLUDED.{column}" if append else f"EXCLUDED.{column}"
+        await db.execute(text(f"""
+            INSERT INTO {SEARCH_TABLE} (interview_id, {column}) VALUES (:id, :value)
+            ON CONFLICT (interview_id) DO UPDATE SET {column} = {new_value}
+        """), params)
+        return
+
+    # FTS5 не поддерживает ON CONFLICT: обновление, а если строки нет — вставка
+    assignment = f"{column} = {column} || :separator || :value" if append else f"{column} = :value"
+    result = await db.execute(text(f"UPDATE {SEARCH_TABLE} SET {assignment} WHERE interview_id = :id"), params)
+    if result.rowcount == 0:
+        await db.execute(text(f"INSERT INTO {SEARCH_TABLE} (interview_id, {column}) VALUES (:id, :value)"), params)
+
+
+async def _index(db: AsyncSession, interview_id: str, column: str, value: str, append: bool):
+    # Ошибка индексации не должна откатывать сам ответ или отчёт
+    try:
+        async with db.begin_nested():
+            await _upsert(db, interview_id, column, value, append)
+    except Exception as e:
+        print(f"❌ Ошибка обновления поискового индекса интервью {interview_id}: {e}")
+
+
+async def index_turn(db: AsyncSession, interview_id: str, question: str = None, answer: str = None):
+    """
+    Дописывает реплику в поисковый индекс интервью в текущей транзакции.
+    """
+    value = "\n".join(part for part in (question, answer) if part)
+    if value:
+        await _index(db, interview_id, "transcript", value, append=True)
+
+
+async def index_report(db: AsyncSession, interview_id: str, report: str):
+    """
+    Заменяет отчёт в поисковом индексе интервью в текущей транзакции.
+    """
+    await _index(db, interview_id, "report", report or "", append=False)
+
+
+def stem(word: str) -> str:
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def to_fts5_query(query: str) -> str:
+    """
+    Запрос для FTS5: каждое слово — префикс по основе, OR сохраняется, остальные слова через AND.
+    """
+    terms = []
+    for word in re.findall(r"\w+", query.lower()):
+        terms.append("OR" if word == "or" else f'"{stem(word)}"*')
+    while terms and terms[0] == "OR":
+        terms.pop(0)
+    while terms and terms[-1] == "OR":
+        terms.pop()
+    return " ".join(terms)
+
+
+async def search_interviews(db: AsyncSession, query: str, status: str = None, limit: int = 20) -> InterviewSearchResponse:
+    """
+    Поиск по репликам и отчётам: результаты по релевантности (совпадения в отчёте весят больше)
+    с подсвеченным фрагментом текста.
+    """
+    params = {"limit": limit, "status": status}
+    status_filter = "AND i.status = :status" if status else ""
+
+    if _dialect(db) == "postgresql":
+        params["query"] = query
+        sql = f"""
+            SELECT s.interview_id, i.candidate_id, c.name, i.status,
+                   ts_rank(s.document, q) AS rank,
+                   ts_headline('russian', s.report || ' … ' || s.transcript, q,
+                               'StartSel=<b>, StopSel=</b>, MaxFragments=2, MaxWords=30, MinWords=10') AS snippet
+            FROM {SEARCH_TABLE} s
+            JOIN interviews i ON i.id = s.interview_id
+            JOIN candidates c ON c.id = i.candidate_id,
+                 websearch_to_tsquery('russian', :query) q
+            WHERE s.document @@ q {status_filter}
+            ORDER BY rank DESC
+            LIMIT :limit
+        """
+    else:
+        params["query"] = to_fts5_query(query)
+        if not params["query"]:
+            return InterviewSearchResponse(query=query, results=[])
+        # bm25: меньше — релевантнее; вес отчёта выше, чем у реплик
+        sql = f"""
+            SELECT {SEARCH_TABLE}.interview_id, i.candidate_id, c.name, i.status,
+                   -bm25({SEARCH_TABLE}, 0.0, 1.0, 2.0) AS rank,
+                   CASE WHEN instr(snippet({SEARCH_TABLE}, 2, '<b>', '</b>', '…', 24), '<b>') > 0
+                        THEN snippet({SEARCH_TABLE}, 2, '<b>', '</b>', '…', 24)
+                        ELSE snippet({SEARCH_TABLE}, 1, '<b>', '</b>', '…', 24)
+                   END AS snippet
+            FROM {SEARCH_TABLE}
+            JOIN interviews i ON i.id = {SEARCH_TABLE}.interview_id
+            JOIN candidates c ON c.id = i.candidate_id
+            WHERE {SEARCH_TABLE} MATCH :query {status_filter}
+            ORDER BY rank DESC
+            LIMIT :limit
+        """
+
+    rows = (await db.execute(text(sql), params)).all()
+    return InterviewSearchResponse(query=query, results=[
+        InterviewSearchResult(
+            interview_id=interview_id,
+            candidate_id=candidate_id,
+            candidate_name=name,
+            status=status,
+            rank=float(rank),
+            snippet=snippet
+        )
+        for interview_id, candidate_id, name, status, rank, snippet in rows
+    ])
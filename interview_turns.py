@@ -0,0 +1,125 @@
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import InterviewDB, InterviewTurnDB
+from schemas import InterviewResponse
+from interview_search import index_turn
+
+# Сколько раз повторять вставку при гонке за номер реплики
+TURN_INSERT_RETRIES = 5
+
+
+async def append_turn(db: AsyncSession, interview_id: str, question: str = None, answer: str = None) -> InterviewTurnDB:
+    """
+    Добавляет реплику в конец интервью.
+    Номер реплики защищён уникальным индексом: при одновременной записи
+    проигравшая вставка откатывается до savepoint и повторяется со следующим номером.
+    """
+    for _ in range(TURN_INSERT_RETRIES):
+        last_sequence = await db.scalar(
+            select(func.max(InterviewTurnDB.sequence))
+            .where(InterviewTurnDB.interview_id == interview_id)
+        )
+        turn = InterviewTurnDB(
+            interview_id=interview_id,
+            sequence=(last_sequence or 0) + 1,
+            question=question,
+            answer=answer
+        )
+        try:
+            async with db.begin_nested():
+                db.add(turn)
+        except IntegrityError:
+            continue
+
+        # Реплика сразу попадает в полнотекстовый индекс в той же транзакции
+        await index_turn(db, interview_id, question, answer)
+        return turn
+
+    raise HTTPException(status_code=409, detail="Не удалось сохранить реплику интервью, повторите запрос")
+
+
+async def get_transcript(db: AsyncSession, interview: InterviewDB):
+    """
+    Собирает вопросы и ответы интервью из реплик.
+    Для интервью, ещё не перенесённых в interview_turns, возвращает старые текстовые поля.
+    """
+    result = await db.execute(
+        select(InterviewTurnDB)
+        .where(InterviewTurnDB.interview_id == interview.id)
+        .order_by(InterviewTurnDB.sequence)
+    )
+    return transcript_from_turns(interview, result.scalars().all())
+
+
+def transcript_from_turns(interview: InterviewDB, turns):
+    """
+    Вопросы и ответы из уже загруженных реплик (например, через joinedload(InterviewDB.turns)).
+    """
+    if not turns:
+        return interview.questions, interview.answers
+
+    questions = "\n".join(turn.question for turn in turns if turn.question)
+    answers = "\n".join(turn.answer for turn in turns if turn.answer)
+    return questions or None, answers or None
+
+
+async def build_interview_response(db: AsyncSession, interview: InterviewDB) -> InterviewResponse:
+    questions, answers = await get_transcript(db, interview)
+    return interview_response(interview, questions, answers)
+
+
+def interview_response(interview: InterviewDB, questions, answers) -> InterviewResponse:
+    return InterviewResponse(
+        id=interview.id,
+        candidate_id=interview.candidate_id,
+        status=interview.status,
+        questions=questions,
+        answers=answers,
+        report=interview.report,
+        video_url=interview.video_url
+    )
+
+
+def migrate_legacy_interviews(session: Session) -> int:
+    """
+    Переносит вопросы и ответы из InterviewDB.questions / answers в interview_turns.
+    Интервью, у которых уже есть реплики, пропускаются, поэтому миграцию можно запускать повторно.
+    """
+    migrated = 0
+    has_turns = session.query(InterviewTurnDB.id).filter(InterviewTurnDB.interview_id == InterviewDB.id).exists()
+    legacy = (
+        session.query(InterviewDB)
+        .filter(~has_turns)
+        .filter((InterviewDB.questions.isnot(None)) | (InterviewDB.answers.isnot(None)))
+        .all()
+    )
+
+    for interview in legacy:
+        sequence = 0
+        if interview.questions:
+            sequence += 1
+            session.add(InterviewTurnDB(interview_id=interview.id, sequence=sequence, question=interview.questions))
+
+        # Ответы дописывались через перевод строки
+        for line in (interview.answers or "").split("\n"):
+            if line.strip():
+                sequence += 1
+                session.add(InterviewTurnDB(interview_id=interview.id, sequence=sequence, answer=line))
+
+        migrated += 1
+
+    session.commit()
+    return migrated
+
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        count = migrate_legacy_interviews(session)
+        print(f"✅ Перенесено интервью: {count}")
+    finally:
+        session.close()
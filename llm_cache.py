@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from database import AsyncSessionLocal
+from models import LLMCacheDB
+from llm_scheduler import llm_scheduler
+
+# Настройки кэша
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 512))  # Записей в памяти
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 3600))  # Время жизни в памяти, сек
+LLM_CACHE_DB_TTL = float(os.getenv("LLM_CACHE_DB_TTL", 30 * 24 * 3600))  # Время жизни в БД, сек
+
+
+def cache_key(model: str, messages, **params) -> str:
+    """
+    Ключ кэша: SHA-256 от модели, сообщений и параметров запроса.
+    Ответы других бэкендов (фейковый LLM) хранятся под своими ключами и не подменяют ответы OpenAI.
+    """
+    payload = {"model": model, "messages": messages, "params": params}
+    # Ключи OpenAI не меняются — накопленный кэш остаётся в силе
+    backend = getattr(llm_scheduler.backend, "name", "openai")
+    if backend != "openai":
+        payload["backend"] = backend
+    payload = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Двухуровневый кэш ответов LLM: LRU с TTL в памяти процесса и таблица llm_cache в БД.
+    Одинаковые запросы, пришедшие одновременно, выполняются один раз.
+    """
+
+    def __init__(self, maxsize: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL, db_ttl: float = LLM_CACHE_DB_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.db_ttl = db_ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "bypassed": 0, "db_errors": 0}
+
+    def _get_memory(self, key):
+        with self._lock:
+            item = self._memory.get(key)
+            if not item:
+                return None
+
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._memory[key]
+                return None
+
+            self._memory.move_to_end(key)
+            return value
+
+    def _set_memory(self, key, value):
+        with self._lock:
+            self._memory[key] = (value, time.monotonic() + self.ttl)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    async def get(self, key):
+        value = self._get_memory(key)
+        if value is not None:
+            self.counters["memory_hits"] += 1
+            return value
+
+        try:
+            async with AsyncSessionLocal() as session:
+                entry = await session.get(LLMCacheDB, key)
+        except Exception as e:
+            # Недоступный кэш считается промахом — ответ запрашивается у LLM
+            self.counters["db_errors"] += 1
+            print(f"❌ Ошибка чтения кэша LLM: {e}")
+            return None
+
+        if entry and entry.created_at >= datetime.utcnow() - timedelta(seconds=self.db_ttl):
+            self.counters["db_hits"] += 1
+            self._set_memory(key, entry.response)
+            return entry.response
+
+        return None
+
+    async def set(self, key, model, value):
+        self._set_memory(key, value)
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.merge(LLMCacheDB(key=key, model=model, response=value, created_at=datetime.utcnow()))
+                await session.commit()
+        except Exception as e:
+            # Ответ уже получен — сбой записи в кэш не должен его терять
+            print(f"❌ Ошибка записи в кэш LLM: {e}")
+
+    async def get_or_create(self, key, model, producer, bypass: bool = False):
+        """
+        Возвращает ответ из кэша или вызывает producer() и сохраняет результат.
+        bypass=True — принудительная перегенерация: кэш не читается, но обновляется.
+        """
+        if bypass:
+            self.counters["bypassed"] += 1
+        else:
+            value = await self.get(key)
+            if value is not None:
+                return value
+
+            # Такой же запрос уже выполняется — ждём его результат
+            if key in self._inflight:
+                return await asyncio.shield(self._inflight[key])
+
+            self.counters["misses"] += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight.setdefault(key, future)
+        try:
+            value = await producer()
+            await self.set(key, model, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение уже передано ожидающим, помечаем его как обработанное
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def stats(self):
+        with self._lock:
+            size = len(self._memory)
+        return {**self.counters, "memory_size": size, "memory_maxsize": self.maxsize}
+
+
+completion_cache = CompletionCache()
@@ -0,0 +1,521 @@
+import os
+import re
+import json
+import time
+import zlib
+import heapq
+import random
+import asyncio
+import itertools
+from functools import lru_cache
+from typing import NamedTuple
+from metrics import track
+
+# Лимиты аккаунта OpenAI; уточняются по заголовкам x-ratelimit-* из ответов
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", 500))  # Запросов в минуту
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", 30000))  # Токенов в минуту
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+LLM_RETRY_DELAY = float(os.getenv("LLM_RETRY_DELAY", 1))  # Базовая задержка повтора, сек
+LLM_MAX_RETRY_DELAY = float(os.getenv("LLM_MAX_RETRY_DELAY", 60))
+LLM_COMPLETION_TOKENS = int(os.getenv("LLM_COMPLETION_TOKENS", 1000))  # Оценка длины ответа для бюджета TPM
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")  # openai / fake
+LLM_FAKE_LATENCY = float(os.getenv("LLM_FAKE_LATENCY", 0))
+FAKE_EMBEDDING_DIMENSIONS = 256
+
+# Цены моделей, $ за 1M токенов (запрос, ответ); LLM_PRICES — JSON вида {"gpt-4o": [2.5, 10]}
+LLM_PRICES = {
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "text-embedding-3-small": (0.02, 0.0),
+    **json.loads(os.getenv("LLM_PRICES", "{}")),
+}
+
+# Приоритеты: живое интервью обслуживается раньше отчётов и перегенераций
+INTERACTIVE = 0
+BATCH = 1
+
+
+@lru_cache(maxsize=1)
+def _token_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Без tiktoken считаем приблизительно: ~3 символа кириллицы на токен
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _token_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // 3 + 1
+
+
+def count_message_tokens(messages) -> int:
+    # ~4 служебных токена на сообщение
+    return sum(count_tokens(message.get("content") or "") + 4 for message in messages)
+
+
+class LLMResult(NamedTuple):
+    content: str
+    headers: dict
+    total_tokens: int = None
+    prompt_tokens: int = None
+    completion_tokens: int = None
+
+
+def usage_cost(usage) -> float:
+    """
+    Стоимость в $ по расходу токенов {модель: {"prompt_tokens", "completion_tokens"}}; неизвестные модели — 0.
+    """
+    cost = 0.0
+    for model, tokens in usage.items():
+        prompt_price, completion_price = LLM_PRICES.get(model, (0.0, 0.0))
+        cost += (tokens["prompt_tokens"] * prompt_price + tokens["completion_tokens"] * completion_price) / 1_000_000
+    return cost
+
+
+class RetryableLLMError(Exception):
+    """
+    Временная ошибка провайдера (429, 5xx, обрыв соединения); заголовки — для паузы до сброса лимита.
+    """
+
+    def __init__(self, message, status_code=None, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def parse_duration(value) -> float:
+    """
+    Длительность из заголовков OpenAI: "20ms", "1s", "6m0s", "1h2m3.5s" или число секунд.
+    """
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", str(value))
+    return sum(float(number) * units[unit] for number, unit in parts) if parts else None
+
+
+def _header(headers, name):
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+class MinuteBudget:
+    """
+    Бюджет на минуту с равномерным пополнением (RPM или TPM).
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.available = per_minute
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self, now):
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        self._refill(now)
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        # Запрос больше всего бюджета ждёт полного бюджета, а не вечно
+        needed = min(amount, self.capacity)
+        if self.available >= needed:
+            return 0.0
+        return (needed - self.available) * 60 / self.capacity
+
+    def take(self, amount: float):
+        self.available -= amount
+
+    def sync(self, limit, remaining, reset, now):
+        """
+        Подстраивается под фактические лимиты из заголовков ответа.
+        """
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self._refill(now)
+            self.available = min(self.available, float(remaining))
+            if float(remaining) <= 0 and reset:
+                self._blocked_until = max(self._blocked_until, now + reset)
+
+    def block(self, seconds: float, now: float):
+        self._blocked_until = max(self._blocked_until, now + seconds)
+
+
+class OpenAIBackend:
+    """
+    Запросы к OpenAI с заголовками ответа (для лимитов). Собственные повторы SDK отключены —
+    повторяет планировщик.
+    """
+
+    name = "openai"
+
+    def __init__(self, api_key: str = OPENAI_API_KEY):
+        self.api_key = api_key
+        self._client = None
+
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        return self._client
+
+    def _wrap_error(self, error):
+        import openai
+
+        if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+            return RetryableLLMError(str(error))
+        if isinstance(error, openai.APIStatusError) and (error.status_code == 429 or error.status_code >= 500):
+            return RetryableLLMError(str(error), error.status_code, dict(error.response.headers))
+        return None
+
+    async def _create(self, create, **params):
+        try:
+            return await create(**params)
+        except Exception as e:
+            wrapped = self._wrap_error(e)
+            if wrapped is not None:
+                raise wrapped from e
+            raise
+
+    async def chat(self, model, messages, **params) -> LLMResult:
+        raw = await self._create(
+            self.client().chat.completions.with_raw_response.create, model=model, messages=messages, **params
+        )
+        response = raw.parse()
+        usage = getattr(response, "usage", None)
+        return LLMResult(
+            response.choices[0].message.content, dict(raw.headers), getattr(usage, "total_tokens", None),
+            getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+        )
+
+    async def embed(self, model, texts) -> LLMResult:
+        """
+        Эмбеддинги текстов; content — список векторов в порядке texts.
+        """
+        raw = await self._create(self.client().embeddings.with_raw_response.create, model=model, input=texts)
+        response = raw.parse()
+        usage = getattr(response, "usage", None)
+        vectors = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        return LLMResult(
+            vectors, dict(raw.headers), getattr(usage, "total_tokens", None), getattr(usage, "prompt_tokens", None), 0
+        )
+
+    async def stream(self, model, messages, **params):
+        """
+        Возвращает заголовки и асинхронный итератор текстовых фрагментов.
+        """
+        raw = await self._create(
+            self.client().chat.completions.with_raw_response.create, model=model, messages=messages, stream=True, **params
+        )
+
+        async def deltas():
+            try:
+                async for chunk in raw.parse():
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yield delta
+            except Exception as e:
+                wrapped = self._wrap_error(e)
+                if wrapped is not None:
+                    raise wrapped from e
+                raise
+
+        return dict(raw.headers), deltas()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class FakeLLMBackend:
+    """
+    Детерминированная замена OpenAI для тестов и бенчмарков: ответ строится из последнего сообщения,
+    первые fail_first запросов завершаются 429 с заголовком retry-after-ms.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0, fail_first: int = 0, responder=None):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.responder = responder
+        self.calls = []
+
+    def _respond(self, model, messages):
+        self.calls.append((model, messages))
+        if len(self.calls) <= self.fail_first:
+            raise RetryableLLMError("Rate limit exceeded", 429, {"retry-after-ms": "10"})
+        if self.responder is not None:
+            return self.responder(model, messages)
+        prompt = messages[-1]["content"].strip() if messages else ""
+        return f"[{model}] Ответ на запрос из {len(prompt)} символов: {prompt[:80]}"
+
+    def _headers(self):
+        return {
+            "x-ratelimit-limit-requests": str(int(OPENAI_RPM)),
+            "x-ratelimit-remaining-requests": str(int(OPENAI_RPM)),
+            "x-ratelimit-limit-tokens": str(int(OPENAI_TPM)),
+            "x-ratelimit-remaining-tokens": str(int(OPENAI_TPM)),
+        }
+
+    async def chat(self, model, messages, **params) -> LLMResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        content = self._respond(model, messages)
+        prompt_tokens, completion_tokens = count_message_tokens(messages), count_tokens(content)
+        return LLMResult(content, self._headers(), prompt_tokens + completion_tokens, prompt_tokens, completion_tokens)
+
+    async def stream(self, model, messages, **params):
+        content = self._respond(model, messages)
+
+        async def deltas():
+            for word in content.split(" "):
+                if self.latency:
+                    await asyncio.sleep(self.latency / 10)
+                yield word + " "
+
+        return self._headers(), deltas()
+
+    async def embed(self, model, texts) -> LLMResult:
+        """
+        Хэширование слов (по первым 5 буквам) в вектор: близкие по словам тексты получают близкие векторы.
+        """
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls.append((model, texts))
+        vectors = []
+        for text in texts:
+            vector = [0.0] * FAKE_EMBEDDING_DIMENSIONS
+            for word in re.findall(r"\w+", text.lower()):
+                vector[zlib.crc32(word[:5].encode("utf-8")) % FAKE_EMBEDDING_DIMENSIONS] += 1.0
+            vectors.append(vector)
+        tokens = sum(count_tokens(text) for text in texts)
+        return LLMResult(vectors, self._headers(), tokens, tokens, 0)
+
+    async def close(self):
+        pass
+
+
+class LLMScheduler:
+    """
+    Общий планировщик исходящих запросов к LLM:
+    - соблюдает бюджеты RPM и TPM и уточняет их по заголовкам x-ratelimit-*;
+    - при 429 приостанавливает все запросы до retry-after и повторяет с экспоненциальной задержкой и джиттером;
+    - запросы INTERACTIVE обслуживаются раньше BATCH.
+    """
+
+    def __init__(self, backend, rpm: float = OPENAI_RPM, tpm: float = OPENAI_TPM,
+                 max_retries: int = LLM_MAX_RETRIES, seed: int = None):
+        self.backend = backend
+        self.requests = MinuteBudget(rpm)
+        self.tokens = MinuteBudget(tpm)
+        self.max_retries = max_retries
+        self._random = random.Random(seed)
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._condition = None
+        self.counters = {"requests": 0, "retries": 0, "rate_limited": 0, "failed": 0}
+        self.usage = {}  # Расход токенов по моделям (для потоковых ответов — по подсчёту токенов текста)
+
+    def _get_condition(self):
+        # Condition создаётся в работающем event loop, а не при импорте
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def _acquire(self, priority: int, tokens: int):
+        condition = self._get_condition()
+        entry = (priority, next(self._sequence))
+        async with condition:
+            heapq.heappush(self._waiting, entry)
+            condition.notify_all()
+            try:
+                while True:
+                    timeout = None
+                    if self._waiting[0] == entry:
+                        now = time.monotonic()
+                        timeout = max(self.requests.delay(1, now), self.tokens.delay(tokens, now))
+                        if timeout <= 0:
+                            heapq.heappop(self._waiting)
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            condition.notify_all()
+                            return
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    condition.notify_all()
+                raise
+
+    def _observe(self, headers, estimated, actual=None):
+        now = time.monotonic()
+        if actual is not None:
+            # Поправка бюджета на фактический расход токенов
+            self.tokens.take(actual - estimated)
+        self.requests.sync(
+            _header(headers, "x-ratelimit-limit-requests"),
+            _header(headers, "x-ratelimit-remaining-requests"),
+            parse_duration(_header(headers, "x-ratelimit-reset-requests")),
+            now
+        )
+        self.tokens.sync(
+            _header(headers, "x-ratelimit-limit-tokens"),
+            _header(headers, "x-ratelimit-remaining-tokens"),
+            parse_duration(_header(headers, "x-ratelimit-reset-tokens")),
+            now
+        )
+
+    def _record_usage(self, model, result: LLMResult):
+        usage = self.usage.setdefault(model, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0})
+        usage["requests"] += 1
+        usage["prompt_tokens"] += result.prompt_tokens or 0
+        usage["completion_tokens"] += result.completion_tokens or 0
+
+    def _retry_delay(self, error: RetryableLLMError, attempt: int) -> float:
+        retry_after_ms = _header(error.headers, "retry-after-ms")
+        retry_after = parse_duration(_header(error.headers, "retry-after"))
+        if retry_after_ms is not None:
+            retry_after = float(retry_after_ms) / 1000
+
+        if retry_after is not None:
+            # Сервер сообщил, когда сбросится лимит; джиттер разводит повторы разных запросов
+            return retry_after + self._random.uniform(0, LLM_RETRY_DELAY)
+        return min(LLM_MAX_RETRY_DELAY, LLM_RETRY_DELAY * 2 ** attempt) * self._random.uniform(0.5, 1.0)
+
+    async def _run(self, request, model, messages, priority, max_tokens):
+        estimated = count_message_tokens(messages) + (LLM_COMPLETION_TOKENS if max_tokens is None else max_tokens)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority, estimated)
+            self.counters["requests"] += 1
+            try:
+                return await request(), estimated
+            except RetryableLLMError as e:
+                if e.status_code == 429:
+                    self.counters["rate_limited"] += 1
+                if attempt == self.max_retries:
+                    self.counters["failed"] += 1
+                    raise
+
+                delay = self._retry_delay(e, attempt)
+                self._observe(e.headers, estimated)
+                if e.status_code == 429:
+                    # Лимит общий для процесса: пауза для всех запросов, не только для этого
+                    now = time.monotonic()
+                    self.requests.block(delay, now)
+                    self.tokens.block(delay, now)
+                self.counters["retries"] += 1
+                print(f"❌ OpenAI {e.status_code or 'ошибка соединения'}: повтор через {delay:.1f} с ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+    async def chat(self, model, messages, priority: int = BATCH, max_tokens: int = None, **params) -> str:
+        """
+        Один запрос к модели, возвращает текст ответа.
+        """
+        if max_tokens is not None:
+            params["max_tokens"] = max_tokens
+
+        async def request():
+            with track("openai", model):
+                return await self.backend.chat(model, messages, **params)
+
+        result, estimated = await self._run(request, model, messages, priority, max_tokens)
+        self._observe(result.headers, estimated, result.total_tokens)
+        self._record_usage(model, result)
+        return result.content
+
+    async def stream(self, model, messages, priority: int = BATCH, max_tokens: int = None, **params):
+        """
+        Потоковый запрос: повторяется, пока не получен первый фрагмент (ошибки подключения и начала ответа).
+        Возвращает асинхронный итератор текстовых фрагментов; расход токенов учитывается по окончании потока.
+        """
+        if max_tokens is not None:
+            params["max_tokens"] = max_tokens
+
+        async def request():
+            with track("openai", f"{model}:connect"):
+                headers, deltas = await self.backend.stream(model, messages, **params)
+                try:
+                    first = await deltas.__anext__()
+                except StopAsyncIteration:
+                    first = None
+                return headers, deltas, first
+
+        (headers, deltas, first), estimated = await self._run(request, model, messages, priority, max_tokens)
+
+        async def chunks():
+            parts = []
+            try:
+                if first is None:
+                    return
+                parts.append(first)
+                yield first
+                async for delta in deltas:
+                    parts.append(delta)
+                    yield delta
+            finally:
+                # 📌 Оборванный поток тоже оплачен: учитываем то, что успели получить
+                prompt_tokens, completion_tokens = count_message_tokens(messages), count_tokens("".join(parts))
+                total_tokens = prompt_tokens + completion_tokens
+                self._observe(headers, estimated, total_tokens)
+                self._record_usage(model, LLMResult("".join(parts), headers, total_tokens, prompt_tokens, completion_tokens))
+
+        return chunks()
+
+    async def embed(self, model, texts, priority: int = BATCH):
+        """
+        Эмбеддинги списка текстов одним запросом, возвращает список векторов.
+        """
+        async def request():
+            with track("openai", f"{model}:embed"):
+                return await self.backend.embed(model, texts)
+
+        # Для бюджета TPM тексты считаются как сообщения без ответа модели
+        messages = [{"content": text} for text in texts]
+        result, estimated = await self._run(request, model, messages, priority, 0)
+        self._observe(result.headers, estimated, result.total_tokens)
+        self._record_usage(model, result)
+        return result.content
+
+    def stats(self):
+        return {
+            **self.counters,
+            "waiting": len(self._waiting),
+            "rpm_limit": self.requests.capacity,
+            "tpm_limit": self.tokens.capacity,
+            "usage": self.usage,
+            "cost_usd": round(usage_cost(self.usage), 4),
+        }
+
+    async def close(self):
+        await self.backend.close()
+
+
+def create_llm_backend():
+    """
+    Бэкенд LLM по настройке LLM_BACKEND.
+    """
+    if LLM_BACKEND == "fake":
+        return FakeLLMBackend(latency=LLM_FAKE_LATENCY)
+    return OpenAIBackend()
+
+
+llm_scheduler = LLMScheduler(create_llm_backend())
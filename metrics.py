@@ -0,0 +1,127 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import event
+
+# Границы корзин: от запросов к БД (миллисекунды) до генерации отчёта (минуты)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP-запросы в обработке", ["method"]
+)
+
+DEPENDENCY_SECONDS = Histogram(
+    "dependency_call_duration_seconds", "Время обращения к внешней зависимости",
+    ["service", "operation"], buckets=LATENCY_BUCKETS
+)
+DEPENDENCY_ERRORS = Counter(
+    "dependency_call_errors_total", "Ошибки обращений к внешним зависимостям", ["service", "operation"]
+)
+DEPENDENCY_IN_FLIGHT = Gauge(
+    "dependency_calls_in_flight", "Обращения к внешним зависимостям в процессе", ["service"]
+)
+
+NEXT_QUESTION_GAP_SECONDS = Histogram(
+    "next_question_gap_seconds", "Пауза от окончательного ответа до первого фрагмента следующего вопроса",
+    ["source"], buckets=LATENCY_BUCKETS
+)
+
+
+@contextmanager
+def track(service: str, operation: str):
+    """
+    Замеряет обращение к внешней зависимости (openai, deepgram, sheets, smtp, livekit, db).
+    Работает и в синхронном коде, и вокруг await в корутинах.
+    """
+    DEPENDENCY_IN_FLIGHT.labels(service).inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        DEPENDENCY_ERRORS.labels(service, operation).inc()
+        raise
+    finally:
+        DEPENDENCY_SECONDS.labels(service, operation).observe(time.perf_counter() - start)
+        DEPENDENCY_IN_FLIGHT.labels(service).dec()
+
+
+def _statement_kind(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].lower() if words else "unknown"
+
+
+def instrument_engine(engine):
+    """
+    Подписывается на события движка SQLAlchemy: каждый запрос к БД попадает в метрики service="db".
+    Для асинхронного движка передаётся async_engine.sync_engine.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+        DEPENDENCY_IN_FLIGHT.labels("db").inc()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DEPENDENCY_SECONDS.labels("db", _statement_kind(statement)).observe(elapsed)
+        DEPENDENCY_IN_FLIGHT.labels("db").dec()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+            DEPENDENCY_IN_FLIGHT.labels("db").dec()
+        DEPENDENCY_ERRORS.labels("db", _statement_kind(context.statement or "")).inc()
+
+
+class MetricsMiddleware:
+    """
+    HTTP-middleware: время до заголовков ответа, статус и число запросов в обработке по шаблону маршрута.
+    Чистый ASGI: не буферизует потоковые ответы и пропускает http.response.pathsend.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        HTTP_REQUESTS_IN_PROGRESS.labels(method).inc()
+        start = time.perf_counter()
+        observed = False
+
+        def observe(status):
+            nonlocal observed
+            if observed:
+                return
+            observed = True
+            # Шаблон маршрута известен только после роутинга; без него метки не размножаются по ID
+            matched = scope.get("route")
+            route = matched.path if matched is not None else "unmatched"
+            HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(time.perf_counter() - start)
+
+        async def send_observed(message):
+            if message["type"] == "http.response.start":
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_observed)
+        finally:
+            observe(500)
+            HTTP_REQUESTS_IN_PROGRESS.labels(method).dec()
+
+
+def render_metrics():
+    """
+    Метрики процесса в текстовом формате Prometheus.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
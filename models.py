@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, Text, ForeignKey, Integer
+from datetime import datetime
+from sqlalchemy import Column, String, Text, ForeignKey, Integer, DateTime, Boolean, Index, UniqueConstraint, LargeBinary, Float, BigInteger
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from database import Base
@@ -15,6 +16,7 @@ class CandidateDB(Base):
     phone = Column(String, nullable=False)
     gender = Column(String, nullable=False)
     interview_link = Column(String, nullable=False)
+    role = Column(String, nullable=True)  # Роль (вакансия) — раздел банка вопросов
 
     # Связь с интервью
     interviews = relationship("InterviewDB", back_populates="candidate", cascade="all, delete-orphan")
@@ -29,10 +31,254 @@ class InterviewDB(Base):
     id = Column(String, primary_key=True, index=True)  # ID в виде UUID
     candidate_id = Column(String, ForeignKey("candidates.id", ondelete="CASCADE"), nullable=False)
     status = Column(String, default="in_progress", nullable=False)
-    questions = Column(Text, nullable=True)
-    answers = Column(Text, nullable=True)
+    questions = Column(Text, nullable=True)  # Устаревшее поле, вопросы хранятся в interview_turns
+    answers = Column(Text, nullable=True)  # Устаревшее поле, ответы хранятся в interview_turns
     report = Column(Text, nullable=True)
     video_url = Column(String, nullable=True)
+    video_storage_key = Column(String, nullable=True)  # Видео, загруженное на сервер: ключ в хранилище
+    video_size = Column(BigInteger, nullable=True)
+    video_content_type = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Связь с кандидатом
     candidate = relationship("CandidateDB", back_populates="interviews")
+
+    # Реплики интервью в порядке следования
+    turns = relationship(
+        "InterviewTurnDB", back_populates="interview", cascade="all, delete-orphan",
+        order_by="InterviewTurnDB.sequence"
+    )
+
+    # Задачи генерации отчёта
+    report_jobs = relationship("ReportJobDB", back_populates="interview", cascade="all, delete-orphan")
+
+    # Структурированная оценка по отчёту
+    scores = relationship("ReportScoresDB", back_populates="interview", cascade="all, delete-orphan", uselist=False)
+
+    # Индексы под список интервью: фильтр + сортировка (created_at, id) для keyset-пагинации
+    __table_args__ = (
+        Index("ix_interviews_created_at_id", "created_at", "id"),
+        Index("ix_interviews_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_interviews_candidate_id_created_at_id", "candidate_id", "created_at", "id"),
+    )
+
+
+class InterviewTurnDB(Base):
+    """
+    Реплики интервью: вопрос или ответ кандидата, только добавление
+    """
+    __tablename__ = "interview_turns"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    interview_id = Column(String, ForeignKey("interviews.id", ondelete="CASCADE"), nullable=False)
+    sequence = Column(Integer, nullable=False)  # Порядковый номер внутри интервью
+    question = Column(Text, nullable=True)
+    answer = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Связь с интервью
+    interview = relationship("InterviewDB", back_populates="turns")
+
+    __table_args__ = (
+        UniqueConstraint("interview_id", "sequence", name="uq_interview_turns_interview_sequence"),
+    )
+
+
+class ReportJobDB(Base):
+    """
+    Очередь задач генерации отчёта (queued / running / failed / done)
+    """
+    __tablename__ = "report_jobs"
+
+    id = Column(String, primary_key=True, index=True)  # ID в виде UUID
+    interview_id = Column(String, ForeignKey("interviews.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(String, default="queued", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    bypass_cache = Column(Boolean, default=False, nullable=False)  # Принудительная перегенерация без кэша LLM
+    error = Column(Text, nullable=True)
+    next_run_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Когда задачу можно брать в работу
+    locked_until = Column(DateTime, nullable=True)  # Аренда задачи воркером
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    # Связь с интервью
+    interview = relationship("InterviewDB", back_populates="report_jobs")
+
+    __table_args__ = (
+        Index("ix_report_jobs_status_next_run_at", "status", "next_run_at"),
+    )
+
+
+class SheetsOutboxDB(Base):
+    """
+    Очередь строк на выгрузку в Google Sheets (pending / sending / sent / failed)
+    """
+    __tablename__ = "sheets_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    spreadsheet = Column(String, nullable=True)  # Имя таблицы; None — основная таблица SPREADSHEET_ID
+    worksheet = Column(String, nullable=True)  # Имя листа; None — первый лист таблицы
+    row = Column(Text, nullable=False)  # Значения строки в JSON
+    status = Column(String, default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_until = Column(DateTime, nullable=True)  # Аренда строки выгрузкой
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_sheets_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class LLMCacheDB(Base):
+    """
+    Постоянный кэш ответов LLM по хэшу (модель, сообщения, параметры)
+    """
+    __tablename__ = "llm_cache"
+
+    key = Column(String(64), primary_key=True)  # SHA-256 от запроса
+    model = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class EmailOutboxDB(Base):
+    """
+    Очередь писем кандидатам (pending / sending / sent / failed)
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    candidate_id = Column(String, ForeignKey("candidates.id", ondelete="CASCADE"), nullable=True, index=True)
+    email_to = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String, default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_until = Column(DateTime, nullable=True)  # Аренда письма отправителем
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class QuestionBankDB(Base):
+    """
+    Банк вопросов интервью по ролям и компетенциям с эмбеддингами для поиска ближайшего вопроса
+    """
+    __tablename__ = "question_bank"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    role = Column(String, nullable=False)
+    competency = Column(String, nullable=True)
+    text = Column(Text, nullable=False)
+    embedding = Column(LargeBinary, nullable=True)  # Вектор float32; None — ещё не посчитан
+    embedding_model = Column(String, nullable=True)  # Модель, которой посчитан вектор
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)  # Для сверки версии банка между процессами
+
+    __table_args__ = (
+        UniqueConstraint("role", "text", name="uq_question_bank_role_text"),
+    )
+
+
+class ReportRegenerationRunDB(Base):
+    """
+    Запуск пакетной перегенерации отчётов (running / done), счётчики копятся между возобновлениями
+    """
+    __tablename__ = "report_regeneration_runs"
+
+    id = Column(String, primary_key=True, index=True)  # ID в виде UUID
+    status = Column(String, default="running", nullable=False)
+    filters = Column(Text, nullable=False)  # Условия выборки интервью в JSON
+    bypass_cache = Column(Boolean, default=False, nullable=False)
+    total = Column(Integer, default=0, nullable=False)
+    done = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    cost_usd = Column(Float, default=0.0, nullable=False)
+    elapsed_seconds = Column(Float, default=0.0, nullable=False)  # Время обработки без пауз между запусками
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    items = relationship("ReportRegenerationItemDB", back_populates="run", cascade="all, delete-orphan")
+
+
+class ReportRegenerationItemDB(Base):
+    """
+    Контрольная точка перегенерации: интервью запуска (pending / done / failed)
+    """
+    __tablename__ = "report_regeneration_items"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(String, ForeignKey("report_regeneration_runs.id", ondelete="CASCADE"), nullable=False)
+    interview_id = Column(String, ForeignKey("interviews.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String, default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    run = relationship("ReportRegenerationRunDB", back_populates="items")
+
+    __table_args__ = (
+        UniqueConstraint("run_id", "interview_id", name="uq_report_regeneration_items_run_interview"),
+        Index("ix_report_regeneration_items_run_id_status_id", "run_id", "status", "id"),
+    )
+
+
+class ReportScoresDB(Base):
+    """
+    Структурированная оценка интервью рядом с текстом отчёта: баллы, вердикт, сильные стороны
+    """
+    __tablename__ = "report_scores"
+
+    interview_id = Column(String, ForeignKey("interviews.id", ondelete="CASCADE"), primary_key=True)
+    hard_skills = Column(Integer, nullable=False)  # 1–5
+    soft_skills = Column(Integer, nullable=False)  # 1–5
+    overall_score = Column(Float, nullable=False)  # Среднее hard и soft skills
+    verdict = Column(Boolean, nullable=False)  # Подходит ли кандидат
+    strengths = Column(Text, nullable=True)  # Список в JSON
+    growth_areas = Column(Text, nullable=True)  # Список в JSON
+    model = Column(String, nullable=True)  # Модель, выставившая оценку
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Связь с интервью
+    interview = relationship("InterviewDB", back_populates="scores")
+
+    # Индексы под рейтинг: сортировка по баллу (и фильтр по вердикту) без чтения всей таблицы
+    __table_args__ = (
+        Index("ix_report_scores_overall_score", "overall_score", "interview_id"),
+        Index("ix_report_scores_hard_skills", "hard_skills", "overall_score", "interview_id"),
+        Index("ix_report_scores_soft_skills", "soft_skills", "overall_score", "interview_id"),
+        Index("ix_report_scores_verdict_overall_score", "verdict", "overall_score", "interview_id"),
+    )
+
+
+class VideoUploadDB(Base):
+    """
+    Загрузка видео интервью по частям (uploading / completed / aborted)
+    """
+    __tablename__ = "video_uploads"
+
+    id = Column(String, primary_key=True, index=True)  # ID в виде UUID
+    interview_id = Column(String, ForeignKey("interviews.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(String, default="uploading", nullable=False)
+    storage_key = Column(String, nullable=False)  # Ключ недогруженного файла в хранилище
+    content_type = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)  # Ожидаемый размер файла
+    uploaded = Column(BigInteger, default=0, nullable=False)  # Принято байт; с этого смещения продолжается загрузка
+    sha256 = Column(String, nullable=True)  # Ожидаемая контрольная сумма всего файла
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -0,0 +1,191 @@
+import os
+import time
+import asyncio
+from difflib import SequenceMatcher
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import InterviewTurnDB
+from interview_turns import append_turn
+from llm_scheduler import llm_scheduler, INTERACTIVE
+from text_stream import TextStream
+from metrics import NEXT_QUESTION_GAP_SECONDS
+from question_bank import question_bank, load_question_context
+
+# Настройки генерации следующего вопроса
+NEXT_QUESTION_MODEL = os.getenv("NEXT_QUESTION_MODEL", "gpt-4o-mini")
+NEXT_QUESTION_MAX_TOKENS = int(os.getenv("NEXT_QUESTION_MAX_TOKENS", 150))
+NEXT_QUESTION_CONTEXT_TURNS = int(os.getenv("NEXT_QUESTION_CONTEXT_TURNS", 6))  # Последних реплик в промте
+NEXT_QUESTION_MIN_WORDS = int(os.getenv("NEXT_QUESTION_MIN_WORDS", 8))  # С какой длины ответа начинать заранее
+NEXT_QUESTION_RESPECULATE_WORDS = int(os.getenv("NEXT_QUESTION_RESPECULATE_WORDS", 12))  # Новых слов для перезапуска
+NEXT_QUESTION_REUSE_SIMILARITY = float(os.getenv("NEXT_QUESTION_REUSE_SIMILARITY", 0.8))  # Сходство с финальным ответом
+
+
+# 📌 Промт для следующего вопроса
+def build_next_question_messages(history, answer):
+    dialog = "\n".join(history) if history else "Нет данных"
+    prompt = f"""
+Ты — AI-HR Эмили и проводишь интервью с кандидатом.
+Последние реплики интервью:
+{dialog}
+
+Кандидат только что ответил:
+{answer}
+
+Задай один следующий вопрос: уточни детали из ответа или перейди к новой теме,
+если тема раскрыта. Только текст вопроса, одно-два предложения, без вступлений.
+"""
+    return [{"role": "user", "content": prompt}]
+
+
+async def load_recent_turns(db: AsyncSession, interview_id: str, limit: int = NEXT_QUESTION_CONTEXT_TURNS):
+    """
+    Последние реплики интервью в виде строк "Вопрос: ..." / "Ответ: ..." в хронологическом порядке.
+    """
+    result = await db.execute(
+        select(InterviewTurnDB)
+        .where(InterviewTurnDB.interview_id == interview_id)
+        .order_by(InterviewTurnDB.sequence.desc())
+        .limit(limit)
+    )
+    history = []
+    for turn in reversed(result.scalars().all()):
+        if turn.question:
+            history.append(f"Вопрос: {turn.question}")
+        if turn.answer:
+            history.append(f"Ответ: {turn.answer}")
+    return history
+
+
+def _similarity(draft: str, final: str) -> float:
+    return SequenceMatcher(None, draft.lower(), final.lower()).ratio()
+
+
+class NextQuestionEngine:
+    """
+    Следующий вопрос для живого интервью.
+    Вопрос берётся из банка вопросов роли, а если похожего там нет — генерируется LLM.
+    Пока кандидат говорит, вопрос подбирается заранее по промежуточной расшифровке;
+    когда приходит окончательный ответ, близкий к черновику, готовый (или уже идущий) поток
+    отдаётся сразу, иначе подбор запускается заново.
+    """
+
+    def __init__(self, interview_id: str, history=None, role: str = None, asked=None):
+        self.interview_id = interview_id
+        self.history = list(history or [])
+        self.role = role
+        self.asked = set(asked or [])
+        self._draft = None
+        self._stream = None
+        self._task = None
+        self.counters = {"speculations": 0, "reused": 0, "discarded": 0}
+
+    def _start(self, answer: str):
+        stream = TextStream(self.interview_id)
+        messages = build_next_question_messages(self.history, answer)
+
+        async def produce():
+            try:
+                match = await question_bank.match(self.role, answer, self.asked)
+                if match is not None:
+                    await stream.publish(match.text)
+                    await stream.finish()
+                    return
+                deltas = await llm_scheduler.stream(
+                    NEXT_QUESTION_MODEL, messages, priority=INTERACTIVE, max_tokens=NEXT_QUESTION_MAX_TOKENS
+                )
+                async for delta in deltas:
+                    await stream.publish(delta)
+                await stream.finish()
+            except asyncio.CancelledError:
+                await stream.finish("cancelled")
+                raise
+            except Exception as e:
+                await stream.finish(str(e))
+
+        self._draft = answer
+        self._stream = stream
+        self._task = asyncio.create_task(produce())
+
+    def _discard(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._draft = self._stream = self._task = None
+
+    def on_interim(self, text: str):
+        """
+        Промежуточная расшифровка ответа: при достаточном приросте текста черновик вопроса перезапускается.
+        """
+        words = len(text.split())
+        if words < NEXT_QUESTION_MIN_WORDS:
+            return
+        if self._draft is not None and words - len(self._draft.split()) < NEXT_QUESTION_RESPECULATE_WORDS:
+            return
+
+        if self._draft is not None:
+            self.counters["discarded"] += 1
+        self._discard()
+        self.counters["speculations"] += 1
+        self._start(text)
+
+    async def on_final(self, answer: str):
+        """
+        Окончательный ответ: отдаёт фрагменты следующего вопроса по мере генерации.
+        """
+        started = time.perf_counter()
+        reused = (
+            self._draft is not None
+            and self._stream.error is None
+            and _similarity(self._draft, answer) >= NEXT_QUESTION_REUSE_SIMILARITY
+        )
+        if reused:
+            self.counters["reused"] += 1
+        else:
+            if self._draft is not None:
+                self.counters["discarded"] += 1
+            self._discard()
+            self._start(answer)
+
+        stream = self._stream
+        first = True
+        async for _, chunk in stream.follow():
+            if first:
+                NEXT_QUESTION_GAP_SECONDS.labels("speculative" if reused else "fresh").observe(time.perf_counter() - started)
+                first = False
+            yield chunk
+
+        self._draft = self._stream = self._task = None
+        if stream.error:
+            raise RuntimeError(stream.error)
+
+        question = "".join(stream.chunks).strip()
+        self.asked.add(question)
+        self.history.extend([f"Ответ: {answer}", f"Вопрос: {question}"])
+        self.history = self.history[-NEXT_QUESTION_CONTEXT_TURNS:]
+
+    def close(self):
+        self._discard()
+
+
+async def generate_next_question(db: AsyncSession, interview_id: str, answer: str) -> str:
+    """
+    Следующий вопрос без потока (REST-ответ): из банка вопросов или от LLM,
+    добавляется репликой в текущей транзакции.
+    """
+    started = time.perf_counter()
+    role, asked = await load_question_context(db, interview_id)
+    match = await question_bank.match(role, answer, asked)
+    if match is not None:
+        question = match.text
+    else:
+        history = await load_recent_turns(db, interview_id)
+        # Сам ответ уже сохранён репликой и передаётся в промт отдельно
+        if history and history[-1] == f"Ответ: {answer}":
+            history = history[:-1]
+        question = await llm_scheduler.chat(
+            NEXT_QUESTION_MODEL, build_next_question_messages(history, answer),
+            priority=INTERACTIVE, max_tokens=NEXT_QUESTION_MAX_TOKENS
+        )
+    NEXT_QUESTION_GAP_SECONDS.labels("fresh").observe(time.perf_counter() - started)
+    question = question.strip()
+    await append_turn(db, interview_id, question=question)
+    return question
@@ -0,0 +1,260 @@
+import os
+import time
+import asyncio
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import CandidateDB, InterviewDB, InterviewTurnDB, QuestionBankDB
+from database import AsyncSessionLocal
+from llm_scheduler import llm_scheduler, INTERACTIVE, BATCH
+
+# Банк вопросов: вопросы по ролям и компетенциям, эмбеддинги считаются один раз при загрузке.
+# Следующий вопрос — ближайший к ответу кандидата; LLM вызывается, только если похожего вопроса нет.
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+QUESTION_BANK_MIN_SIMILARITY = float(os.getenv("QUESTION_BANK_MIN_SIMILARITY", 0.5))  # Косинусное сходство
+QUESTION_BANK_DEFAULT_ROLE = os.getenv("QUESTION_BANK_DEFAULT_ROLE")  # Роль для кандидатов без роли; None — весь банк
+QUESTION_BANK_EMBED_BATCH = int(os.getenv("QUESTION_BANK_EMBED_BATCH", 256))  # Текстов в одном запросе эмбеддингов
+QUESTION_BANK_CHECK_INTERVAL = float(os.getenv("QUESTION_BANK_CHECK_INTERVAL", 10))  # Как часто сверять версию банка с БД, сек
+
+
+def question_key(text: str) -> str:
+    # Один и тот же вопрос с другим регистром или пробелами считается уже заданным
+    return " ".join(text.lower().split())
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class BankMatch(NamedTuple):
+    id: int
+    role: str
+    competency: str
+    text: str
+    score: float
+
+
+class QuestionIndex:
+    """
+    Индекс банка в памяти: нормированная матрица float32 (вопрос × измерение), поиск — одно умножение
+    на вектор ответа. Строки каждой роли выделены заранее, чтобы не копировать матрицу на каждый запрос.
+    """
+
+    def __init__(self, rows, vectors: np.ndarray):
+        self.ids = [row.id for row in rows]
+        self.roles = [row.role for row in rows]
+        self.competencies = [row.competency for row in rows]
+        self.texts = [row.text for row in rows]
+        self.keys = np.array([question_key(row.text) for row in rows], dtype=object)
+        self.vectors = _normalize(vectors.astype(np.float32, copy=False))
+
+        self._by_role = {}
+        for role in set(self.roles):
+            positions = np.flatnonzero(np.array(self.roles, dtype=object) == role)
+            self._by_role[role] = (positions, self.vectors[positions])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, vector, role: str = None, exclude=()) -> BankMatch:
+        """
+        Ближайший вопрос роли (или всего банка), кроме вопросов из exclude.
+        """
+        if role is not None:
+            if role not in self._by_role:
+                return None
+            positions, matrix = self._by_role[role]
+        else:
+            positions, matrix = np.arange(len(self.ids)), self.vectors
+
+        scores = matrix @ _normalize(np.asarray(vector, dtype=np.float32))
+        if exclude:
+            scores = np.where(np.isin(self.keys[positions], list(exclude)), -np.inf, scores)
+        if not len(scores):
+            return None
+        best = int(np.argmax(scores))
+        if scores[best] == -np.inf:
+            return None
+
+        position = int(positions[best])
+        return BankMatch(
+            self.ids[position], self.roles[position], self.competencies[position],
+            self.texts[position], float(scores[best])
+        )
+
+    def role_sizes(self):
+        return {role: len(positions) for role, (positions, _) in self._by_role.items()}
+
+
+class QuestionBank:
+    """
+    Банк вопросов процесса: индекс строится из таблицы question_bank при первом обращении
+    и перестраивается после загрузки вопросов. Загрузку могли выполнить другие процессы (воркеры uvicorn),
+    поэтому раз в QUESTION_BANK_CHECK_INTERVAL секунд версия индекса сверяется с таблицей.
+    """
+
+    def __init__(self, embedding_model: str = EMBEDDING_MODEL, min_similarity: float = QUESTION_BANK_MIN_SIMILARITY):
+        self.embedding_model = embedding_model
+        self.min_similarity = min_similarity
+        self.index = None
+        self.version = None
+        self._checked_at = 0.0
+        self._lock = None
+        self.counters = {"hits": 0, "misses": 0, "errors": 0, "embedded": 0}
+
+    def _get_lock(self):
+        # Lock создаётся в работающем event loop, а не при импорте
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _embed(self, texts, priority: int) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), QUESTION_BANK_EMBED_BATCH):
+            batch = texts[start:start + QUESTION_BANK_EMBED_BATCH]
+            vectors.extend(await llm_scheduler.embed(self.embedding_model, batch, priority=priority))
+        return np.asarray(vectors, dtype=np.float32)
+
+    @staticmethod
+    async def _read_version(db: AsyncSession):
+        # Число вопросов и время последнего изменения: меняются при любой загрузке, удалении и пересчёте векторов
+        count, updated_at = (await db.execute(
+            select(func.count(QuestionBankDB.id), func.max(QuestionBankDB.updated_at))
+        )).one()
+        return count, updated_at
+
+    async def _build(self, db: AsyncSession, force: bool = False):
+        rows = (await db.execute(select(QuestionBankDB).order_by(QuestionBankDB.id))).scalars().all()
+
+        # Векторы считаются только для новых вопросов и при смене модели
+        stale = [
+            row for row in rows
+            if force or row.embedding is None or row.embedding_model != self.embedding_model
+        ]
+        if stale:
+            vectors = await self._embed([row.text for row in stale], BATCH)
+            for row, vector in zip(stale, vectors):
+                row.embedding = vector.tobytes()
+                row.embedding_model = self.embedding_model
+            await db.commit()
+            self.counters["embedded"] += len(stale)
+
+        if rows:
+            vectors = np.stack([np.frombuffer(row.embedding, dtype=np.float32) for row in rows])
+        else:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        self.index = QuestionIndex(rows, vectors)
+        self.version = await self._read_version(db)
+        self._checked_at = time.monotonic()
+        print(f"✅ Банк вопросов загружен: {len(rows)} вопросов, новых эмбеддингов: {len(stale)}")
+
+    async def reload(self, db: AsyncSession = None, force: bool = False):
+        """
+        Перестраивает индекс из таблицы; force — пересчитать эмбеддинги всех вопросов.
+        """
+        async with self._get_lock():
+            if db is not None:
+                await self._build(db, force)
+                return
+            async with AsyncSessionLocal() as db:
+                await self._build(db, force)
+
+    async def load(self, db: AsyncSession, questions, replace: bool = True):
+        """
+        Добавляет вопросы в банк (повторы пропускаются) и перестраивает индекс.
+        replace — вопросы перечисленных ролей, которых нет в загрузке, удаляются.
+        """
+        roles = {question.role for question in questions}
+        existing = (await db.execute(select(QuestionBankDB).where(QuestionBankDB.role.in_(roles)))).scalars().all()
+        existing_keys = {(row.role, question_key(row.text)): row for row in existing}
+
+        loaded = set()
+        for question in questions:
+            key = (question.role, question_key(question.text))
+            if key in loaded:
+                continue
+            loaded.add(key)
+            row = existing_keys.get(key)
+            if row is None:
+                db.add(QuestionBankDB(role=question.role, competency=question.competency, text=question.text.strip()))
+            elif question.competency and row.competency != question.competency:
+                row.competency = question.competency
+
+        if replace:
+            removed = [row.id for key, row in existing_keys.items() if key not in loaded]
+            if removed:
+                await db.execute(delete(QuestionBankDB).where(QuestionBankDB.id.in_(removed)))
+
+        await db.commit()
+        await self.reload(db)
+
+    async def _ensure_loaded(self):
+        if self.index is None:
+            await self.reload()
+            return
+        if time.monotonic() - self._checked_at < QUESTION_BANK_CHECK_INTERVAL:
+            return
+
+        self._checked_at = time.monotonic()
+        async with AsyncSessionLocal() as db:
+            if await self._read_version(db) == self.version:
+                return
+            async with self._get_lock():
+                # Пока ждали блокировку, индекс мог перестроить другой запрос
+                if await self._read_version(db) != self.version:
+                    await self._build(db)
+
+    async def match(self, role: str, answer: str, asked=()) -> BankMatch:
+        """
+        Ближайший к ответу ещё не заданный вопрос роли, если он похож достаточно; иначе None.
+        Ошибки банка не мешают интервью — вопрос тогда генерирует LLM.
+        """
+        role = role or QUESTION_BANK_DEFAULT_ROLE
+        try:
+            await self._ensure_loaded()
+            if not len(self.index) or (role is not None and role not in self.index.role_sizes()):
+                return None
+
+            vector = (await self._embed([answer], INTERACTIVE))[0]
+            match = self.index.search(vector, role, {question_key(text) for text in asked})
+        except Exception as e:
+            self.counters["errors"] += 1
+            print(f"❌ Ошибка поиска в банке вопросов: {e}")
+            return None
+
+        if match is None or match.score < self.min_similarity:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        return match
+
+    def stats(self):
+        return {
+            **self.counters,
+            "loaded": self.index is not None,
+            "questions": len(self.index) if self.index is not None else 0,
+            "roles": self.index.role_sizes() if self.index is not None else {},
+            "embedding_model": self.embedding_model,
+            "min_similarity": self.min_similarity,
+        }
+
+
+async def load_question_context(db: AsyncSession, interview_id: str):
+    """
+    Роль кандидата и все уже заданные в интервью вопросы.
+    """
+    role = (await db.execute(
+        select(CandidateDB.role)
+        .join(InterviewDB, InterviewDB.candidate_id == CandidateDB.id)
+        .where(InterviewDB.id == interview_id)
+    )).scalar_one_or_none()
+    asked = (await db.execute(
+        select(InterviewTurnDB.question)
+        .where(InterviewTurnDB.interview_id == interview_id, InterviewTurnDB.question.isnot(None))
+    )).scalars().all()
+    return role, set(asked)
+
+
+question_bank = QuestionBank()
@@ -0,0 +1,216 @@
+import os
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import or_, and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+from models import InterviewDB, ReportJobDB
+from ai_report import generate_report_async
+from google_sheets import save_interview_to_google_sheets
+from interview_turns import get_transcript
+from llm_scheduler import BATCH, INTERACTIVE
+from report_stream import open_report_stream, close_report_stream
+
+# Настройки очереди
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", 2))  # Количество параллельных воркеров
+REPORT_JOB_MAX_ATTEMPTS = int(os.getenv("REPORT_JOB_MAX_ATTEMPTS", 3))
+REPORT_JOB_RETRY_DELAY = float(os.getenv("REPORT_JOB_RETRY_DELAY", 10))  # Базовая задержка повтора, сек
+REPORT_JOB_LEASE = float(os.getenv("REPORT_JOB_LEASE", 600))  # Сколько секунд задача закреплена за воркером
+REPORT_JOB_POLL_INTERVAL = float(os.getenv("REPORT_JOB_POLL_INTERVAL", 1))
+REPORT_JOB_CLAIM_CANDIDATES = 10  # Задач, которые воркер пробует захватить за один проход
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+async def enqueue_report_job(db: AsyncSession, interview_id: str, bypass_cache: bool = False) -> ReportJobDB:
+    """
+    Ставит задачу генерации отчёта в очередь.
+    Если по интервью уже есть активная задача — возвращает её.
+    bypass_cache=True — отчёт генерируется заново, без кэша LLM.
+    """
+    result = await db.execute(
+        select(ReportJobDB)
+        .where(ReportJobDB.interview_id == interview_id, ReportJobDB.status.in_(ACTIVE_STATUSES))
+        .order_by(ReportJobDB.created_at.desc())
+        .limit(1)
+    )
+    job = result.scalars().first()
+    if job:
+        return job
+
+    job = ReportJobDB(
+        id=str(uuid.uuid4()),
+        interview_id=interview_id,
+        status="queued",
+        max_attempts=REPORT_JOB_MAX_ATTEMPTS,
+        bypass_cache=bypass_cache
+    )
+    db.add(job)
+    return job
+
+
+async def get_latest_report_job(db: AsyncSession, interview_id: str):
+    """
+    Возвращает последнюю задачу генерации отчёта по интервью.
+    """
+    result = await db.execute(
+        select(ReportJobDB)
+        .where(ReportJobDB.interview_id == interview_id)
+        .order_by(ReportJobDB.created_at.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+def _claimable_job(now: datetime):
+    return or_(
+        and_(ReportJobDB.status == "queued", ReportJobDB.next_run_at <= now),
+        and_(ReportJobDB.status == "running", ReportJobDB.locked_until < now)
+    )
+
+
+async def claim_report_job(job_id: str = None):
+    """
+    Забирает следующую готовую задачу из очереди (или конкретную задачу job_id, если она ещё не взята).
+    Задачи с истёкшей арендой (упавший воркер) возвращаются в работу.
+    Захват — условный UPDATE: из параллельных воркеров и процессов задачу получает ровно один
+    (в том числе на SQLite, где SELECT ... FOR UPDATE SKIP LOCKED не поддерживается).
+    """
+    async with AsyncSessionLocal() as session:
+        now = datetime.utcnow()
+        query = select(ReportJobDB.id, ReportJobDB.interview_id, ReportJobDB.bypass_cache).where(_claimable_job(now))
+        if job_id is not None:
+            query = query.where(ReportJobDB.id == job_id)
+        candidates = (await session.execute(
+            query.order_by(ReportJobDB.next_run_at).limit(REPORT_JOB_CLAIM_CANDIDATES)
+        )).all()
+
+        for candidate in candidates:
+            result = await session.execute(
+                update(ReportJobDB)
+                .where(ReportJobDB.id == candidate.id, _claimable_job(now))
+                .values(
+                    status="running",
+                    attempts=ReportJobDB.attempts + 1,
+                    locked_until=now + timedelta(seconds=REPORT_JOB_LEASE)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            # 📌 Задачу уже захватил другой воркер — пробуем следующую
+            if result.rowcount == 1:
+                return candidate.id, candidate.interview_id, candidate.bypass_cache
+        return None
+
+
+async def run_report_job(job_id: str, interview_id: str, bypass_cache: bool = False, priority: int = BATCH):
+    """
+    Выполняет задачу: генерирует отчёт и ставит интервью в очередь выгрузки в Google Sheets.
+    Отчёт по мере генерации публикуется в поток, к которому подключаются клиенты SSE.
+    При ошибке планирует повтор с экспоненциальной задержкой.
+    """
+    stream = open_report_stream(interview_id)
+    try:
+        await generate_report_async(interview_id, bypass_cache, stream, priority)
+        await close_report_stream(stream)
+        await _export_interview(interview_id)
+        await _finish_job(job_id, "done")
+    except Exception as e:
+        error = e.detail if isinstance(e, HTTPException) else str(e)
+        if not stream.done:
+            await close_report_stream(stream, error)
+        await _finish_job(job_id, "failed", error)
+
+
+async def _export_interview(interview_id: str):
+    async with AsyncSessionLocal() as session:
+        interview = await session.get(InterviewDB, interview_id)
+        questions, answers = await get_transcript(session, interview)
+        save_interview_to_google_sheets(
+            interview.id,
+            interview.candidate_id,
+            interview.status,
+            questions,
+            answers,
+            db=session
+        )
+        await session.commit()
+
+
+async def _finish_job(job_id: str, status: str, error: str = None):
+    async with AsyncSessionLocal() as session:
+        job = await session.get(ReportJobDB, job_id)
+        if not job:
+            return
+
+        now = datetime.utcnow()
+        job.error = error
+        job.locked_until = None
+
+        if status == "failed" and job.attempts < job.max_attempts:
+            # 📌 Повторная попытка с экспоненциальной задержкой
+            job.status = "queued"
+            job.next_run_at = now + timedelta(seconds=REPORT_JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+        else:
+            job.status = status
+            job.finished_at = now
+
+        await session.commit()
+
+
+class ReportWorkerPool:
+    """
+    Пул фоновых воркеров, обрабатывающих очередь отчётов.
+    Работают в общем event loop приложения: LLM и БД вызываются асинхронно.
+    """
+
+    def __init__(self, workers: int = REPORT_WORKERS):
+        self.workers = workers
+        self._stop = asyncio.Event()
+        self._tasks = []
+        self._submitted = set()
+
+    def start(self):
+        self._stop.clear()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        self._stop.set()
+        await asyncio.gather(*self._tasks, *self._submitted, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, claimed, priority: int = INTERACTIVE):
+        """
+        Выполняет уже забранную задачу сразу, вне очереди воркеров — клиент ждёт поток отчёта.
+        """
+        task = asyncio.create_task(self._run(claimed, priority))
+        self._submitted.add(task)
+        task.add_done_callback(self._submitted.discard)
+
+    async def _run(self, claimed, priority: int = BATCH):
+        try:
+            await run_report_job(*claimed, priority=priority)
+        except Exception as e:
+            print(f"❌ Ошибка задачи отчёта {claimed[0]}: {e}")
+
+    async def _worker(self):
+        while not self._stop.is_set():
+            try:
+                claimed = await claim_report_job()
+            except Exception as e:
+                print(f"❌ Ошибка очереди отчётов: {e}")
+                claimed = None
+
+            if claimed:
+                await self._run(claimed)
+                continue
+
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=REPORT_JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+report_worker_pool = ReportWorkerPool()
@@ -0,0 +1,352 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from datetime import datetime
+from typing import NamedTuple
+from fastapi import HTTPException
+from sqlalchemy import select, update, insert, func, literal, exists
+from database import AsyncSessionLocal, DATABASE_URL
+from models import CandidateDB, InterviewDB, ReportRegenerationRunDB, ReportRegenerationItemDB, ReportScoresDB
+from ai_report import REPORT_MODEL, load_interview_data, prepare_transcript, run_analysis_sections, generate_scores
+from report_scores import save_report_scores
+from interview_search import index_report
+from llm_scheduler import llm_scheduler, usage_cost, FakeLLMBackend
+
+# Пакетная перегенерация отчётов (например, после изменения промтов):
+# python report_regeneration.py start --status completed --created-from 2024-01-01
+# python report_regeneration.py resume <run_id>
+# python report_regeneration.py status [<run_id>]
+REGENERATION_CONCURRENCY = int(os.getenv("REGENERATION_CONCURRENCY", 8))  # Интервью в обработке одновременно
+REGENERATION_BATCH_SIZE = int(os.getenv("REGENERATION_BATCH_SIZE", 50))  # Отчётов в одной транзакции
+REGENERATION_PAGE_SIZE = 500  # Контрольных точек, читаемых из БД за раз
+
+
+class RegenerationResult(NamedTuple):
+    item_id: int
+    interview_id: str
+    report: str = None
+    scores: object = None
+    error: str = None
+
+
+def select_interviews(filters: dict):
+    """
+    Выборка ID интервью по условиям запуска.
+    """
+    query = select(InterviewDB.id)
+    if filters.get("status"):
+        query = query.where(InterviewDB.status == filters["status"])
+    if filters.get("candidate_id"):
+        query = query.where(InterviewDB.candidate_id == filters["candidate_id"])
+    if filters.get("role"):
+        query = query.join(CandidateDB, CandidateDB.id == InterviewDB.candidate_id).where(CandidateDB.role == filters["role"])
+    if filters.get("created_from"):
+        query = query.where(InterviewDB.created_at >= datetime.fromisoformat(filters["created_from"]))
+    if filters.get("created_to"):
+        query = query.where(InterviewDB.created_at < datetime.fromisoformat(filters["created_to"]))
+    if filters.get("only_with_report"):
+        query = query.where(InterviewDB.report.isnot(None))
+    if filters.get("missing_scores"):
+        query = query.where(~exists().where(ReportScoresDB.interview_id == InterviewDB.id))
+    return query
+
+
+async def create_run(filters: dict, bypass_cache: bool = False) -> str:
+    """
+    Создаёт запуск и контрольные точки для всех подходящих интервью одним INSERT ... SELECT.
+    """
+    run_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as session:
+        session.add(ReportRegenerationRunDB(id=run_id, filters=json.dumps(filters), bypass_cache=bypass_cache))
+        await session.flush()
+
+        await session.execute(
+            insert(ReportRegenerationItemDB).from_select(
+                ["interview_id", "run_id"], select_interviews(filters).add_columns(literal(run_id))
+            )
+        )
+        total = (await session.execute(
+            select(func.count()).where(ReportRegenerationItemDB.run_id == run_id)
+        )).scalar_one()
+        await session.execute(
+            update(ReportRegenerationRunDB).where(ReportRegenerationRunDB.id == run_id).values(total=total)
+        )
+        await session.commit()
+
+    print(f"✅ Запуск перегенерации {run_id}: интервью {total}")
+    return run_id
+
+
+def _usage_totals():
+    prompt = sum(usage["prompt_tokens"] for usage in llm_scheduler.usage.values())
+    completion = sum(usage["completion_tokens"] for usage in llm_scheduler.usage.values())
+    return prompt, completion, usage_cost(llm_scheduler.usage)
+
+
+class ReportRegenerator:
+    """
+    Перегенерация отчётов запуска: не более concurrency интервью одновременно, результаты записываются
+    транзакциями по batch_size вместе с отметкой контрольных точек. После сбоя запуск продолжается
+    с необработанных интервью; уже полученные ответы LLM переиспользуются из кэша.
+    """
+
+    def __init__(self, run_id: str, concurrency: int = REGENERATION_CONCURRENCY, batch_size: int = REGENERATION_BATCH_SIZE):
+        self.run_id = run_id
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.bypass_cache = False
+        self._results = []
+        self._flush_lock = asyncio.Lock()
+        self._usage = _usage_totals()
+        self._flushed_at = time.monotonic()
+
+    async def _produce(self, queue: asyncio.Queue):
+        last_id = 0
+        while True:
+            async with AsyncSessionLocal() as session:
+                rows = (await session.execute(
+                    select(ReportRegenerationItemDB.id, ReportRegenerationItemDB.interview_id)
+                    .where(
+                        ReportRegenerationItemDB.run_id == self.run_id,
+                        ReportRegenerationItemDB.status == "pending",
+                        ReportRegenerationItemDB.id > last_id
+                    )
+                    .order_by(ReportRegenerationItemDB.id)
+                    .limit(REGENERATION_PAGE_SIZE)
+                )).all()
+            if not rows:
+                break
+            for row in rows:
+                await queue.put(row)
+            last_id = rows[-1].id
+
+        for _ in range(self.concurrency):
+            await queue.put(None)
+
+    async def _regenerate(self, item_id: int, interview_id: str) -> RegenerationResult:
+        try:
+            candidate_id, questions, answers = await load_interview_data(interview_id)
+            prompt_questions, prompt_answers = await prepare_transcript(questions, answers, self.bypass_cache)
+            sections = await run_analysis_sections(candidate_id, prompt_questions, prompt_answers, self.bypass_cache)
+            scores = await generate_scores(candidate_id, sections["report"], self.bypass_cache)
+            return RegenerationResult(item_id, interview_id, report=sections["report"], scores=scores)
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            return RegenerationResult(item_id, interview_id, error=error)
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            row = await queue.get()
+            if row is None:
+                return
+            result = await self._regenerate(row.id, row.interview_id)
+            self._results.append(result)
+            if len(self._results) >= self.batch_size:
+                await self.flush()
+
+    async def flush(self):
+        """
+        Записывает накопленные отчёты, отмечает контрольные точки и прибавляет расход к запуску одной транзакцией.
+        """
+        async with self._flush_lock:
+            batch, self._results = self._results, []
+            if not batch:
+                return
+
+            now = datetime.utcnow()
+            usage = _usage_totals()
+            prompt_tokens, completion_tokens, cost = (current - previous for current, previous in zip(usage, self._usage))
+            elapsed = time.monotonic() - self._flushed_at
+            done = [result for result in batch if result.error is None]
+            failed = [result for result in batch if result.error is not None]
+
+            async with AsyncSessionLocal() as session:
+                if done:
+                    await session.execute(
+                        update(InterviewDB), [{"id": result.interview_id, "report": result.report} for result in done]
+                    )
+                    for result in done:
+                        await index_report(session, result.interview_id, result.report)
+                        if result.scores is not None:
+                            await save_report_scores(session, result.interview_id, result.scores, REPORT_MODEL)
+                    await session.execute(
+                        update(ReportRegenerationItemDB)
+                        .where(ReportRegenerationItemDB.id.in_([result.item_id for result in done]))
+                        .values(status="done", error=None, attempts=ReportRegenerationItemDB.attempts + 1, finished_at=now)
+                    )
+                for result in failed:
+                    await session.execute(
+                        update(ReportRegenerationItemDB)
+                        .where(ReportRegenerationItemDB.id == result.item_id)
+                        .values(status="failed", error=result.error, attempts=ReportRegenerationItemDB.attempts + 1)
+                    )
+
+                run = ReportRegenerationRunDB
+                await session.execute(update(run).where(run.id == self.run_id).values(
+                    done=run.done + len(done),
+                    failed=run.failed + len(failed),
+                    prompt_tokens=run.prompt_tokens + prompt_tokens,
+                    completion_tokens=run.completion_tokens + completion_tokens,
+                    cost_usd=run.cost_usd + cost,
+                    elapsed_seconds=run.elapsed_seconds + elapsed
+                ))
+                await session.commit()
+
+            self._usage = usage
+            self._flushed_at += elapsed
+            for result in failed:
+                print(f"❌ Интервью {result.interview_id}: {result.error}")
+            print(format_progress(await get_run(self.run_id)))
+
+    async def run(self, retry_failed: bool = False):
+        """
+        Обрабатывает все необработанные интервью запуска; retry_failed — повторить и завершившиеся ошибкой.
+        """
+        async with AsyncSessionLocal() as session:
+            run = await session.get(ReportRegenerationRunDB, self.run_id)
+            if not run:
+                raise RuntimeError(f"Запуск {self.run_id} не найден")
+            self.bypass_cache = run.bypass_cache
+
+            if retry_failed:
+                result = await session.execute(
+                    update(ReportRegenerationItemDB)
+                    .where(ReportRegenerationItemDB.run_id == self.run_id, ReportRegenerationItemDB.status == "failed")
+                    .values(status="pending")
+                )
+                run.failed -= result.rowcount
+            run.status = "running"
+            await session.commit()
+
+        self._usage = _usage_totals()
+        self._flushed_at = time.monotonic()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        await asyncio.gather(self._produce(queue), *(self._work(queue) for _ in range(self.concurrency)))
+        await self.flush()
+
+        async with AsyncSessionLocal() as session:
+            pending = (await session.execute(
+                select(func.count()).where(
+                    ReportRegenerationItemDB.run_id == self.run_id, ReportRegenerationItemDB.status == "pending"
+                )
+            )).scalar_one()
+            run = await session.get(ReportRegenerationRunDB, self.run_id)
+            if pending == 0:
+                run.status = "done"
+                run.finished_at = datetime.utcnow()
+            await session.commit()
+
+        return await get_run(self.run_id)
+
+
+async def get_run(run_id: str = None) -> dict:
+    """
+    Состояние запуска (последнего, если run_id не указан) с пропускной способностью и стоимостью.
+    """
+    async with AsyncSessionLocal() as session:
+        query = select(ReportRegenerationRunDB)
+        if run_id:
+            query = query.where(ReportRegenerationRunDB.id == run_id)
+        run = (await session.execute(query.order_by(ReportRegenerationRunDB.created_at.desc()).limit(1))).scalars().first()
+
+    if not run:
+        return None
+    processed = run.done + run.failed
+    return {
+        "id": run.id,
+        "status": run.status,
+        "filters": json.loads(run.filters),
+        "total": run.total,
+        "done": run.done,
+        "failed": run.failed,
+        "pending": run.total - processed,
+        "elapsed_seconds": round(run.elapsed_seconds, 1),
+        "reports_per_second": round(processed / run.elapsed_seconds, 2) if run.elapsed_seconds else None,
+        "prompt_tokens": run.prompt_tokens,
+        "completion_tokens": run.completion_tokens,
+        "cost_usd": round(run.cost_usd, 4),
+        "cost_per_report_usd": round(run.cost_usd / run.done, 5) if run.done else None,
+    }
+
+
+def format_progress(run: dict) -> str:
+    return (
+        f"✅ {run['id']}: {run['done'] + run['failed']}/{run['total']} (ошибок {run['failed']}), "
+        f"{run['reports_per_second'] or 0} отчётов/с, "
+        f"токенов {run['prompt_tokens'] + run['completion_tokens']}, ${run['cost_usd']}"
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Пакетная перегенерация отчётов по интервью")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    start = commands.add_parser("start", help="Новый запуск по условиям выборки")
+    start.add_argument("--status", default="completed", help="Статус интервью ('' — любой)")
+    start.add_argument("--candidate-id")
+    start.add_argument("--role", help="Роль кандидата")
+    start.add_argument("--created-from", help="Дата создания интервью от (ISO)")
+    start.add_argument("--created-to", help="Дата создания интервью до (ISO, не включая)")
+    start.add_argument("--only-with-report", action="store_true", help="Только интервью с уже готовым отчётом")
+    start.add_argument("--missing-scores", action="store_true", help="Только интервью без структурированной оценки")
+    start.add_argument("--bypass-cache", action="store_true", help="Не брать ответы из кэша LLM")
+
+    resume = commands.add_parser("resume", help="Продолжить прерванный запуск")
+    resume.add_argument("run_id")
+    resume.add_argument("--retry-failed", action="store_true", help="Повторить интервью, завершившиеся ошибкой")
+
+    status = commands.add_parser("status", help="Состояние запуска")
+    status.add_argument("run_id", nargs="?")
+
+    for command in (start, resume):
+        command.add_argument("--concurrency", type=int, default=REGENERATION_CONCURRENCY)
+        command.add_argument("--batch-size", type=int, default=REGENERATION_BATCH_SIZE)
+        command.add_argument("--fake-llm", action="store_true", help="Детерминированный LLM вместо OpenAI (только для тестовой БД)")
+        command.add_argument("--fake-latency", type=float, default=0.0, help="Задержка ответа фейкового LLM, сек")
+        command.add_argument(
+            "--allow-fake-on-db", action="store_true",
+            help="Разрешить --fake-llm не на SQLite: фейковые отчёты и оценки перезапишут настоящие"
+        )
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    if args.command == "status":
+        run = await get_run(args.run_id)
+        print(json.dumps(run, ensure_ascii=False, indent=2) if run else "Запусков перегенерации нет")
+        return
+
+    if args.fake_llm:
+        # Фейковый LLM перезаписывает отчёты и оценки — по умолчанию только на локальной SQLite
+        if not DATABASE_URL.startswith("sqlite") and not args.allow_fake_on_db:
+            raise SystemExit("❌ --fake-llm разрешён только на SQLite; для другой БД добавьте --allow-fake-on-db")
+        llm_scheduler.backend = FakeLLMBackend(latency=args.fake_latency)
+
+    try:
+        if args.command == "start":
+            filters = {
+                "status": args.status or None,
+                "candidate_id": args.candidate_id,
+                "role": args.role,
+                "created_from": args.created_from,
+                "created_to": args.created_to,
+                "only_with_report": args.only_with_report,
+                "missing_scores": args.missing_scores,
+            }
+            run_id = await create_run(filters, args.bypass_cache)
+            retry_failed = False
+        else:
+            run_id, retry_failed = args.run_id, args.retry_failed
+
+        run = await ReportRegenerator(run_id, args.concurrency, args.batch_size).run(retry_failed)
+        print(json.dumps(run, ensure_ascii=False, indent=2))
+    finally:
+        await llm_scheduler.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
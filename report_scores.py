@@ -0,0 +1,83 @@
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import CandidateDB, InterviewDB, ReportScoresDB
+from schemas import ReportScores, TopCandidate, TopCandidatesResponse
+
+TOP_CANDIDATES_MAX_LIMIT = 100
+
+# Колонки сортировки рейтинга; при равенстве — по общему баллу
+SORT_COLUMNS = {
+    "overall": ReportScoresDB.overall_score,
+    "hard_skills": ReportScoresDB.hard_skills,
+    "soft_skills": ReportScoresDB.soft_skills,
+}
+
+
+async def save_report_scores(db: AsyncSession, interview_id: str, scores: ReportScores, model: str = None):
+    """
+    Сохраняет (или заменяет) оценку интервью в текущей транзакции.
+    """
+    await db.merge(ReportScoresDB(
+        interview_id=interview_id,
+        hard_skills=scores.hard_skills,
+        soft_skills=scores.soft_skills,
+        overall_score=scores.overall_score,
+        verdict=scores.verdict,
+        strengths=json.dumps(scores.strengths, ensure_ascii=False),
+        growth_areas=json.dumps(scores.growth_areas, ensure_ascii=False),
+        model=model,
+        updated_at=datetime.utcnow()
+    ))
+
+
+async def top_candidates(
+    db: AsyncSession,
+    sort: str = "overall",
+    verdict: bool = None,
+    role: str = None,
+    min_score: float = None,
+    limit: int = 10
+) -> TopCandidatesResponse:
+    """
+    Лучшие кандидаты по баллам отчёта: проход по индексу сортировки, читаются только первые limit строк.
+    """
+    if sort not in SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Сортировка должна быть одной из: {', '.join(SORT_COLUMNS)}")
+    limit = max(1, min(limit, TOP_CANDIDATES_MAX_LIMIT))
+
+    query = (
+        select(ReportScoresDB, InterviewDB.candidate_id, CandidateDB.name, CandidateDB.email, CandidateDB.role)
+        .join(InterviewDB, InterviewDB.id == ReportScoresDB.interview_id)
+        .join(CandidateDB, CandidateDB.id == InterviewDB.candidate_id)
+    )
+    if verdict is not None:
+        query = query.where(ReportScoresDB.verdict == verdict)
+    if role:
+        query = query.where(CandidateDB.role == role)
+    if min_score is not None:
+        query = query.where(ReportScoresDB.overall_score >= min_score)
+
+    order = [SORT_COLUMNS[sort].desc()]
+    if sort != "overall":
+        order.append(ReportScoresDB.overall_score.desc())
+    query = query.order_by(*order, ReportScoresDB.interview_id.desc()).limit(limit)
+
+    rows = (await db.execute(query)).all()
+    return TopCandidatesResponse(sort=sort, items=[
+        TopCandidate(
+            interview_id=scores.interview_id,
+            candidate_id=candidate_id,
+            candidate_name=name,
+            candidate_email=email,
+            role=candidate_role,
+            hard_skills=scores.hard_skills,
+            soft_skills=scores.soft_skills,
+            overall_score=scores.overall_score,
+            verdict=scores.verdict,
+            strengths=json.loads(scores.strengths or "[]")
+        )
+        for scores, candidate_id, name, email, candidate_role in rows
+    ])
@@ -0,0 +1,94 @@
+import os
+import json
+import asyncio
+from sqlalchemy import select
+from database import AsyncSessionLocal
+from models import InterviewDB, ReportJobDB
+from text_stream import TextStream
+
+# Сколько секунд завершённый поток хранится в памяти для переподключившихся клиентов
+REPORT_STREAM_TTL = float(os.getenv("REPORT_STREAM_TTL", 300))
+# Как часто проверять БД, если отчёт генерирует другой процесс, сек
+REPORT_STREAM_POLL_INTERVAL = float(os.getenv("REPORT_STREAM_POLL_INTERVAL", 1))
+
+
+_streams = {}
+
+
+def get_active_stream(interview_id: str):
+    return _streams.get(interview_id)
+
+
+def open_report_stream(interview_id: str) -> TextStream:
+    """
+    Новый поток для запуска задачи генерации отчёта: клиенты SSE этого процесса подключаются к нему.
+    """
+    stream = TextStream(interview_id)
+    _streams[interview_id] = stream
+    return stream
+
+
+async def close_report_stream(stream: TextStream, error: str = None):
+    """
+    Завершает поток; он ещё REPORT_STREAM_TTL секунд доступен переподключившимся клиентам.
+    """
+    await stream.finish(error)
+
+    def forget():
+        # Поток следующего запуска задачи не удаляется
+        if _streams.get(stream.interview_id) is stream:
+            del _streams[stream.interview_id]
+
+    asyncio.get_running_loop().call_later(REPORT_STREAM_TTL, forget)
+
+
+def format_sse(event: str, data, event_id: int = None) -> str:
+    """
+    Сообщение в формате server-sent events; данные кодируются в JSON, чтобы переносы строк не ломали поток.
+    """
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_report_events(stream: TextStream, start: int = 0):
+    async for index, chunk in stream.follow(start):
+        yield format_sse("token", chunk, index)
+
+    if stream.error:
+        yield format_sse("error", stream.error)
+    else:
+        yield format_sse("done", {"length": len(stream.chunks)})
+
+
+async def report_job_events(interview_id: str, start: int = 0):
+    """
+    События по задаче генерации отчёта. Если задача выполняется в этом процессе — фрагменты её потока,
+    если в другом — отчёт одним событием после сохранения в БД.
+    """
+    while True:
+        stream = get_active_stream(interview_id)
+        if stream:
+            async for event in stream_report_events(stream, start):
+                yield event
+            return
+
+        async with AsyncSessionLocal() as session:
+            interview = await session.get(InterviewDB, interview_id)
+            job = (await session.execute(
+                select(ReportJobDB)
+                .where(ReportJobDB.interview_id == interview_id)
+                .order_by(ReportJobDB.created_at.desc())
+                .limit(1)
+            )).scalars().first()
+
+        if job is None or job.status not in ("queued", "running"):
+            if interview.report:
+                yield format_sse("report", interview.report)
+                yield format_sse("done", {"length": 1})
+            else:
+                yield format_sse("error", job.error if job and job.error else "Отчёт не сгенерирован")
+            return
+
+        await asyncio.sleep(REPORT_STREAM_POLL_INTERVAL)
@@ -1,34 +1,48 @@
 import uuid
-import requests
 import os
-import aiohttp
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from models import SessionLocal, CandidateDB, InterviewDB
-from schemas import CandidateCreate, CandidateResponse, InterviewResponse
-from ai_report import generate_report
-from google_sheets import save_interview_to_google_sheets
-from deepgram import Deepgram
-from openai import OpenAI
+import asyncio
+from typing import Optional, List
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, AsyncSessionLocal
+from models import CandidateDB, InterviewDB, ReportJobDB
+from schemas import (
+    CandidateCreate, CandidateResponse, InterviewResponse,
+    InterviewFinishQueuedResponse, InterviewReportResponse, ReportJobResponse,
+    BulkTranscriptionRequest, BulkTranscriptionResponse, BulkTranscriptionResult,
+    EmailStatusResponse, BulkRegisterResponse, InterviewListResponse, InterviewSearchResponse,
+    QuestionBankLoadRequest, TopCandidatesResponse, VideoUploadCreate, VideoUploadResponse
+)
+from report_jobs import enqueue_report_job, get_latest_report_job, claim_report_job, report_worker_pool, ACTIVE_STATUSES
+from interview_turns import append_turn, build_interview_response
+from report_stream import get_active_stream, stream_report_events, report_job_events, format_sse
+from llm_cache import completion_cache
+from llm_scheduler import llm_scheduler
+from next_question import NextQuestionEngine, generate_next_question, load_recent_turns
+from question_bank import question_bank, load_question_context
+from report_scores import top_candidates
+from video_upload import create_upload, get_upload, receive_chunk, abort_upload, upload_response, video_response
+from transcription import create_live_transcriber, transcribe_prerecorded
+from http_clients import http_clients
+from email_outbox import enqueue_interview_email, get_candidate_emails
+from candidate_import import CandidateImporter, iter_csv_records
+from metrics import track, render_metrics
+from interview_cache import interview_cache, get_cached_interview, etag_response
+from interview_list import list_interviews
+from interview_search import search_interviews
 
 router = APIRouter()
 
-DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+BULK_TRANSCRIPTION_CONCURRENCY = int(os.getenv("BULK_TRANSCRIPTION_CONCURRENCY", 8))  # Одновременных запросов к Deepgram
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # 📺 1️⃣ **Регистрация кандидата**
 @router.post("/register/", response_model=CandidateResponse)
-def register(candidate: CandidateCreate, db: Session = Depends(get_db)):
+async def register(candidate: CandidateCreate, db: AsyncSession = Depends(get_db)):
     interview_id = str(uuid.uuid4())
     interview_link = f"{os.getenv('FRONTEND_URL')}/interview/{interview_id}"
 
@@ -38,12 +52,15 @@ def register(candidate: CandidateCreate, db: Session = Depends(get_db)):
         email=candidate.email,
         phone=candidate.phone,
         gender=candidate.gender,
-        interview_link=interview_link
+        interview_link=interview_link,
+        role=candidate.role
     )
 
     db.add(new_candidate)
-    db.commit()
-    db.refresh(new_candidate)
+    await db.flush()
+    enqueue_interview_email(db, new_candidate.id, candidate.email, interview_link)
+    await db.commit()
+    await db.refresh(new_candidate)
 
     return CandidateResponse(
         id=new_candidate.id,
@@ -51,14 +68,61 @@ def register(candidate: CandidateCreate, db: Session = Depends(get_db)):
         email=new_candidate.email,
         phone=new_candidate.phone,
         gender=new_candidate.gender,
-        interview_link=new_candidate.interview_link
+        interview_link=new_candidate.interview_link,
+        role=new_candidate.role
     )
 
 
+# 📺 1️⃣ **Пакетная регистрация кандидатов**
+@router.post("/register/bulk", response_model=BulkRegisterResponse)
+async def register_bulk(candidates: List[dict], db: AsyncSession = Depends(get_db)):
+    """
+    Регистрирует массив кандидатов (поля как у /register/).
+    Дубли по email пропускаются, результат возвращается по каждой строке.
+    """
+    importer = CandidateImporter(db)
+    for row, record in enumerate(candidates, start=1):
+        await importer.add(row, record)
+
+    return await importer.finish()
+
+
+@router.post("/register/bulk/csv", response_model=BulkRegisterResponse)
+async def register_bulk_csv(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Регистрирует кандидатов из CSV в теле запроса (Content-Type: text/csv).
+    Файл разбирается потоково, кандидаты записываются пачками по мере чтения.
+    """
+    importer = CandidateImporter(db)
+    async for row, record in iter_csv_records(request.stream()):
+        await importer.add(row, record)
+
+    return await importer.finish()
+
+
+# 📺 1️⃣ **Статус доставки писем кандидату**
+@router.get("/candidates/{candidate_id}/emails", response_model=List[EmailStatusResponse])
+async def get_candidate_email_status(candidate_id: str, db: AsyncSession = Depends(get_db)):
+    candidate = await db.get(CandidateDB, candidate_id)
+    if not candidate:
+        raise HTTPException(status_code=404, detail="Кандидат не найден")
+
+    emails = await get_candidate_emails(db, candidate_id)
+    return [EmailStatusResponse.model_validate(email) for email in emails]
+
+
 # 📺 2️⃣ **Начало интервью**
 @router.get("/interview/{interview_id}", response_model=InterviewResponse)
-def start_interview(interview_id: str, db: Session = Depends(get_db)):
-    candidate = db.query(CandidateDB).filter(CandidateDB.id == interview_id).first()
+async def start_interview(interview_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Возвращает интервью (создаёт при первом обращении). Ответ кэшируется ненадолго,
+    при совпадении If-None-Match с ETag возвращается 304 без тела.
+    """
+    cached = await get_cached_interview(db, interview_id)
+    if cached is not None:
+        return etag_response(request, cached)
+
+    candidate = await db.get(CandidateDB, interview_id)
     if not candidate:
         raise HTTPException(status_code=404, detail="Кандидат не найден")
 
@@ -73,35 +137,64 @@ def start_interview(interview_id: str, db: Session = Depends(get_db)):
     interview = InterviewDB(
         id=interview_id,
         candidate_id=candidate.id,
-        status="in_progress",
-        questions=first_question
+        status="in_progress"
     )
     db.add(interview)
-    db.commit()
-    db.refresh(interview)
+    await db.flush()
+    await append_turn(db, interview.id, question=first_question)
+    await db.commit()
+    await db.refresh(interview)
+
+    cached = interview_cache.set(interview_id, await build_interview_response(db, interview))
+    return etag_response(request, cached)
+
+
+# 📺 2️⃣ **Список интервью с фильтрами и постраничной выдачей**
+@router.get("/interviews", response_model=InterviewListResponse)
+async def get_interviews(
+    status: Optional[str] = None,
+    candidate_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Интервью от новых к старым. Для следующей страницы передайте next_cursor из ответа в cursor.
+    """
+    return await list_interviews(db, status, candidate_id, created_from, created_to, cursor, limit)
 
-    return InterviewResponse(
-        id=interview.id,
-        candidate_id=interview.candidate_id,
-        status=interview.status,
-        questions=interview.questions,
-        answers=interview.answers,
-        report=interview.report
-    )
+
+# 📺 2️⃣ **Полнотекстовый поиск по репликам и отчётам**
+@router.get("/interviews/search", response_model=InterviewSearchResponse)
+async def search_interview_texts(
+    q: str = Query(..., min_length=2),
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Ищет по вопросам, ответам и отчётам с учётом словоформ: «стрессоустойчивость», "Kubernetes OR Docker".
+    """
+    return await search_interviews(db, q, status, limit)
 
 
 # 📺 3️⃣ **Создание видеозвонка (LiveKit)**
 @router.get("/livekit/{interview_id}")
-def create_livekit_session(interview_id: str, db: Session = Depends(get_db)):
+async def create_livekit_session(interview_id: str, db: AsyncSession = Depends(get_db)):
     """
     Создаёт видеозвонок в LiveKit.
     """
-    candidate = db.query(CandidateDB).filter(CandidateDB.id == interview_id).first()
+    candidate = await db.get(CandidateDB, interview_id)
     if not candidate:
         raise HTTPException(status_code=404, detail="Кандидат не найден")
 
     headers = {"Authorization": f"Bearer {LIVEKIT_API_KEY}"}
-    response = requests.post("https://api.livekit.io/room", headers=headers, json={"name": interview_id})
+    with track("livekit", "create_room"):
+        response = await http_clients.httpx_client().post(
+            "https://api.livekit.io/room", headers=headers, json={"name": interview_id}
+        )
 
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail="Ошибка создания сессии LiveKit")
@@ -111,71 +204,405 @@ def create_livekit_session(interview_id: str, db: Session = Depends(get_db)):
 
 # 📺 4️⃣ **Распознавание речи и анализ ответа**
 async def transcribe_audio(audio_url: str):
-    if not DEEPGRAM_API_KEY:
-        raise HTTPException(status_code=500, detail="Deepgram API key отсутствует!")
-
-    deepgram = Deepgram(DEEPGRAM_API_KEY)
-    async with aiohttp.ClientSession() as session:
-        response = await deepgram.transcription.prerecorded(
-            {"url": audio_url},
-            {"punctuate": True, "language": "ru"}
-        )
-        return response["results"]["channels"][0]["alternatives"][0]["transcript"]
+    return await transcribe_prerecorded(audio_url)
 
 
 @router.post("/interview/{interview_id}/answer")
-async def process_answer(interview_id: str, audio_url: str, db: Session = Depends(get_db)):
+async def process_answer(interview_id: str, audio_url: str, db: AsyncSession = Depends(get_db)):
     """
     Обрабатывает ответ кандидата: распознаёт речь, анализирует ответ и генерирует следующий вопрос.
     """
-    interview = db.query(InterviewDB).filter(InterviewDB.id == interview_id).first()
+    interview = await db.get(InterviewDB, interview_id)
     if not interview:
         raise HTTPException(status_code=404, detail="Интервью не найдено")
 
     transcript = await transcribe_audio(audio_url)
-    interview.answers = (interview.answers or "") + f"\n{transcript}"
-    db.commit()
-    db.refresh(interview)
 
-    return {"message": "Ответ сохранён", "answer": transcript}
+    # Ответ добавляется отдельной репликой, без перезаписи всей истории
+    await append_turn(db, interview_id, answer=transcript)
+    await db.commit()
+    interview_cache.invalidate(interview_id)
+
+    # Следующий вопрос добавляется репликой; ошибка LLM не отменяет сохранённый ответ
+    try:
+        question = await generate_next_question(db, interview_id, transcript)
+        await db.commit()
+        interview_cache.invalidate(interview_id)
+    except Exception as e:
+        await db.rollback()
+        print(f"❌ Ошибка генерации следующего вопроса: {e}")
+        question = None
+
+    return {"message": "Ответ сохранён", "answer": transcript, "question": question}
+
+
+# 📺 4️⃣ **Пакетное распознавание записей ответов**
+@router.post("/transcriptions/bulk", response_model=BulkTranscriptionResponse)
+async def bulk_transcribe(request: BulkTranscriptionRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Распознаёт записи ответов одного или нескольких интервью параллельно
+    (не более BULK_TRANSCRIPTION_CONCURRENCY запросов одновременно)
+    и сохраняет все ответы одной транзакцией в порядке запроса.
+    """
+    interview_ids = {item.interview_id for item in request.items}
+    result = await db.execute(select(InterviewDB.id).where(InterviewDB.id.in_(interview_ids)))
+    existing = set(result.scalars().all())
+
+    semaphore = asyncio.Semaphore(BULK_TRANSCRIPTION_CONCURRENCY)
+
+    async def transcribe(item):
+        if item.interview_id not in existing:
+            return BulkTranscriptionResult(**item.model_dump(), status="error", error="Интервью не найдено")
+
+        async with semaphore:
+            try:
+                answer = await transcribe_prerecorded(item.audio_url)
+            except Exception as e:
+                error = e.detail if isinstance(e, HTTPException) else str(e)
+                return BulkTranscriptionResult(**item.model_dump(), status="error", error=error)
+
+        return BulkTranscriptionResult(**item.model_dump(), status="ok", answer=answer)
+
+    results = await asyncio.gather(*(transcribe(item) for item in request.items))
+
+    for item in results:
+        if item.status == "ok":
+            await append_turn(db, item.interview_id, answer=item.answer)
+    await db.commit()
+    interview_cache.invalidate(*interview_ids)
+
+    saved = sum(1 for item in results if item.status == "ok")
+    return BulkTranscriptionResponse(saved=saved, failed=len(results) - saved, results=results)
+
+
+# 📺 4️⃣ **Потоковое распознавание ответа (WebSocket)**
+@router.websocket("/interview/{interview_id}/answer/live")
+async def live_answer(websocket: WebSocket, interview_id: str):
+    """
+    Принимает аудио-фрагменты ответа и сразу отдаёт результаты распознавания:
+    {"type": "interim", "text": ...} — пока кандидат говорит,
+    {"type": "final", "text": ...} — фраза закончена и сохранена как ответ,
+    {"type": "question_delta", "text": ...} — фрагменты следующего вопроса,
+    {"type": "question", "text": ...} — следующий вопрос целиком, сохранён репликой.
+    Текстовое сообщение "stop" завершает ответ.
+    Следующий вопрос начинает генерироваться по промежуточной расшифровке, пока кандидат говорит.
+    """
+    async with AsyncSessionLocal() as db:
+        interview = await db.get(InterviewDB, interview_id)
+        history = await load_recent_turns(db, interview_id) if interview else []
+        role, asked = await load_question_context(db, interview_id) if interview else (None, set())
+    if not interview:
+        await websocket.close(code=4404, reason="Интервью не найдено")
+        return
+
+    await websocket.accept()
+    transcriber = create_live_transcriber()
+    try:
+        await transcriber.start()
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": f"Ошибка распознавания речи: {str(e)}"})
+        await websocket.close(code=1011)
+        return
+
+    async def pump_audio():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect" or message.get("text") == "stop":
+                    break
+                if message.get("bytes"):
+                    await transcriber.send(message["bytes"])
+        finally:
+            await transcriber.finish()
+
+    engine = NextQuestionEngine(interview_id, history, role, asked)
+
+    async def store_turn(question=None, answer=None):
+        async with AsyncSessionLocal() as db:
+            await append_turn(db, interview_id, question=question, answer=answer)
+            await db.commit()
+        interview_cache.invalidate(interview_id)
+
+    async def save_answer(segments):
+        answer = " ".join(segments)
+        await websocket.send_json({"type": "final", "text": answer})
+
+        # Ответ сохраняется параллельно с выдачей вопроса, чтобы не добавлять паузу
+        answer_saved = asyncio.create_task(store_turn(answer=answer))
+        question = []
+        try:
+            async for delta in engine.on_final(answer):
+                question.append(delta)
+                await websocket.send_json({"type": "question_delta", "text": delta})
+        except Exception as e:
+            await websocket.send_json({"type": "error", "detail": f"Ошибка генерации вопроса: {str(e)}"})
+            question = []
+        await answer_saved
+
+        question = "".join(question).strip()
+        if question:
+            await store_turn(question=question)
+            await websocket.send_json({"type": "question", "text": question})
+
+    audio_task = asyncio.create_task(pump_audio())
+    segments = []
+    try:
+        async for event in transcriber.events():
+            if not event.is_final:
+                text = " ".join(segments + [event.text]).strip()
+                await websocket.send_json({"type": "interim", "text": text})
+                engine.on_interim(text)
+                continue
+
+            if event.text:
+                segments.append(event.text)
+                engine.on_interim(" ".join(segments))
+
+            # Фраза закончена — сохраняем ответ отдельной репликой
+            if event.utterance_end and segments:
+                await save_answer(segments)
+                segments = []
+
+        # Поток закрыт посреди фразы — сохраняем то, что успели распознать
+        if segments:
+            await save_answer(segments)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        engine.close()
+        audio_task.cancel()
+        await asyncio.gather(audio_task, return_exceptions=True)
+
+    try:
+        await websocket.close()
+    except RuntimeError:
+        pass
 
 
 # 📺 5️⃣ **Сохранение видеозаписи интервью**
 @router.post("/interview/{interview_id}/save_video")
-def save_interview_video(interview_id: str, video_url: str, db: Session = Depends(get_db)):
-    interview = db.query(InterviewDB).filter(InterviewDB.id == interview_id).first()
+async def save_interview_video(interview_id: str, video_url: str, db: AsyncSession = Depends(get_db)):
+    interview = await db.get(InterviewDB, interview_id)
     if not interview:
         raise HTTPException(status_code=404, detail="Интервью не найдено")
 
     interview.video_url = video_url
-    db.commit()
-    db.refresh(interview)
+    await db.commit()
+    await db.refresh(interview)
+    interview_cache.invalidate(interview_id)
 
     return {"message": "Видео интервью сохранено", "video_url": video_url}
 
 
-# 📺 6️⃣ **Завершение интервью и генерация отчёта**
-@router.post("/interview/{interview_id}/finish")
-def finish_interview(interview_id: str, db: Session = Depends(get_db)):
-    interview = db.query(InterviewDB).filter(InterviewDB.id == interview_id).first()
+# 📺 5️⃣ **Загрузка видео интервью по частям с докачкой**
+@router.post("/interview/{interview_id}/video/uploads", status_code=201, response_model=VideoUploadResponse)
+async def start_video_upload(interview_id: str, request: VideoUploadCreate, db: AsyncSession = Depends(get_db)):
+    """
+    Начинает загрузку: далее фрагменты отправляются PUT-запросами с заголовками
+    Upload-Offset (смещение) и X-Chunk-SHA256 (SHA-256 фрагмента в hex).
+    """
+    return upload_response(await create_upload(db, interview_id, request))
+
+
+@router.get("/interview/{interview_id}/video/uploads/{upload_id}", response_model=VideoUploadResponse)
+async def get_video_upload(interview_id: str, upload_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Состояние загрузки: после обрыва продолжайте со смещения uploaded.
+    """
+    return upload_response(await get_upload(db, interview_id, upload_id))
+
+
+@router.put("/interview/{interview_id}/video/uploads/{upload_id}", response_model=VideoUploadResponse)
+async def upload_video_chunk(
+    interview_id: str,
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    x_chunk_sha256: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    return await receive_chunk(db, interview_id, upload_id, request, upload_offset, x_chunk_sha256)
+
+
+@router.delete("/interview/{interview_id}/video/uploads/{upload_id}", response_model=VideoUploadResponse)
+async def abort_video_upload(interview_id: str, upload_id: str, db: AsyncSession = Depends(get_db)):
+    return await abort_upload(db, interview_id, upload_id)
+
+
+# 📺 5️⃣ **Воспроизведение видео интервью (Range)**
+@router.api_route("/interview/{interview_id}/video", methods=["GET", "HEAD"])
+async def get_interview_video(interview_id: str, db: AsyncSession = Depends(get_db)):
+    return await video_response(db, interview_id)
+
+
+# 📺 6️⃣ **Завершение интервью и постановка отчёта в очередь**
+@router.post("/interview/{interview_id}/finish", status_code=202, response_model=InterviewFinishQueuedResponse)
+async def finish_interview(interview_id: str, regenerate: bool = False, db: AsyncSession = Depends(get_db)):
+    """
+    Завершает интервью и ставит генерацию отчёта в фоновую очередь.
+    Состояние задачи доступно через /interview/{interview_id}/report/job.
+    regenerate=true — сгенерировать отчёт заново, минуя кэш LLM.
+    """
+    interview = await db.get(InterviewDB, interview_id)
     if not interview:
         raise HTTPException(status_code=404, detail="Интервью не найдено")
 
-    report = generate_report(interview_id)
-    interview.report = report
     interview.status = "completed"
-    db.commit()
-    db.refresh(interview)
-
-    save_interview_to_google_sheets(
-        interview.id,
-        interview.candidate_id,
-        interview.status,
-        interview.questions,
-        interview.answers,
-        report,
-        interview.video_url
+    job = await enqueue_report_job(db, interview_id, bypass_cache=regenerate)
+    await db.commit()
+    await db.refresh(job)
+    interview_cache.invalidate(interview_id)
+
+    return InterviewFinishQueuedResponse(
+        message="Интервью завершено, отчёт поставлен в очередь",
+        job=ReportJobResponse.model_validate(job)
     )
 
-    return {"message": "Интервью завершено, отчёт сохранён"}
 
+# 📺 7️⃣ **Состояние генерации отчёта**
+@router.get("/interview/{interview_id}/report/job", response_model=ReportJobResponse)
+async def get_report_job_status(interview_id: str, db: AsyncSession = Depends(get_db)):
+    job = await get_latest_report_job(db, interview_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача генерации отчёта не найдена")
+
+    return ReportJobResponse.model_validate(job)
+
+
+@router.get("/report-jobs/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.get(ReportJobDB, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача генерации отчёта не найдена")
+
+    return ReportJobResponse.model_validate(job)
+
+
+# 📺 8️⃣ **Готовый отчёт по интервью**
+@router.get("/interview/{interview_id}/report", response_model=InterviewReportResponse)
+async def get_interview_report(interview_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Возвращает отчёт. Пока отчёт не готов — 202 с состоянием задачи.
+    """
+    interview = await db.get(InterviewDB, interview_id)
+    if not interview:
+        raise HTTPException(status_code=404, detail="Интервью не найдено")
+
+    job = await get_latest_report_job(db, interview_id)
+    response = InterviewReportResponse(
+        interview_id=interview.id,
+        status=interview.status,
+        report=interview.report,
+        job=ReportJobResponse.model_validate(job) if job else None
+    )
+
+    if job and job.status != "done":
+        return JSONResponse(status_code=202, content=response.model_dump(mode="json"))
+
+    return response
+
+
+# 📺 9️⃣ **Потоковая генерация отчёта (SSE)**
+@router.get("/interview/{interview_id}/report/stream")
+async def stream_interview_report(
+    interview_id: str,
+    last_event_id: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Отдаёт отчёт по мере генерации как server-sent events.
+    Поток подключается к задаче генерации из очереди; если задача ещё не взята воркером,
+    она выполняется сразу с интерактивным приоритетом.
+    При переподключении клиент передаёт Last-Event-ID и получает продолжение потока.
+    Если отчёт уже сохранён, он отдаётся одним событием report.
+    """
+    interview = await db.get(InterviewDB, interview_id)
+    if not interview:
+        raise HTTPException(status_code=404, detail="Интервью не найдено")
+    if interview.status != "completed":
+        raise HTTPException(status_code=409, detail="Интервью ещё не завершено")
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    start = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+
+    stream = get_active_stream(interview_id)
+    if stream:
+        return StreamingResponse(stream_report_events(stream, start), media_type="text/event-stream", headers=headers)
+
+    job = await get_latest_report_job(db, interview_id)
+    if interview.report and (job is None or job.status not in ACTIVE_STATUSES):
+        async def saved_report():
+            yield format_sse("report", interview.report)
+            yield format_sse("done", {"length": 1})
+
+        return StreamingResponse(saved_report(), media_type="text/event-stream", headers=headers)
+
+    # 📌 Задача из очереди, которую ещё не взял воркер, выполняется сразу — клиент получает фрагменты отчёта
+    job = await enqueue_report_job(db, interview_id)
+    await db.commit()
+    claimed = await claim_report_job(job.id)
+    if claimed:
+        report_worker_pool.submit(claimed)
+
+    return StreamingResponse(report_job_events(interview_id, start), media_type="text/event-stream", headers=headers)
+
+
+# 📺 **Рейтинг кандидатов по баллам отчёта**
+@router.get("/candidates/top", response_model=TopCandidatesResponse)
+async def get_top_candidates(
+    sort: str = "overall",
+    verdict: Optional[bool] = None,
+    role: Optional[str] = None,
+    min_score: Optional[float] = None,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Лучшие кандидаты: sort — overall / hard_skills / soft_skills, verdict=true — только рекомендованные.
+    """
+    return await top_candidates(db, sort, verdict, role, min_score, limit)
+
+
+# 📺 🔟 **Статистика кэша LLM**
+@router.get("/llm-cache/stats")
+async def get_llm_cache_stats():
+    return completion_cache.stats()
+
+
+# 📺 **Очередь запросов к OpenAI: лимиты, повторы, ожидающие**
+@router.get("/llm-scheduler/stats")
+async def get_llm_scheduler_stats():
+    return llm_scheduler.stats()
+
+
+# 📺 **Банк вопросов: загрузка, перестроение индекса, статистика**
+@router.post("/question-bank")
+async def load_question_bank(request: QuestionBankLoadRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Загружает вопросы в банк: эмбеддинги считаются только для новых вопросов.
+    """
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="Список вопросов пуст")
+    await question_bank.load(db, request.questions, replace=request.replace)
+    return question_bank.stats()
+
+
+@router.post("/question-bank/rebuild")
+async def rebuild_question_bank(force: bool = False, db: AsyncSession = Depends(get_db)):
+    """
+    Перестраивает индекс из таблицы question_bank; force — пересчитать эмбеддинги всех вопросов.
+    """
+    await question_bank.reload(db, force=force)
+    return question_bank.stats()
+
+
+@router.get("/question-bank/stats")
+async def get_question_bank_stats():
+    return question_bank.stats()
+
+
+# 📺 **Метрики Prometheus: задержки запросов и внешних зависимостей**
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
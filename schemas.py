@@ -1,5 +1,6 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List
+from datetime import datetime
 
 
 class CandidateCreate(BaseModel):
@@ -10,6 +11,7 @@ class CandidateCreate(BaseModel):
     email: str
     phone: str
     gender: str
+    role: Optional[str] = None  # Роль (вакансия) для вопросов из банка
 
 
 class CandidateResponse(BaseModel):
@@ -22,6 +24,7 @@ class CandidateResponse(BaseModel):
     phone: str
     gender: str
     interview_link: str
+    role: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)  # Корректная работа с SQLAlchemy
 
@@ -48,3 +51,229 @@ class InterviewFinishResponse(BaseModel):
     message: str
     report: str
 
+
+class ReportJobResponse(BaseModel):
+    """
+    Схема состояния задачи генерации отчёта.
+    """
+    id: str
+    interview_id: str
+    status: str  # queued / running / failed / done
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class InterviewFinishQueuedResponse(BaseModel):
+    """
+    Схема ответа после постановки отчёта в очередь.
+    """
+    message: str
+    job: ReportJobResponse
+
+
+class InterviewReportResponse(BaseModel):
+    """
+    Схема готового отчёта по интервью.
+    """
+    interview_id: str
+    status: str
+    report: Optional[str] = None
+    job: Optional[ReportJobResponse] = None
+
+
+class BulkTranscriptionItem(BaseModel):
+    """
+    Запись ответа для повторного распознавания.
+    """
+    interview_id: str
+    audio_url: str
+
+
+class BulkTranscriptionRequest(BaseModel):
+    """
+    Схема пакетного распознавания записей ответов.
+    """
+    items: List[BulkTranscriptionItem]
+
+
+class BulkTranscriptionResult(BaseModel):
+    """
+    Результат распознавания одной записи.
+    """
+    interview_id: str
+    audio_url: str
+    status: str  # ok / error
+    answer: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkTranscriptionResponse(BaseModel):
+    """
+    Схема ответа пакетного распознавания.
+    """
+    saved: int
+    failed: int
+    results: List[BulkTranscriptionResult]
+
+
+class EmailStatusResponse(BaseModel):
+    """
+    Состояние доставки письма кандидату.
+    """
+    id: int
+    email_to: str
+    subject: str
+    status: str  # pending / sending / sent / failed
+    attempts: int
+    last_error: Optional[str] = None
+    created_at: datetime
+    sent_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BulkRegisterRowResult(BaseModel):
+    """
+    Результат регистрации одной строки пакета.
+    """
+    row: int
+    email: Optional[str] = None
+    status: str  # created / duplicate / invalid
+    candidate: Optional[CandidateResponse] = None
+    error: Optional[str] = None
+
+
+class BulkRegisterResponse(BaseModel):
+    """
+    Схема ответа пакетной регистрации кандидатов.
+    """
+    created: int
+    duplicates: int
+    invalid: int
+    results: List[BulkRegisterRowResult]
+
+
+class InterviewListItem(BaseModel):
+    """
+    Строка списка интервью (без текста вопросов, ответов и отчёта).
+    """
+    id: str
+    candidate_id: str
+    candidate_name: str
+    candidate_email: str
+    status: str
+    created_at: datetime
+    has_report: bool
+    video_url: Optional[str] = None
+
+
+class InterviewListResponse(BaseModel):
+    """
+    Страница списка интервью; next_cursor передаётся в cursor для следующей страницы.
+    """
+    items: List[InterviewListItem]
+    next_cursor: Optional[str] = None
+
+
+class InterviewSearchResult(BaseModel):
+    """
+    Найденное интервью: релевантность и фрагмент текста с подсветкой <b>…</b>.
+    """
+    interview_id: str
+    candidate_id: str
+    candidate_name: str
+    status: str
+    rank: float
+    snippet: Optional[str] = None
+
+
+class InterviewSearchResponse(BaseModel):
+    """
+    Схема ответа полнотекстового поиска по интервью.
+    """
+    query: str
+    results: List[InterviewSearchResult]
+
+
+class QuestionBankItem(BaseModel):
+    """
+    Вопрос банка: роль, компетенция и текст.
+    """
+    role: str
+    competency: Optional[str] = None
+    text: str
+
+
+class QuestionBankLoadRequest(BaseModel):
+    """
+    Загрузка вопросов в банк; replace — заменить вопросы перечисленных ролей целиком.
+    """
+    questions: List[QuestionBankItem]
+    replace: bool = True
+
+
+class ReportScores(BaseModel):
+    """
+    Структурированная оценка интервью: баллы по 5-балльной шкале, вердикт, сильные стороны и зоны роста.
+    """
+    hard_skills: int = Field(ge=1, le=5)
+    soft_skills: int = Field(ge=1, le=5)
+    verdict: bool  # Подходит ли кандидат (Да / Нет)
+    strengths: List[str] = []
+    growth_areas: List[str] = []
+
+    @property
+    def overall_score(self) -> float:
+        return (self.hard_skills + self.soft_skills) / 2
+
+
+class TopCandidate(BaseModel):
+    """
+    Кандидат в рейтинге по баллам отчёта.
+    """
+    interview_id: str
+    candidate_id: str
+    candidate_name: str
+    candidate_email: str
+    role: Optional[str] = None
+    hard_skills: int
+    soft_skills: int
+    overall_score: float
+    verdict: bool
+    strengths: List[str] = []
+
+
+class TopCandidatesResponse(BaseModel):
+    """
+    Схема ответа рейтинга кандидатов.
+    """
+    sort: str
+    items: List[TopCandidate]
+
+
+class VideoUploadCreate(BaseModel):
+    """
+    Начало загрузки видео: размер файла, тип и (необязательно) SHA-256 всего файла.
+    """
+    size: int = Field(gt=0)
+    content_type: str = "video/webm"
+    sha256: Optional[str] = None
+
+
+class VideoUploadResponse(BaseModel):
+    """
+    Состояние загрузки видео; следующий фрагмент отправляется со смещения uploaded.
+    """
+    id: str
+    interview_id: str
+    status: str  # uploading / completed / aborted
+    size: int
+    uploaded: int
+    chunk_size: int
+    video_url: Optional[str] = None
@@ -1,7 +1,10 @@
 import smtplib
 import os
+import queue
+import time
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from metrics import track
 
 # Получаем данные для SMTP из переменных окружения
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.yandex.com")  # SMTP-сервер Яндекса
@@ -9,23 +12,19 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", 465))  # Яндекс используе
 SMTP_USERNAME = os.getenv("SMTP_USERNAME")  # Логин (почта отправителя)
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")  # Пароль от почты (API-ключ)
 EMAIL_FROM = os.getenv("EMAIL_FROM", SMTP_USERNAME)  # Почта отправителя
+SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "true").lower() == "true"  # false — обычный SMTP (локальный отладочный сервер)
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))  # Сколько соединений держать открытыми
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+SMTP_IDLE_CHECK = float(os.getenv("SMTP_IDLE_CHECK", 30))  # После простоя соединение проверяется NOOP, сек
 
-def send_interview_email(email_to, interview_link):
-    """
-    Отправка email с ссылкой на интервью через Яндекс.Почту.
-    """
-    if not SMTP_USERNAME or not SMTP_PASSWORD:
-        print("Ошибка: SMTP_USERNAME или SMTP_PASSWORD не установлены!")
-        return False
+INTERVIEW_EMAIL_SUBJECT = "Ваше интервью с AI HR"
 
-    try:
-        # Формируем email
-        msg = MIMEMultipart()
-        msg["From"] = EMAIL_FROM
-        msg["To"] = email_to
-        msg["Subject"] = "Ваше интервью с AI HR"
 
-        body = f"""\
+def build_interview_email(interview_link):
+    """
+    Тема и HTML-текст письма со ссылкой на интервью.
+    """
+    body = f"""\
         <html>
         <body>
             <h2>Привет!</h2>
@@ -36,12 +35,121 @@ def send_interview_email(email_to, interview_link):
         </body>
         </html>
         """
-        msg.attach(MIMEText(body, "html"))
+    return INTERVIEW_EMAIL_SUBJECT, body
+
+
+def build_message(email_to, subject, body):
+    msg = MIMEMultipart()
+    msg["From"] = EMAIL_FROM
+    msg["To"] = email_to
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body, "html"))
+    return msg
+
+
+class SMTPConnection:
+    """
+    Авторизованное SMTP-соединение, которое переиспользуется для многих писем.
+    Переподключается при обрыве и после SMTP_MAX_MESSAGES_PER_CONNECTION писем.
+    """
+
+    def __init__(self):
+        self._server = None
+        self._sent = 0
+        self._last_used = 0.0
+
+    def _connect(self):
+        with track("smtp", "connect"):
+            if SMTP_USE_SSL:
+                server = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, timeout=30)
+            else:
+                server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
+            if SMTP_USERNAME and SMTP_PASSWORD:
+                server.login(SMTP_USERNAME, SMTP_PASSWORD)
+        self._server = server
+        self._sent = 0
+
+    def _is_alive(self):
+        if self._server is None or self._sent >= SMTP_MAX_MESSAGES_PER_CONNECTION:
+            return False
+        if time.monotonic() - self._last_used < SMTP_IDLE_CHECK:
+            return True
+        try:
+            return self._server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    def send(self, msg):
+        if not self._is_alive():
+            self.close()
+            self._connect()
+
+        with track("smtp", "sendmail"):
+            try:
+                self._server.sendmail(EMAIL_FROM, msg["To"], msg.as_string())
+            except (smtplib.SMTPServerDisconnected, OSError):
+                # Соединение оборвалось между проверкой и отправкой — одна повторная попытка
+                self.close()
+                self._connect()
+                self._server.sendmail(EMAIL_FROM, msg["To"], msg.as_string())
+
+        self._sent += 1
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
 
-        # Подключаемся к Яндекс SMTP-серверу (используем SSL)
-        server = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT)
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        server.sendmail(EMAIL_FROM, email_to, msg.as_string())
+
+class SMTPConnectionPool:
+    """
+    Пул SMTP-соединений для отправки из нескольких потоков.
+    """
+
+    def __init__(self, size: int = SMTP_POOL_SIZE):
+        self._connections = queue.Queue()
+        for _ in range(size):
+            self._connections.put(SMTPConnection())
+
+    def send(self, email_to, subject, body):
+        connection = self._connections.get()
+        try:
+            connection.send(build_message(email_to, subject, body))
+        finally:
+            self._connections.put(connection)
+
+    def close(self):
+        """
+        Закрывает простаивающие соединения; пул остаётся рабочим и переподключится при отправке.
+        """
+        connections = []
+        while not self._connections.empty():
+            connections.append(self._connections.get_nowait())
+        for connection in connections:
+            connection.close()
+            self._connections.put(connection)
+
+
+smtp_pool = SMTPConnectionPool()
+
+
+def send_interview_email(email_to, interview_link):
+    """
+    Отправка email с ссылкой на интервью через Яндекс.Почту.
+    """
+    if not SMTP_USERNAME or not SMTP_PASSWORD:
+        print("Ошибка: SMTP_USERNAME или SMTP_PASSWORD не установлены!")
+        return False
+
+    try:
+        subject, body = build_interview_email(interview_link)
+        smtp_pool.send(email_to, subject, body)
 
         print(f"✅ Email успешно отправлен на {email_to}")
         return True
@@ -49,7 +157,3 @@ def send_interview_email(email_to, interview_link):
     except Exception as e:
         print(f"❌ Ошибка отправки email: {e}")
         return False
-
-    finally:
-        if 'server' in locals():
-            server.quit()  # Закрываем соединение
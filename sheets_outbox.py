@@ -0,0 +1,204 @@
+import os
+import json
+import random
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_, and_
+from database import SessionLocal
+from models import SheetsOutboxDB
+from google_sheets import resolve_worksheet, sheets_session
+from metrics import track
+
+# Настройки выгрузки
+SHEETS_FLUSH_INTERVAL = float(os.getenv("SHEETS_FLUSH_INTERVAL", 2))  # Пауза между проходами, сек
+SHEETS_FLUSH_BATCH = int(os.getenv("SHEETS_FLUSH_BATCH", 500))  # Максимум строк за проход
+SHEETS_RETRY_DELAY = float(os.getenv("SHEETS_RETRY_DELAY", 5))  # Базовая задержка повтора, сек
+SHEETS_MAX_RETRY_DELAY = float(os.getenv("SHEETS_MAX_RETRY_DELAY", 600))
+SHEETS_MAX_ATTEMPTS = int(os.getenv("SHEETS_MAX_ATTEMPTS", 20))  # После стольких ошибок строка помечается failed
+SHEETS_LEASE = float(os.getenv("SHEETS_LEASE", 300))  # Сколько секунд строка закреплена за выгрузкой
+SHEETS_SENT_RETENTION = float(os.getenv("SHEETS_SENT_RETENTION", 7 * 24 * 3600))  # Сколько хранить отправленные строки, сек
+SHEETS_PRUNE_INTERVAL = float(os.getenv("SHEETS_PRUNE_INTERVAL", 3600))  # Пауза между очистками, сек
+
+
+def _is_quota_error(error):
+    # gspread.exceptions.APIError хранит HTTP-ответ; проверка по статусу не требует импорта gspread
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+def _retry_delay(attempts, quota=False):
+    # Экспоненциальная задержка с джиттером; при исчерпании квоты стартуем с минуты
+    base = 60 if quota else SHEETS_RETRY_DELAY
+    delay = min(SHEETS_MAX_RETRY_DELAY, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _claimable_row(now: datetime):
+    return or_(
+        and_(SheetsOutboxDB.status == "pending", SheetsOutboxDB.next_attempt_at <= now),
+        and_(SheetsOutboxDB.status == "sending", SheetsOutboxDB.locked_until < now)
+    )
+
+
+def claim_sheets_rows(session, now: datetime):
+    """
+    Захватывает пачку строк условным UPDATE (pending → sending с арендой) и сразу фиксирует транзакцию:
+    строку получает только одна выгрузка, а блокировки не держатся во время запроса к Google Sheets.
+    Строки с истёкшей арендой (упавший процесс) возвращаются в работу.
+    """
+    candidates = session.execute(
+        select(SheetsOutboxDB.id)
+        .where(_claimable_row(now))
+        .order_by(SheetsOutboxDB.id)
+        .limit(SHEETS_FLUSH_BATCH)
+    ).scalars().all()
+
+    claimed = []
+    for row_id in candidates:
+        result = session.execute(
+            update(SheetsOutboxDB)
+            .where(SheetsOutboxDB.id == row_id, _claimable_row(now))
+            .values(status="sending", locked_until=now + timedelta(seconds=SHEETS_LEASE))
+            .execution_options(synchronize_session=False)
+        )
+        # 📌 Строку уже забрала другая выгрузка
+        if result.rowcount == 1:
+            claimed.append(row_id)
+    session.commit()
+
+    if not claimed:
+        return []
+    return session.query(SheetsOutboxDB).filter(SheetsOutboxDB.id.in_(claimed)).order_by(SheetsOutboxDB.id).all()
+
+
+def flush_sheets_outbox():
+    """
+    Один проход выгрузки: строки группируются по листу и отправляются одним append_rows.
+    Строка помечается отправленной только после успешной записи (at-least-once).
+    Возвращает количество обработанных строк.
+    """
+    # Строки остаются загруженными после commit — транзакция не держится открытой во время запросов к Google Sheets
+    session = SessionLocal(expire_on_commit=False)
+    try:
+        now = datetime.utcnow()
+        entries = claim_sheets_rows(session, now)
+        session.commit()
+
+        groups = defaultdict(list)
+        for entry in entries:
+            groups[(entry.spreadsheet, entry.worksheet)].append(entry)
+
+        for (spreadsheet_name, sheet_name), group in groups.items():
+            try:
+                worksheet = resolve_worksheet(spreadsheet_name, sheet_name)
+                with track("sheets", "append_rows"):
+                    worksheet.append_rows([json.loads(entry.row) for entry in group])
+            except Exception as e:
+                sheets_session.invalidate()
+                quota = _is_quota_error(e)
+                for entry in group:
+                    entry.attempts += 1
+                    entry.last_error = str(e)
+                    entry.locked_until = None
+                    if entry.attempts >= SHEETS_MAX_ATTEMPTS:
+                        entry.status = "failed"
+                        print(f"❌ Строка {entry.id} не выгружена в Google Sheets за {entry.attempts} попыток: {e}")
+                    else:
+                        entry.status = "pending"
+                        entry.next_attempt_at = now + timedelta(seconds=_retry_delay(entry.attempts, quota))
+                session.commit()
+                continue
+
+            for entry in group:
+                entry.status = "sent"
+                entry.sent_at = now
+                entry.locked_until = None
+            # Каждый лист фиксируется сразу — после сбоя процесса выгруженные строки не отправятся повторно
+            session.commit()
+
+        return len(entries)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def prune_sheets_outbox(retention: float = SHEETS_SENT_RETENTION):
+    """
+    Удаляет строки, отправленные раньше retention секунд назад. Строки failed остаются для разбора.
+    Возвращает количество удалённых строк.
+    """
+    session = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=retention)
+        deleted = (
+            session.query(SheetsOutboxDB)
+            .filter(SheetsOutboxDB.status == "sent", SheetsOutboxDB.sent_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        session.commit()
+        return deleted
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+class SheetsOutboxFlusher:
+    """
+    Фоновая выгрузка очереди в Google Sheets.
+    Сбой Google Sheets не влияет на обработку интервью — строки ждут в БД.
+    """
+
+    def __init__(self, interval: float = SHEETS_FLUSH_INTERVAL):
+        self.interval = interval
+        self._stop = asyncio.Event()
+        self._task = None
+        self._pruned_at = 0.0
+
+    def start(self):
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _prune(self):
+        # Отправленные строки больше не нужны — таблица очереди не растёт бесконечно
+        if time.monotonic() - self._pruned_at < SHEETS_PRUNE_INTERVAL:
+            return
+        self._pruned_at = time.monotonic()
+        try:
+            deleted = await asyncio.to_thread(prune_sheets_outbox)
+            if deleted:
+                print(f"✅ Очередь Google Sheets: удалено отправленных строк: {deleted}")
+        except Exception as e:
+            print(f"❌ Ошибка очистки очереди Google Sheets: {e}")
+
+    async def _run(self):
+        while not self._stop.is_set():
+            await self._prune()
+            try:
+                flushed = await asyncio.to_thread(flush_sheets_outbox)
+            except Exception as e:
+                print(f"❌ Ошибка выгрузки в Google Sheets: {e}")
+                flushed = 0
+
+            # Полная пачка — в очереди ещё есть строки, продолжаем сразу
+            if flushed >= SHEETS_FLUSH_BATCH:
+                continue
+
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+sheets_outbox_flusher = SheetsOutboxFlusher()
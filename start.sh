@@ -1 +1 @@
-uvicorn app:app --host 0.0.0.0 --port 8000
+python init_db.py && uvicorn app:app --host 0.0.0.0 --port 8000
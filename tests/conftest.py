@@ -0,0 +1,61 @@
+"""
+Общие фикстуры тестов: приложение на временной SQLite (aiosqlite) с фейковыми LLM, расшифровкой и Google Sheets.
+Переменные окружения задаются до импорта модулей приложения — настройки читаются при импорте.
+"""
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = tempfile.mkdtemp(prefix="aihr-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}",
+    "DB_ECHO": "false",
+    "LLM_BACKEND": "fake",
+    "TRANSCRIBER_BACKEND": "fake",
+    "SHEETS_BACKEND": "memory",
+    "VIDEO_STORAGE_DIR": os.path.join(TEST_DIR, "videos"),
+    "FRONTEND_URL": "http://frontend.test",
+    # Фоновые воркеры проходят очереди при старте и дальше не вмешиваются в тесты
+    "REPORT_JOB_POLL_INTERVAL": "3600",
+    "EMAIL_POLL_INTERVAL": "3600",
+    "SHEETS_FLUSH_INTERVAL": "3600",
+})
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from init_db import init_db
+    import app
+
+    init_db()
+    with TestClient(app.app) as client:
+        yield client
+
+
+@pytest.fixture
+def run(client):
+    """
+    Выполняет корутинную функцию в event loop приложения — том же, что обслуживает запросы TestClient.
+    """
+    return client.portal.call
+
+
+@pytest.fixture
+def candidate(client):
+    response = client.post("/register/", json={
+        "name": "Иван", "email": f"ivan-{os.urandom(4).hex()}@example.com", "phone": "+70000000000", "gender": "m"
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture
+def interview(client, candidate):
+    response = client.get(f"/interview/{candidate['id']}")
+    assert response.status_code == 200
+    return response.json()
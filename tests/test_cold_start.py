@@ -0,0 +1,9 @@
+import os
+from benchmarks import cold_start
+
+
+def test_cold_start_fits_budget(tmp_path):
+    budget = float(os.getenv("COLD_START_BUDGET", 2.0))
+    result = cold_start.measure(f"sqlite:///{tmp_path / 'cold_start.db'}")
+
+    assert result["total_s"] <= budget
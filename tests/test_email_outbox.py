@@ -0,0 +1,29 @@
+import asyncio
+from sqlalchemy import delete, select
+from database import AsyncSessionLocal
+from models import EmailOutboxDB
+from email_outbox import enqueue_interview_email, claim_emails
+
+
+async def _enqueue_and_claim_concurrently(candidate_id, emails, senders):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(EmailOutboxDB))
+        for index in range(emails):
+            enqueue_interview_email(db, candidate_id, f"c{index}@example.com", "http://frontend.test/interview/x")
+        await db.commit()
+    return await asyncio.gather(*(claim_emails() for _ in range(senders)))
+
+
+async def _statuses():
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(EmailOutboxDB.status, EmailOutboxDB.attempts))).all()
+
+
+def test_concurrent_senders_claim_each_email_once(run, candidate):
+    batches = run(_enqueue_and_claim_concurrently, candidate["id"], 5, 3)
+
+    claimed = [email[0] for batch in batches for email in batch]
+    assert len(claimed) == 5
+    assert len(set(claimed)) == 5
+    assert run(_statuses) == [("sending", 1)] * 5
+    assert run(claim_emails) == []
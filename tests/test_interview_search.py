@@ -0,0 +1,31 @@
+from database import AsyncSessionLocal
+from interview_search import index_turn, index_report
+
+
+async def _index(interview_id, answer, report):
+    async with AsyncSessionLocal() as db:
+        await index_turn(db, interview_id, answer=answer)
+        await index_report(db, interview_id, report)
+        await db.commit()
+
+
+def _result(client, query, interview_id):
+    response = client.get("/interviews/search", params={"q": query})
+    assert response.status_code == 200
+    return next(result for result in response.json()["results"] if result["interview_id"] == interview_id)
+
+
+def test_transcript_only_hit_highlights_transcript(client, run, interview):
+    run(_index, interview["id"], "Разворачивал сервисы в Kubernetes и писал Helm-чарты", "Кандидат хороший, рекомендуем")
+
+    result = _result(client, "kubernetes", interview["id"])
+    assert "<b>Kubernetes</b>" in result["snippet"]
+    assert "рекомендуем" not in result["snippet"]
+
+
+def test_report_hit_highlights_report(client, run, interview):
+    run(_index, interview["id"], "Работал с базами данных", "Сильная стрессоустойчивость, рекомендуем")
+
+    result = _result(client, "стрессоустойчивость", interview["id"])
+    assert "<b>" in result["snippet"]
+    assert "рекомендуем" in result["snippet"]
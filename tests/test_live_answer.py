@@ -0,0 +1,31 @@
+import pytest
+from transcription import LiveTranscriber, FakeTranscriber, create_live_transcriber
+
+
+def test_live_transcriber_requires_interface():
+    class Incomplete(LiveTranscriber):
+        async def send(self, chunk: bytes):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    assert isinstance(create_live_transcriber(), FakeTranscriber)
+
+
+def test_live_answer_streams_final_then_question(client, interview):
+    with client.websocket_connect(f"/interview/{interview['id']}/answer/live") as websocket:
+        websocket.send_bytes("Пять лет пишу на Python.".encode("utf-8"))
+        messages = [websocket.receive_json()]
+        while messages[-1]["type"] != "question":
+            messages.append(websocket.receive_json())
+        websocket.send_text("stop")
+
+    assert messages[0] == {"type": "final", "text": "Пять лет пишу на Python."}
+    deltas = messages[1:-1]
+    assert deltas and {message["type"] for message in deltas} == {"question_delta"}
+    question = messages[-1]["text"]
+    assert question == "".join(message["text"] for message in deltas).strip()
+
+    saved = client.get(f"/interview/{interview['id']}").json()
+    assert "Пять лет пишу на Python." in saved["answers"]
+    assert question in saved["questions"]
@@ -0,0 +1,134 @@
+import time
+import asyncio
+import pytest
+import llm_scheduler
+from llm_scheduler import LLMScheduler, FakeLLMBackend, RetryableLLMError, INTERACTIVE, BATCH, count_tokens
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_RETRY_DELAY", 0.01)
+
+
+def _messages(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_chat_retries_rate_limit_after_retry_after():
+    backend = FakeLLMBackend(fail_first=2)
+    scheduler = LLMScheduler(backend, seed=1)
+
+    started = time.monotonic()
+    content = asyncio.run(scheduler.chat("gpt-4o", _messages("Привет")))
+
+    # retry-after-ms: 10 у каждого из двух отказов
+    assert time.monotonic() - started >= 0.02
+    assert content == "[gpt-4o] Ответ на запрос из 6 символов: Привет"
+    assert len(backend.calls) == 3
+    assert scheduler.counters == {"requests": 3, "retries": 2, "rate_limited": 2, "failed": 0}
+    assert scheduler.usage["gpt-4o"]["requests"] == 1
+
+
+def test_retry_delay_follows_retry_after_header():
+    scheduler = LLMScheduler(FakeLLMBackend(), seed=1)
+
+    delay = scheduler._retry_delay(RetryableLLMError("429", 429, {"Retry-After": "2"}), 0)
+    assert 2 <= delay <= 2.01
+    delay = scheduler._retry_delay(RetryableLLMError("429", 429, {"retry-after-ms": "250"}), 3)
+    assert 0.25 <= delay <= 0.26
+
+
+def test_chat_gives_up_after_max_retries():
+    backend = FakeLLMBackend(fail_first=10)
+    scheduler = LLMScheduler(backend, max_retries=2, seed=1)
+
+    with pytest.raises(RetryableLLMError):
+        asyncio.run(scheduler.chat("gpt-4o", _messages("Привет")))
+
+    assert len(backend.calls) == 3
+    assert scheduler.counters == {"requests": 3, "retries": 2, "rate_limited": 3, "failed": 1}
+
+
+async def _collect(scheduler, text):
+    deltas = await scheduler.stream("gpt-4o", _messages(text))
+    return "".join([delta async for delta in deltas])
+
+
+def test_stream_retries_rate_limit():
+    backend = FakeLLMBackend(fail_first=1)
+    scheduler = LLMScheduler(backend, seed=1)
+
+    content = asyncio.run(_collect(scheduler, "Расскажите о себе"))
+
+    assert content.strip() == "[gpt-4o] Ответ на запрос из 17 символов: Расскажите о себе"
+    assert len(backend.calls) == 2
+    assert scheduler.counters["retries"] == 1
+
+
+class NoLimitHeadersBackend(FakeLLMBackend):
+    """
+    Ответы без x-ratelimit-*: бюджет TPM меняется только оценкой и поправкой планировщика.
+    """
+
+    def _headers(self):
+        return {}
+
+
+def test_stream_records_usage_and_corrects_tpm_estimate():
+    scheduler = LLMScheduler(NoLimitHeadersBackend(), tpm=100000, seed=1)
+
+    content = asyncio.run(_collect(scheduler, "Расскажите о себе"))
+
+    usage = scheduler.usage["gpt-4o"]
+    assert usage["requests"] == 1
+    assert usage["completion_tokens"] == count_tokens(content)
+    # Оценка TPM (с запасом LLM_COMPLETION_TOKENS на ответ) поправлена на фактический расход
+    spent = usage["prompt_tokens"] + usage["completion_tokens"]
+    assert scheduler.tokens.available == pytest.approx(100000 - spent, abs=1)
+
+
+class FirstChunkFailingBackend(FakeLLMBackend):
+    """
+    Подключение проходит, но первый фрагмент первого ответа обрывается 502.
+    """
+
+    async def stream(self, model, messages, **params):
+        headers, deltas = await super().stream(model, messages, **params)
+        if len(self.calls) > 1:
+            return headers, deltas
+
+        async def failing():
+            raise RetryableLLMError("Bad gateway", 502)
+            yield
+
+        return headers, failing()
+
+
+def test_stream_retries_failure_before_first_chunk():
+    backend = FirstChunkFailingBackend()
+    scheduler = LLMScheduler(backend, seed=1)
+
+    content = asyncio.run(_collect(scheduler, "Привет"))
+
+    assert content.strip() == "[gpt-4o] Ответ на запрос из 6 символов: Привет"
+    assert len(backend.calls) == 2
+    assert scheduler.counters["retries"] == 1
+
+
+async def _chat_in_order(scheduler):
+    # Пока лимит исчерпан, в очереди копятся запросы обоих приоритетов
+    scheduler.requests.block(0.05, time.monotonic())
+    tasks = [
+        asyncio.create_task(scheduler.chat("gpt-4o", _messages(name), priority=priority))
+        for name, priority in [("batch-1", BATCH), ("batch-2", BATCH), ("live-1", INTERACTIVE), ("live-2", INTERACTIVE)]
+    ]
+    await asyncio.gather(*tasks)
+
+
+def test_interactive_requests_go_before_batch():
+    backend = FakeLLMBackend()
+    scheduler = LLMScheduler(backend, seed=1)
+
+    asyncio.run(_chat_in_order(scheduler))
+
+    assert [messages[-1]["content"] for _, messages in backend.calls] == ["live-1", "live-2", "batch-1", "batch-2"]
@@ -0,0 +1,35 @@
+import asyncio
+from sqlalchemy import delete
+from database import AsyncSessionLocal
+from models import ReportJobDB
+from report_jobs import enqueue_report_job, claim_report_job
+
+
+async def _enqueue_and_claim_concurrently(interview_id, claims):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(ReportJobDB))
+        job = await enqueue_report_job(db, interview_id)
+        await db.commit()
+    return job.id, await asyncio.gather(*(claim_report_job() for _ in range(claims)))
+
+
+def test_concurrent_claims_take_job_once(run, interview):
+    job_id, claims = run(_enqueue_and_claim_concurrently, interview["id"], 4)
+
+    claimed = [claim for claim in claims if claim]
+    assert claimed == [(job_id, interview["id"], False)]
+
+
+async def _job(job_id):
+    async with AsyncSessionLocal() as db:
+        return await db.get(ReportJobDB, job_id)
+
+
+def test_claimed_job_is_running_with_one_attempt(run, interview):
+    job_id, _ = run(_enqueue_and_claim_concurrently, interview["id"], 2)
+
+    job = run(_job, job_id)
+    assert job.status == "running"
+    assert job.attempts == 1
+    assert job.locked_until is not None
+    assert run(claim_report_job) is None
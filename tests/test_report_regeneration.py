@@ -0,0 +1,88 @@
+import os
+import sys
+import asyncio
+import pytest
+from sqlalchemy import select
+import report_regeneration
+from database import AsyncSessionLocal
+from llm_scheduler import llm_scheduler
+from models import InterviewDB, ReportRegenerationItemDB
+from report_regeneration import ReportRegenerator, create_run, get_run
+
+
+def _interviews(client, role, count):
+    ids = []
+    for index in range(count):
+        response = client.post("/register/", json={
+            "name": f"Кандидат {index}", "email": f"regen-{os.urandom(4).hex()}@example.com",
+            "phone": "+70000000000", "gender": "f", "role": role
+        })
+        ids.append(response.json()["id"])
+        assert client.get(f"/interview/{ids[-1]}").status_code == 200
+    return ids
+
+
+async def _interrupted_run(role, stop_after):
+    run_id = await create_run({"role": role})
+    task = asyncio.create_task(ReportRegenerator(run_id, concurrency=1, batch_size=1).run())
+    while (await get_run(run_id))["done"] < stop_after:
+        await asyncio.sleep(0.01)
+    # 📌 Процесс «падает» посреди запуска: незаписанные результаты теряются
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return run_id, await get_run(run_id)
+
+
+async def _items(run_id):
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(
+            select(ReportRegenerationItemDB.interview_id, ReportRegenerationItemDB.status, ReportRegenerationItemDB.attempts)
+            .where(ReportRegenerationItemDB.run_id == run_id)
+        )).all()
+
+
+async def _reports(interview_ids):
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(
+            select(InterviewDB.report).where(InterviewDB.id.in_(interview_ids))
+        )).scalars().all()
+
+
+def test_resume_finishes_each_item_exactly_once(client, run, monkeypatch):
+    monkeypatch.setattr(llm_scheduler.backend, "latency", 0.02)
+    role = f"regen-{os.urandom(4).hex()}"
+    interview_ids = _interviews(client, role, 5)
+
+    run_id, interrupted = run(_interrupted_run, role, 2)
+    assert interrupted["status"] == "running"
+    assert 2 <= interrupted["done"] < 5
+
+    resumed = run(ReportRegenerator(run_id, concurrency=2, batch_size=2).run)
+
+    assert (resumed["status"], resumed["total"], resumed["done"], resumed["failed"], resumed["pending"]) == ("done", 5, 5, 0, 0)
+    items = run(_items, run_id)
+    assert sorted(item.interview_id for item in items) == sorted(interview_ids)
+    assert {(item.status, item.attempts) for item in items} == {("done", 1)}
+    assert all(run(_reports, interview_ids))
+
+
+def test_fake_llm_refuses_non_sqlite_database(monkeypatch):
+    backend = llm_scheduler.backend
+    monkeypatch.setattr(report_regeneration, "DATABASE_URL", "postgresql://hr:hr@db.example.com/hr")
+    monkeypatch.setattr(sys, "argv", ["report_regeneration.py", "start", "--fake-llm"])
+
+    with pytest.raises(SystemExit, match="--allow-fake-on-db"):
+        asyncio.run(report_regeneration.main())
+    assert llm_scheduler.backend is backend
+
+
+def test_fake_llm_allowed_on_database_with_flag(run, monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "backend", llm_scheduler.backend)
+    monkeypatch.setattr(report_regeneration, "DATABASE_URL", "postgresql://hr:hr@db.example.com/hr")
+    monkeypatch.setattr(sys, "argv", [
+        "report_regeneration.py", "start", "--fake-llm", "--allow-fake-on-db", "--candidate-id", "missing"
+    ])
+
+    run(report_regeneration.main)
+
+    assert run(get_run)["total"] == 0
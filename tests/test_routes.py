@@ -0,0 +1,80 @@
+import time
+import routes
+from database import AsyncSessionLocal
+from models import CandidateDB, EmailOutboxDB
+from sqlalchemy import select
+
+
+async def _registered(candidate_id):
+    async with AsyncSessionLocal() as db:
+        candidate = await db.get(CandidateDB, candidate_id)
+        emails = (await db.execute(
+            select(EmailOutboxDB).where(EmailOutboxDB.candidate_id == candidate_id)
+        )).scalars().all()
+        return candidate, emails
+
+
+def test_register_saves_candidate_and_queues_email(run, candidate):
+    assert candidate["interview_link"] == f"http://frontend.test/interview/{candidate['id']}"
+
+    saved, emails = run(_registered, candidate["id"])
+    assert saved.email == candidate["email"]
+    assert [email.email_to for email in emails] == [candidate["email"]]
+
+
+def test_start_interview_asks_first_question(client, candidate, interview):
+    assert interview["status"] == "in_progress"
+    assert "Иван" in interview["questions"]
+
+    etag = client.get(f"/interview/{candidate['id']}").headers["ETag"]
+    response = client.get(f"/interview/{candidate['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_start_interview_unknown_candidate(client):
+    assert client.get("/interview/missing").status_code == 404
+
+
+def test_answer_saves_transcript_and_next_question(client, interview, monkeypatch):
+    async def transcribe(audio_url):
+        return f"Ответ из {audio_url}"
+
+    monkeypatch.setattr(routes, "transcribe_audio", transcribe)
+
+    response = client.post(f"/interview/{interview['id']}/answer", params={"audio_url": "https://audio.test/1.wav"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["answer"] == "Ответ из https://audio.test/1.wav"
+    assert body["question"]
+
+    saved = client.get(f"/interview/{interview['id']}").json()
+    assert "Ответ из https://audio.test/1.wav" in saved["answers"]
+
+
+def _wait_for_report(client, interview_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get(f"/interview/{interview_id}/report")
+        if response.status_code == 200:
+            return response.json()
+        time.sleep(0.05)
+    raise AssertionError("Отчёт не сгенерирован")
+
+
+def test_finish_queues_report_and_stream_generates_it(client, interview):
+    assert client.get(f"/interview/{interview['id']}/report/stream").status_code == 409
+
+    response = client.post(f"/interview/{interview['id']}/finish")
+    assert response.status_code == 202
+    assert response.json()["job"]["status"] == "queued"
+    assert client.get(f"/interview/{interview['id']}/report").status_code == 202
+
+    stream = client.get(f"/interview/{interview['id']}/report/stream")
+    assert stream.status_code == 200
+    assert "event: done" in stream.text
+
+    report = _wait_for_report(client, interview["id"])
+    assert report["status"] == "completed"
+    assert report["report"]
+    assert report["job"]["status"] == "done"
+    assert report["job"]["attempts"] == 1
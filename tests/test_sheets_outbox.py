@@ -0,0 +1,71 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from google_sheets import SHEET_CANDIDATES
+import sheets_outbox
+from database import SessionLocal
+from models import SheetsOutboxDB
+from sheets_outbox import claim_sheets_rows, flush_sheets_outbox
+
+
+def _reset_outbox(rows):
+    session = SessionLocal()
+    try:
+        session.query(SheetsOutboxDB).delete()
+        for index in range(rows):
+            session.add(SheetsOutboxDB(worksheet=SHEET_CANDIDATES, row=json.dumps([index])))
+        session.commit()
+    finally:
+        session.close()
+
+
+def _statuses():
+    session = SessionLocal()
+    try:
+        return [(entry.status, entry.attempts) for entry in session.query(SheetsOutboxDB).order_by(SheetsOutboxDB.id)]
+    finally:
+        session.close()
+
+
+def _claim():
+    session = SessionLocal(expire_on_commit=False)
+    try:
+        return [entry.id for entry in claim_sheets_rows(session, datetime.utcnow())]
+    finally:
+        session.close()
+
+
+def test_concurrent_flushers_claim_each_row_once(client):
+    _reset_outbox(6)
+
+    with ThreadPoolExecutor(3) as pool:
+        batches = list(pool.map(lambda _: _claim(), range(3)))
+
+    claimed = [row_id for batch in batches for row_id in batch]
+    assert len(claimed) == 6
+    assert len(set(claimed)) == 6
+    assert _statuses() == [("sending", 0)] * 6
+
+
+def test_failed_rows_return_to_pending_then_fail(client, monkeypatch):
+    _reset_outbox(2)
+
+    def unavailable(spreadsheet_name, sheet_name):
+        raise RuntimeError("Google Sheets недоступен")
+
+    monkeypatch.setattr(sheets_outbox, "resolve_worksheet", unavailable)
+    monkeypatch.setattr(sheets_outbox, "SHEETS_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(sheets_outbox, "_retry_delay", lambda attempts, quota=False: 0)
+
+    assert flush_sheets_outbox() == 2
+    assert _statuses() == [("pending", 1)] * 2
+    assert flush_sheets_outbox() == 2
+    assert _statuses() == [("failed", 2)] * 2
+    assert flush_sheets_outbox() == 0
+
+
+def test_flush_marks_rows_sent(client):
+    _reset_outbox(3)
+
+    assert flush_sheets_outbox() == 3
+    assert _statuses() == [("sent", 0)] * 3
@@ -0,0 +1,45 @@
+import asyncio
+
+
+class TextStream:
+    """
+    Текст, который генерируется в памяти процесса: накопленные фрагменты и ожидание новых.
+    Читатели получают поток с любого номера фрагмента, поэтому могут переподключаться.
+    Используется для потока отчёта (SSE) и черновика следующего вопроса.
+    """
+
+    def __init__(self, interview_id: str):
+        self.interview_id = interview_id
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, chunk: str):
+        async with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    async def finish(self, error: str = None):
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def follow(self, start: int = 0):
+        """
+        Отдаёт пары (номер, фрагмент) начиная с start, пока генерация не завершится.
+        """
+        position = start
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.chunks) > position or self.done)
+                pending = self.chunks[position:]
+                done = self.done
+
+            for chunk in pending:
+                yield position, chunk
+                position += 1
+
+            if done and position >= len(self.chunks):
+                return
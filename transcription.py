@@ -0,0 +1,180 @@
+import os
+import json
+import asyncio
+from abc import ABC, abstractmethod
+from typing import NamedTuple
+from urllib.parse import urlencode
+import aiohttp
+from fastapi import HTTPException
+from http_clients import http_clients
+from metrics import track
+
+# Настройки распознавания
+DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
+DEEPGRAM_API_URL = os.getenv("DEEPGRAM_API_URL", "https://api.deepgram.com/v1/listen")
+DEEPGRAM_LIVE_URL = os.getenv("DEEPGRAM_LIVE_URL", "wss://api.deepgram.com/v1/listen")
+DEEPGRAM_ENDPOINTING_MS = int(os.getenv("DEEPGRAM_ENDPOINTING_MS", 800))  # Пауза, после которой фраза считается законченной
+TRANSCRIBER_BACKEND = os.getenv("TRANSCRIBER_BACKEND", "deepgram")  # deepgram / fake
+
+
+async def transcribe_prerecorded(audio_url: str, language: str = "ru") -> str:
+    """
+    Распознаёт готовую запись по ссылке через общий пул соединений к Deepgram.
+    """
+    if not DEEPGRAM_API_KEY:
+        raise HTTPException(status_code=500, detail="Deepgram API key отсутствует!")
+
+    session = http_clients.aiohttp_session()
+    with track("deepgram", "prerecorded"):
+        async with session.post(
+            DEEPGRAM_API_URL,
+            params={"punctuate": "true", "language": language},
+            json={"url": audio_url},
+            headers={"Authorization": f"Token {DEEPGRAM_API_KEY}"}
+        ) as response:
+            if response.status != 200:
+                raise HTTPException(status_code=502, detail=f"Ошибка Deepgram: {await response.text()}")
+            data = await response.json()
+
+    return data["results"]["channels"][0]["alternatives"][0]["transcript"]
+
+
+class TranscriptEvent(NamedTuple):
+    """
+    Результат распознавания: промежуточный (is_final=False) или окончательный фрагмент.
+    utterance_end=True — кандидат закончил фразу.
+    """
+    text: str
+    is_final: bool
+    utterance_end: bool = False
+
+
+class LiveTranscriber(ABC):
+    """
+    Интерфейс потокового распознавания: аудио отправляется фрагментами,
+    результаты читаются из events() до закрытия потока.
+    """
+
+    async def start(self):
+        pass
+
+    @abstractmethod
+    async def send(self, chunk: bytes):
+        ...
+
+    @abstractmethod
+    async def finish(self):
+        """
+        Сообщает, что аудио больше не будет; events() завершится после последних результатов.
+        """
+
+    @abstractmethod
+    async def events(self):
+        """
+        Асинхронный генератор TranscriptEvent.
+        """
+        yield
+
+
+class DeepgramLiveTranscriber(LiveTranscriber):
+    """
+    Потоковое распознавание через WebSocket API Deepgram.
+    """
+
+    def __init__(self, api_key: str = DEEPGRAM_API_KEY, language: str = "ru"):
+        self.api_key = api_key
+        self.language = language
+        self._ws = None
+
+    async def start(self):
+        if not self.api_key:
+            raise RuntimeError("Deepgram API key отсутствует!")
+
+        params = {
+            "language": self.language,
+            "punctuate": "true",
+            "interim_results": "true",
+            "endpointing": DEEPGRAM_ENDPOINTING_MS,
+            "utterance_end_ms": max(1000, DEEPGRAM_ENDPOINTING_MS),
+        }
+        with track("deepgram", "live_connect"):
+            self._ws = await http_clients.aiohttp_session().ws_connect(
+                f"{DEEPGRAM_LIVE_URL}?{urlencode(params)}",
+                headers={"Authorization": f"Token {self.api_key}"},
+                heartbeat=10
+            )
+
+    async def send(self, chunk: bytes):
+        await self._ws.send_bytes(chunk)
+
+    async def finish(self):
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.send_str(json.dumps({"type": "CloseStream"}))
+
+    async def events(self):
+        try:
+            async for message in self._ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+
+                data = json.loads(message.data)
+                if data.get("type") == "UtteranceEnd":
+                    yield TranscriptEvent("", True, True)
+                    continue
+                if data.get("type") != "Results":
+                    continue
+
+                alternatives = data.get("channel", {}).get("alternatives") or [{}]
+                yield TranscriptEvent(
+                    alternatives[0].get("transcript", ""),
+                    bool(data.get("is_final")),
+                    bool(data.get("speech_final"))
+                )
+        finally:
+            await self._ws.close()
+
+
+class FakeTranscriber(LiveTranscriber):
+    """
+    Локальная замена для тестов: аудио-фрагменты трактуются как текст в UTF-8.
+    Каждый фрагмент даёт промежуточный результат, фрагмент с точкой в конце завершает фразу.
+    """
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self._queue = asyncio.Queue()
+        self._words = []
+
+    async def send(self, chunk: bytes):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+        self._words.extend(chunk.decode("utf-8").split())
+        text = " ".join(self._words)
+        if text.endswith("."):
+            self._words = []
+            await self._queue.put(TranscriptEvent(text, True, True))
+        else:
+            await self._queue.put(TranscriptEvent(text, False))
+
+    async def finish(self):
+        if self._words:
+            await self._queue.put(TranscriptEvent(" ".join(self._words), True, True))
+            self._words = []
+        await self._queue.put(None)
+
+    async def events(self):
+        while True:
+            event = await self._queue.get()
+            if event is None:
+                return
+            yield event
+
+
+def create_live_transcriber() -> LiveTranscriber:
+    """
+    Транскрайбер по настройке TRANSCRIBER_BACKEND.
+    """
+    if TRANSCRIBER_BACKEND == "fake":
+        return FakeTranscriber()
+    return DeepgramLiveTranscriber()
@@ -0,0 +1,119 @@
+import os
+import asyncio
+import hashlib
+
+# Хранилище видео интервью
+VIDEO_STORAGE_BACKEND = os.getenv("VIDEO_STORAGE_BACKEND", "local")  # Пока только local
+VIDEO_STORAGE_DIR = os.getenv("VIDEO_STORAGE_DIR", "media/videos")
+VIDEO_WRITE_BUFFER = int(os.getenv("VIDEO_WRITE_BUFFER", 1024 * 1024))  # Байт, накапливаемых перед записью на диск
+VIDEO_READ_CHUNK = 1024 * 1024
+
+
+def _pwrite_all(fd: int, data, offset: int):
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view, offset = view[written:], offset + written
+
+
+class ChunkTooLargeError(Exception):
+    """
+    Фрагмент длиннее, чем осталось загрузить.
+    """
+
+
+class LocalVideoStorage:
+    """
+    Видео в локальной файловой системе: фрагменты пишутся по смещению (pwrite) по мере поступления,
+    в памяти держится не больше VIDEO_WRITE_BUFFER байт на загрузку.
+    """
+
+    def __init__(self, root: str = VIDEO_STORAGE_DIR):
+        self.root = os.path.abspath(root)
+
+    def local_path(self, key: str) -> str:
+        """
+        Путь к объекту на диске — для отдачи файла без копирования через приложение.
+        """
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Недопустимый ключ хранилища: {key}")
+        return path
+
+    async def write(self, key: str, offset: int, chunks, max_bytes: int):
+        """
+        Пишет поток байтов с offset и возвращает (число байт, SHA-256 записанного).
+        При ошибке файл обрезается обратно до offset.
+        """
+        path = self.local_path(key)
+        await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+        fd = await asyncio.to_thread(os.open, path, os.O_RDWR | os.O_CREAT, 0o644)
+        digest = hashlib.sha256()
+        written = 0
+        buffer = bytearray()
+        try:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                written += len(chunk)
+                if written > max_bytes:
+                    raise ChunkTooLargeError(f"Фрагмент длиннее оставшихся {max_bytes} байт")
+                digest.update(chunk)
+                buffer += chunk
+                if len(buffer) >= VIDEO_WRITE_BUFFER:
+                    await asyncio.to_thread(_pwrite_all, fd, buffer, offset + written - len(buffer))
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(_pwrite_all, fd, buffer, offset + written - len(buffer))
+            # Хвост от прерванной ранее попытки за концом фрагмента отбрасывается
+            await asyncio.to_thread(os.ftruncate, fd, offset + written)
+        except BaseException:
+            await asyncio.to_thread(os.ftruncate, fd, offset)
+            raise
+        finally:
+            await asyncio.to_thread(os.close, fd)
+        return written, digest.hexdigest()
+
+    async def truncate(self, key: str, size: int):
+        path = self.local_path(key)
+        if os.path.exists(path):
+            await asyncio.to_thread(os.truncate, path, size)
+
+    async def sha256(self, key: str) -> str:
+        def digest():
+            result = hashlib.sha256()
+            with open(self.local_path(key), "rb") as file:
+                while chunk := file.read(VIDEO_READ_CHUNK):
+                    result.update(chunk)
+            return result.hexdigest()
+
+        return await asyncio.to_thread(digest)
+
+    async def commit(self, key: str, final_key: str):
+        """
+        Переносит догруженный файл под постоянный ключ (атомарно в пределах диска).
+        """
+        path = self.local_path(final_key)
+        await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+        await asyncio.to_thread(os.replace, self.local_path(key), path)
+
+    async def delete(self, key: str):
+        try:
+            await asyncio.to_thread(os.remove, self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.local_path(key))
+
+
+def create_video_storage():
+    """
+    Хранилище видео по настройке VIDEO_STORAGE_BACKEND.
+    """
+    if VIDEO_STORAGE_BACKEND == "local":
+        return LocalVideoStorage()
+    raise ValueError(f"Неизвестное хранилище видео: {VIDEO_STORAGE_BACKEND}")
+
+
+video_storage = create_video_storage()
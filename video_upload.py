@@ -0,0 +1,197 @@
+import os
+import uuid
+import asyncio
+import mimetypes
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, Request
+from starlette.requests import ClientDisconnect
+from starlette.responses import Response, FileResponse
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import InterviewDB, VideoUploadDB
+from schemas import VideoUploadCreate, VideoUploadResponse
+from video_storage import video_storage, ChunkTooLargeError
+from interview_cache import interview_cache
+
+# Настройки загрузки видео
+VIDEO_MAX_SIZE = int(os.getenv("VIDEO_MAX_SIZE", 4 * 1024 ** 3))  # Максимальный размер файла, байт
+VIDEO_UPLOAD_CHUNK = int(os.getenv("VIDEO_UPLOAD_CHUNK", 8 * 1024 ** 2))  # Рекомендуемый размер фрагмента
+VIDEO_UPLOAD_MAX_CHUNK = int(os.getenv("VIDEO_UPLOAD_MAX_CHUNK", 64 * 1024 ** 2))
+# Префикс внутреннего location nginx: отдачу файла с Range берёт на себя nginx (sendfile)
+VIDEO_ACCEL_REDIRECT_PREFIX = os.getenv("VIDEO_ACCEL_REDIRECT_PREFIX")
+
+# Фрагменты одной загрузки принимаются по очереди: upload_id → [lock, число ожидающих запросов]
+_upload_locks = {}
+
+
+@asynccontextmanager
+async def _upload_lock(upload_id: str):
+    # Запись удаляется, как только загрузку никто не держит и не ждёт, — брошенные загрузки не копятся
+    entry = _upload_locks.setdefault(upload_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _upload_locks[upload_id]
+
+
+def video_playback_url(interview_id: str) -> str:
+    return f"/interview/{interview_id}/video"
+
+
+def upload_response(upload: VideoUploadDB, video_url: str = None) -> VideoUploadResponse:
+    return VideoUploadResponse(
+        id=upload.id,
+        interview_id=upload.interview_id,
+        status=upload.status,
+        size=upload.size,
+        uploaded=upload.uploaded,
+        chunk_size=VIDEO_UPLOAD_CHUNK,
+        video_url=video_url
+    )
+
+
+async def get_upload(db: AsyncSession, interview_id: str, upload_id: str) -> VideoUploadDB:
+    upload = await db.get(VideoUploadDB, upload_id)
+    if not upload or upload.interview_id != interview_id:
+        raise HTTPException(status_code=404, detail="Загрузка видео не найдена")
+    return upload
+
+
+async def create_upload(db: AsyncSession, interview_id: str, request: VideoUploadCreate) -> VideoUploadDB:
+    """
+    Начинает загрузку видео: файл принимается фрагментами по смещению, загрузку можно продолжить после обрыва.
+    """
+    if not await db.get(InterviewDB, interview_id):
+        raise HTTPException(status_code=404, detail="Интервью не найдено")
+    if request.size > VIDEO_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"Видео больше {VIDEO_MAX_SIZE} байт")
+
+    upload_id = str(uuid.uuid4())
+    upload = VideoUploadDB(
+        id=upload_id,
+        interview_id=interview_id,
+        storage_key=f"uploads/{upload_id}.part",
+        content_type=request.content_type,
+        size=request.size,
+        uploaded=0,
+        sha256=request.sha256.lower() if request.sha256 else None
+    )
+    db.add(upload)
+    await db.commit()
+    return upload
+
+
+async def _complete_upload(db: AsyncSession, upload: VideoUploadDB) -> str:
+    if upload.sha256 and await video_storage.sha256(upload.storage_key) != upload.sha256:
+        upload.status = "aborted"
+        await db.commit()
+        await video_storage.delete(upload.storage_key)
+        raise HTTPException(status_code=422, detail="Контрольная сумма видео не совпадает, загрузите файл заново")
+
+    extension = mimetypes.guess_extension(upload.content_type) or ".bin"
+    final_key = f"{upload.interview_id}/{upload.id}{extension}"
+    await video_storage.commit(upload.storage_key, final_key)
+
+    interview = await db.get(InterviewDB, upload.interview_id)
+    previous_key = interview.video_storage_key
+    interview.video_storage_key = final_key
+    interview.video_size = upload.size
+    interview.video_content_type = upload.content_type
+    interview.video_url = video_playback_url(upload.interview_id)
+    upload.status = "completed"
+    await db.commit()
+    interview_cache.invalidate(upload.interview_id)
+
+    # Предыдущая запись интервью заменена новой
+    if previous_key and previous_key != final_key:
+        await video_storage.delete(previous_key)
+    return interview.video_url
+
+
+async def receive_chunk(
+    db: AsyncSession, interview_id: str, upload_id: str, request: Request, offset: int, checksum: str
+) -> VideoUploadResponse:
+    """
+    Принимает фрагмент с заданного смещения потоком, без чтения тела в память,
+    и проверяет его SHA-256. Последний фрагмент завершает загрузку и привязывает видео к интервью.
+    """
+    if not checksum:
+        raise HTTPException(status_code=400, detail="Не передана контрольная сумма фрагмента (X-Chunk-SHA256)")
+
+    async with _upload_lock(upload_id):
+        upload = await get_upload(db, interview_id, upload_id)
+        if upload.status != "uploading":
+            raise HTTPException(status_code=409, detail=f"Загрузка уже в статусе {upload.status}")
+        if offset != upload.uploaded:
+            raise HTTPException(
+                status_code=409, detail=f"Ожидается фрагмент со смещения {upload.uploaded}",
+                headers={"Upload-Offset": str(upload.uploaded)}
+            )
+        # Соединение с БД не удерживается, пока фрагмент передаётся по сети
+        await db.commit()
+
+        max_bytes = min(upload.size - offset, VIDEO_UPLOAD_MAX_CHUNK)
+        try:
+            written, digest = await video_storage.write(upload.storage_key, offset, request.stream(), max_bytes)
+        except ChunkTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except ClientDisconnect:
+            raise HTTPException(status_code=400, detail="Соединение прервано, продолжите загрузку с того же смещения")
+
+        if digest != checksum.lower():
+            await video_storage.truncate(upload.storage_key, offset)
+            raise HTTPException(status_code=400, detail="Контрольная сумма фрагмента не совпадает, отправьте его заново")
+
+        # Смещение сдвигается, только если его не сдвинул параллельный запрос другого процесса
+        result = await db.execute(
+            update(VideoUploadDB)
+            .where(VideoUploadDB.id == upload_id, VideoUploadDB.uploaded == offset)
+            .values(uploaded=offset + written)
+        )
+        if result.rowcount == 0:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Фрагмент с этого смещения уже принят")
+        await db.commit()
+        upload.uploaded = offset + written
+
+        video_url = None
+        if upload.uploaded == upload.size:
+            video_url = await _complete_upload(db, upload)
+        return upload_response(upload, video_url)
+
+
+async def abort_upload(db: AsyncSession, interview_id: str, upload_id: str) -> VideoUploadResponse:
+    upload = await get_upload(db, interview_id, upload_id)
+    if upload.status == "uploading":
+        upload.status = "aborted"
+        await db.commit()
+        await video_storage.delete(upload.storage_key)
+    return upload_response(upload)
+
+
+async def video_response(db: AsyncSession, interview_id: str) -> Response:
+    """
+    Воспроизведение видео интервью с поддержкой Range (перемотка, докачка).
+    FileResponse сам разбирает Range/If-Range, отвечает 206/416 и, если сервер поддерживает
+    http.response.pathsend, отдаёт файл без чтения в приложение.
+    """
+    interview = await db.get(InterviewDB, interview_id)
+    if not interview or not interview.video_storage_key:
+        raise HTTPException(status_code=404, detail="Видео интервью не найдено")
+    content_type = interview.video_content_type or "application/octet-stream"
+
+    if VIDEO_ACCEL_REDIRECT_PREFIX:
+        # nginx сам обрабатывает Range и отдаёт файл через sendfile
+        return Response(headers={
+            "X-Accel-Redirect": VIDEO_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + interview.video_storage_key,
+            "Content-Type": content_type,
+        })
+
+    path = video_storage.local_path(interview.video_storage_key)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Файл видео не найден в хранилище")
+    return FileResponse(path, media_type=content_type)